@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='line_user_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -9,5 +9,6 @@ class Employee(models.Model):
     can_close_floor = models.BooleanField(default=False)
     can_order = models.BooleanField(default=False)
     is_beginner = models.BooleanField(default=False) 
+    line_user_id = models.CharField(max_length=64, blank=True, default='')  # シフト変更の個別通知先
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
\ No newline at end of file
@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from config.pagination import DynamicFieldsMixin
 from .models import Employee
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Employee
         fields = [
@@ -14,6 +15,7 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'can_close_floor',
             'can_order',
             'is_beginner',
+            'line_user_id',
             'created_at',
             'updated_at'
         ]
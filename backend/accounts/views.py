@@ -1,13 +1,31 @@
+from django.db.models import ProtectedError
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.response import Response
 from .models import Employee
 from .serializers import EmployeeSerializer
 from rest_framework.decorators import api_view
+from config.conditional import aggregate_validators, conditional_get
+from config.pagination import KeysetPagination, field_selection
 
+class EmployeePagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+def employee_list_validators(request):
+    """従業員一覧のETag・Last-Modified"""
+    return aggregate_validators('employees', Employee.objects.all(), 'updated_at')
+
+@conditional_get(employee_list_validators)
 class EmployeeListCreate(generics.ListCreateAPIView):
     queryset = Employee.objects.all().order_by('created_at')
     serializer_class = EmployeeSerializer
+    pagination_class = EmployeePagination
+
+    def get_serializer_context(self):
+        # ?fields= で出力する項目を絞り込む
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = field_selection(self.request)
+        return context
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -46,7 +64,13 @@ class EmployeeRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        self.perform_destroy(instance)
+        try:
+            self.perform_destroy(instance)
+        except ProtectedError:
+            return Response(
+                {"error": "公開済みのシフトに含まれている従業員は削除できません"},
+                status=status.HTTP_409_CONFLICT
+            )
         return Response(
             {"message": "従業員を削除しました"},
             status=status.HTTP_204_NO_CONTENT
@@ -0,0 +1,45 @@
+# 条件付きGET（ETag / Last-Modified）
+# 一覧の件数と更新日時の最大値を1回の集計クエリで求め、
+# 変更がなければシリアライズせずに304を返す
+from django.db.models import Count, Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+
+def aggregate_validators(prefix, queryset, *timestamp_fields):
+    """件数と更新日時の最大値から (ETag, Last-Modified) を作成
+
+    件数を含めるため、削除された場合もETagが変わる。
+    """
+    aggregates = queryset.aggregate(
+        count=Count('pk'),
+        **{f'max_{i}': Max(field) for i, field in enumerate(timestamp_fields)}
+    )
+    timestamps = [aggregates[f'max_{i}'] for i in range(len(timestamp_fields))]
+    parts = [str(aggregates['count'])] + [
+        f'{ts.timestamp():.6f}' if ts else '0' for ts in timestamps
+    ]
+    last_modified = max((ts for ts in timestamps if ts), default=None)
+    return f'"{prefix}-{"-".join(parts)}"', last_modified
+
+
+def conditional_get(validators):
+    """APIViewのGETを条件付きにするクラスデコレーター
+
+    validators(request, *args, **kwargs) は (ETag, Last-Modified) を返す。
+    ETag・Last-Modifiedの両方に使うため、1リクエストにつき1回だけ呼び出す。
+    """
+    def cached(request, *args, **kwargs):
+        if not hasattr(request, '_conditional_validators'):
+            request._conditional_validators = validators(request, *args, **kwargs)
+        return request._conditional_validators
+
+    return method_decorator(condition(
+        etag_func=lambda request, *args, **kwargs: cached(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: cached(request, *args, **kwargs)[1],
+    ), name='get')
+
+
+def request_etag(request):
+    """conditional_get で求めたこのリクエストのETag（未計算の場合は None）"""
+    return getattr(request, '_conditional_validators', (None, None))[0]
@@ -0,0 +1,176 @@
+# リクエストごとの計測値の集計とPrometheus形式での出力
+# 値はプロセス内で集計する（複数ワーカーの場合はワーカーごとの値になる）
+import math
+import threading
+from collections import defaultdict, deque
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# 計測する区間（Server-Timing・ログ・メトリクスで共通）
+PHASES = ('db', 'serialize', 'view', 'total')
+# ヒストグラムのバケット（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# パーセンタイル計算に使う直近のサンプル数
+SAMPLE_SIZE = getattr(settings, 'METRICS_SAMPLE_SIZE', 1024)
+
+
+def quantile(sorted_values, q):
+    """ソート済みの値から分位点を求める（線形補間）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+class RouteStats:
+    """1ルート分の集計"""
+
+    def __init__(self):
+        self.count = 0
+        self.queries = 0
+        self.sums = dict.fromkeys(PHASES, 0.0)
+        self.buckets = [0] * len(BUCKETS)
+        self.statuses = defaultdict(int)
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, timings, queries, status):
+        self.count += 1
+        self.queries += queries
+        for phase in PHASES:
+            self.sums[phase] += timings[phase]
+        total = timings['total']
+        for i, bound in enumerate(BUCKETS):
+            if total <= bound:
+                self.buckets[i] += 1
+        self.statuses[status] += 1
+        self.samples.append(total)
+
+    def quantiles(self):
+        values = sorted(self.samples)
+        return {q: quantile(values, q) for q in QUANTILES}
+
+
+class MetricsRegistry:
+    """ルート（URLパターン）・メソッドごとの集計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, method, timings, queries, status):
+        with self._lock:
+            stats = self._routes.get((route, method))
+            if stats is None:
+                stats = self._routes[(route, method)] = RouteStats()
+            stats.add(timings, queries, status)
+
+    def snapshot(self):
+        """集計値のコピーを返す（ルート, メソッド, 件数, パーセンタイルなど）"""
+        with self._lock:
+            return [
+                {
+                    'route': route,
+                    'method': method,
+                    'count': stats.count,
+                    'queries': stats.queries,
+                    'sums': dict(stats.sums),
+                    'buckets': list(stats.buckets),
+                    'statuses': dict(stats.statuses),
+                    'quantiles': stats.quantiles(),
+                }
+                for (route, method), stats in sorted(self._routes.items())
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = MetricsRegistry()
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def labels(**values):
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in values.items()) + '}'
+
+
+def render_prometheus(snapshot):
+    """集計値をPrometheusのテキスト形式に変換"""
+    lines = [
+        '# HELP http_request_duration_seconds Total request time',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for entry in snapshot:
+        route, method = entry['route'], entry['method']
+        for bound, count in zip(BUCKETS, entry['buckets']):
+            lines.append(
+                f"http_request_duration_seconds_bucket{labels(route=route, method=method, le=bound)} {count}"
+            )
+        lines.append(
+            f"http_request_duration_seconds_bucket{labels(route=route, method=method, le='+Inf')} {entry['count']}"
+        )
+        lines.append(
+            f"http_request_duration_seconds_sum{labels(route=route, method=method)} {entry['sums']['total']}"
+        )
+        lines.append(
+            f"http_request_duration_seconds_count{labels(route=route, method=method)} {entry['count']}"
+        )
+
+    lines += [
+        f'# HELP http_request_duration_quantile_seconds Request time percentiles over the last {SAMPLE_SIZE} requests',
+        '# TYPE http_request_duration_quantile_seconds gauge',
+    ]
+    for entry in snapshot:
+        for q, value in entry['quantiles'].items():
+            lines.append(
+                f"http_request_duration_quantile_seconds"
+                f"{labels(route=entry['route'], method=entry['method'], quantile=q)} {value}"
+            )
+
+    lines += [
+        '# HELP http_request_phase_seconds_total Time spent per phase (db, serialize, view)',
+        '# TYPE http_request_phase_seconds_total counter',
+    ]
+    for entry in snapshot:
+        for phase in ('db', 'serialize', 'view'):
+            lines.append(
+                f"http_request_phase_seconds_total"
+                f"{labels(route=entry['route'], method=entry['method'], phase=phase)} {entry['sums'][phase]}"
+            )
+
+    lines += [
+        '# HELP http_request_db_queries_total SQL queries executed',
+        '# TYPE http_request_db_queries_total counter',
+    ]
+    for entry in snapshot:
+        lines.append(
+            f"http_request_db_queries_total{labels(route=entry['route'], method=entry['method'])} {entry['queries']}"
+        )
+
+    lines += [
+        '# HELP http_requests_total Requests by status code',
+        '# TYPE http_requests_total counter',
+    ]
+    for entry in snapshot:
+        for status, count in sorted(entry['statuses'].items()):
+            lines.append(
+                f"http_requests_total{labels(route=entry['route'], method=entry['method'], status=status)} {count}"
+            )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """/api/metrics/: 集計値をPrometheus形式で返す（METRICS_ALLOWED_IPS からのみ）"""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_prometheus(registry.snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
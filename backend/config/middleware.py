@@ -0,0 +1,175 @@
+# リクエストごとのSQL・処理時間の計測とレスポンスの圧縮
+import json
+import logging
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from config.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # brotli は任意（なければgzipのみ）
+    brotli = None
+
+logger = logging.getLogger('config.metrics')
+
+
+class RequestTimings:
+    """1リクエスト分の計測値"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.view_start = None
+        self.view = 0.0
+        self.render_start = None
+        self.serialize = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper として全SQLの件数と時間を数える
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+
+class RequestMetricsMiddleware:
+    """SQL件数・SQL時間・シリアライズ時間・ビュー時間・全体時間を計測する
+
+    Server-Timingヘッダーで返し、ルートごとに config.metrics に集計する
+    （構造化ログはDEBUGレベルで出力）。
+    シリアライズ時間はDRFのResponseのレンダリング時間。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request._timings = RequestTimings()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        # レンダリングのないレスポンスはここまでをビュー時間とする
+        if timings.view_start is not None and timings.render_start is None:
+            timings.view = time.perf_counter() - timings.view_start
+
+        values = {
+            'db': timings.db,
+            'serialize': timings.serialize,
+            'view': timings.view,
+            'total': total,
+        }
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+            f'serialize;dur={timings.serialize * 1000:.1f}',
+            f'view;dur={timings.view * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        registry.record(route, request.method, values, timings.queries, response.status_code)
+        # 1リクエストごとのログは METRICS_LOG_LEVEL=DEBUG のときだけ作る
+        if logger.isEnabledFor(logging.DEBUG):
+            self.log(request, route, response, timings, total)
+        return response
+
+    def log(self, request, route, response, timings, total):
+        logger.debug(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'db_ms': round(timings.db * 1000, 2),
+            'serialize_ms': round(timings.serialize * 1000, 2),
+            'view_ms': round(timings.view * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }, ensure_ascii=False))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timings.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # ビューが返ってからレンダリング完了までをシリアライズ時間とする
+        timings = request._timings
+        now = time.perf_counter()
+        if timings.view_start is not None:
+            timings.view = now - timings.view_start
+        timings.render_start = now
+
+        def finish(rendered):
+            timings.serialize = time.perf_counter() - timings.render_start
+
+        response.add_post_render_callback(finish)
+        return response
+
+
+def accepted_encodings(header):
+    """Accept-Encoding から q=0 でないエンコーディングの集合を返す"""
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            encodings.add(name)
+    return encodings
+
+
+class CompressionMiddleware:
+    """一定以上の大きさのレスポンスを brotli / gzip で圧縮する
+
+    brotli がインストールされていてクライアントが対応していれば brotli、
+    そうでなければ gzip を使う。圧縮しても小さくならない場合はそのまま返す。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.COMPRESSION_MIN_BYTES
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in encodings:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        elif 'gzip' in encodings:
+            encoding = 'gzip'
+            compressed = compress_string(response.content)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # 圧縮後は内容が変わるため強いETagを弱いETagにする
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,125 @@
+# キーセット（カーソル）ページネーションと出力項目の選択
+# 前ページの最後の行の並び順の値をカーソルにし、インデックスを使って続きを取得する。
+# cursor / page_size を指定した場合のみページ分割する（指定しなければ従来どおり全件）。
+import base64
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """ordering（例: ('-year', '-month')）の順に前方へページ分割する"""
+    ordering = ()
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        values = [str(getattr(obj, field.lstrip('-'))) for field in self.ordering]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, queryset, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                queryset.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound('カーソルが正しくありません')
+
+    def after(self, queryset, values):
+        """並び順でカーソルより後ろの行（(a, b) > (x, y) を a > x OR (a = x AND b > y) に展開）"""
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = f'{name}__lt' if field.startswith('-') else f'{name}__gt'
+            equal = {f.lstrip('-'): v for f, v in zip(self.ordering[:i], values[:i])}
+            condition |= Q(**equal, **{lookup: values[i]})
+        return queryset.filter(condition)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.request = request
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = self.after(queryset, self.decode_cursor(queryset, cursor))
+
+        size = self.get_page_size(request)
+        rows = list(queryset[:size + 1])
+        self.has_next = len(rows) > size
+        page = rows[:size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+def field_selection(request):
+    """?fields= / ?expand= を (fields, expand) に変換
+
+    新しいパラメータ（cursor / page_size / fields / expand）を1つも使わない場合は
+    (None, None) を返し、従来どおりすべての項目を出力する。
+    """
+    params = request.query_params
+
+    def split(name):
+        return [f for f in params.get(name, '').split(',') if f]
+
+    if not any(name in params for name in ('cursor', 'page_size', 'fields', 'expand')):
+        return None, None
+    return (split('fields') if 'fields' in params else None), split('expand')
+
+
+class DynamicFieldsMixin:
+    """context の fields / expand で出力する項目を絞り込むシリアライザーのMixin
+
+    Meta.expandable_fields の項目（入れ子の一覧など）は expand か fields で指定した場合のみ出力する。
+    expand が None の場合は従来どおりすべて出力する。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        expand = self.context.get('expand')
+        if expand is not None:
+            requested = set(expand) | set(fields or ())
+            for name in getattr(self.Meta, 'expandable_fields', ()):
+                if name not in requested:
+                    self.fields.pop(name, None)
+        if fields is not None:
+            keep = set(fields) | set(expand or ())
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
@@ -0,0 +1,39 @@
+# 高速なJSONレンダラー
+# orjson がインストールされていれば使い、なければDRF標準の JSONRenderer と同じ動作
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson は任意
+    orjson = None
+
+
+# 日時も orjson で変換せずDRFのエンコーダーに渡す
+# （DRFはUTCを 'Z'、マイクロ秒をミリ秒で出力し、orjson は '+00:00' とマイクロ秒で出力するため）
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+
+def encoder_default(obj):
+    """orjson が直接扱えない型（遅延文字列・Decimalなど）と日時はDRFのエンコーダーで変換"""
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """orjson でエンコードする JSONRenderer（インデント指定時とorjsonがない場合は標準のまま）"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return orjson.dumps(data, default=encoder_default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # orjson が扱えない値（64bitを超える整数など）は標準のエンコーダーに任せる
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def fast_json_available():
+    return orjson is not None
+
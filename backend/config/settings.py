@@ -60,6 +60,17 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-match',
+    'if-none-match',
+    'if-modified-since',
+    'idempotency-key',
+]
+
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'server-timing',
+    'idempotency-replayed',
+    'x-query-count',
 ]
 
 
@@ -81,6 +92,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # SQL・処理時間の計測（全体時間に他のミドルウェアも含めるため先頭に置く）
+    'config.middleware.RequestMetricsMiddleware',
+    # 大きなレスポンスを brotli / gzip で圧縮
+    'config.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -91,6 +106,22 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# JSONのレンダリング（orjson がインストールされていれば使う）
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# この大きさ（バイト）以上のレスポンスを圧縮（brotli はインストールされている場合のみ）
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+
+# 提出状況の配信（SSE）: 変更がない間のkeepaliveの間隔（秒）と切断時の再接続の待ち時間（ミリ秒）
+SUBMISSION_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('SUBMISSION_STREAM_HEARTBEAT_SECONDS', '15'))
+SUBMISSION_STREAM_RETRY_MS = int(os.environ.get('SUBMISSION_STREAM_RETRY_MS', '3000'))
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -127,6 +158,31 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # シフト履歴のキャッシュ（LocMemCacheはMAX_ENTRIESを超えると最も使われていないものから削除）
+    # LocMemCacheはプロセスごとのため、複数ワーカーで動かす場合は書き込み時の削除とヒット数が
+    # 全プロセスで共有されるよう HISTORY_CACHE_BACKEND に RedisCache などの共有バックエンドを指定する
+    # （RedisCacheでは maxmemory-policy を allkeys-lru にする。FileBasedCacheは上限を超えると無作為に削除する）
+    'history': {
+        'BACKEND': os.environ.get(
+            'HISTORY_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('HISTORY_CACHE_LOCATION', 'shift-history'),
+        'TIMEOUT': int(os.environ.get('HISTORY_CACHE_TIMEOUT', '300')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('HISTORY_CACHE_MAX_ENTRIES', '2000')),
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -171,3 +227,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# シフトPDF・変換画像のキャッシュ（古いものから削除）
+RENDER_CACHE_MAX_AGE_SECONDS = int(os.environ.get('RENDER_CACHE_MAX_AGE_DAYS', '30')) * 24 * 60 * 60
+RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_MB', '500')) * 1024 * 1024
+
+
+# LINE Messaging APIの送信設定（ローカルの疑似サーバーに向ける場合は LINE_API_BASE_URL を変更）
+LINE_API_BASE_URL = os.environ.get('LINE_API_BASE_URL', 'https://api.line.me')
+LINE_MAX_CONNECTIONS = int(os.environ.get('LINE_MAX_CONNECTIONS', '10'))
+LINE_MAX_CONCURRENT_PUSHES = int(os.environ.get('LINE_MAX_CONCURRENT_PUSHES', '4'))
+LINE_REQUEST_TIMEOUT_SECONDS = float(os.environ.get('LINE_REQUEST_TIMEOUT_SECONDS', '10'))
+# 429・5xx・通信エラーのときに同じpushを再送する回数
+LINE_PUSH_RETRIES = int(os.environ.get('LINE_PUSH_RETRIES', '2'))
+
+# リクエスト計測（/api/metrics/ はこのアドレスからのみ参照可能）
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+# パーセンタイル計算に使う直近のリクエスト数（ルートごと）
+METRICS_SAMPLE_SIZE = int(os.environ.get('METRICS_SAMPLE_SIZE', '1024'))
+
+# リクエストごとの計測値をJSONの1行ログで出力
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'metrics': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'config.metrics': {
+            'handlers': ['metrics'],
+            # DEBUG にするとリクエストごとの計測値をJSONで1行ずつ出力する
+            'level': os.environ.get('METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,160 @@
+import datetime
+import decimal
+import gzip
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import Employee
+from config.metrics import registry
+from config.middleware import CompressionMiddleware
+from config.renderers import FastJSONRenderer
+from shifts.models import DraftShiftDetail, DraftShiftRequest, ShiftSubmissionStatus, TimePreset
+from shifts.serializers import DraftShiftRequestSerializer, TimePresetSerializer
+
+SERVER_TIMING = re.compile(
+    r'db;dur=([\d.]+);desc="(\d+) queries", serialize;dur=([\d.]+), view;dur=([\d.]+), total;dur=([\d.]+)'
+)
+
+
+class RequestMetricsTest(TestCase):
+    """リクエストごとの計測（Server-Timing・ルートごとの集計・/api/metrics/）"""
+
+    def setUp(self):
+        self.client = APIClient()
+        registry.reset()
+        Employee.objects.create(name='計測')
+
+    def test_server_timing_reports_phases(self):
+        response = self.client.get('/api/accounts/employees/')
+        self.assertEqual(response.status_code, 200)
+        match = SERVER_TIMING.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match)
+        db, queries, serialize, view, total = (float(v) for v in match.groups())
+        self.assertGreater(queries, 0)
+        # 各区間は全体の時間に収まる
+        for value in (db, serialize, view):
+            self.assertLessEqual(value, total)
+
+    def test_requests_are_recorded_per_route(self):
+        self.client.get('/api/accounts/employees/')
+        self.client.get('/api/accounts/employees/')
+        [entry] = [e for e in registry.snapshot() if e['route'] == 'api/accounts/employees/']
+        self.assertEqual(entry['method'], 'GET')
+        self.assertEqual(entry['count'], 2)
+        self.assertEqual(entry['statuses'], {200: 2})
+        self.assertGreater(entry['sums']['total'], 0)
+
+    def test_request_log_is_debug_only(self):
+        with self.assertNoLogs('config.metrics', 'INFO'):
+            self.client.get('/api/accounts/employees/')
+        with self.assertLogs('config.metrics', 'DEBUG') as logs:
+            self.client.get('/api/accounts/employees/')
+        self.assertIn('"route": "api/accounts/employees/"', logs.output[0])
+
+    def test_metrics_endpoint_renders_prometheus(self):
+        self.client.get('/api/accounts/employees/')
+        response = self.client.get('/api/metrics/', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{route="api/accounts/employees/",method="GET"} 1', body
+        )
+        self.assertIn(
+            'http_requests_total{route="api/accounts/employees/",method="GET",status="200"} 1', body
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_endpoint_is_restricted_by_ip(self):
+        self.assertEqual(self.client.get('/api/metrics/', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/api/metrics/', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+
+class FastJSONRendererTest(TestCase):
+    """orjson の出力がDRF標準の JSONRenderer と同じであること"""
+
+    def assertSameAsDRF(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_serializer_payload(self):
+        employee = Employee.objects.create(name='出力')
+        TimePreset.objects.create(
+            employee=employee, name='朝', start_time=datetime.time(7, 0), end_time=datetime.time(12, 30)
+        )
+        draft = DraftShiftRequest.objects.create(
+            employee=employee, year=2030, month=1, min_hours=40, max_hours=80
+        )
+        DraftShiftDetail.objects.create(
+            draft=draft, date=datetime.date(2030, 1, 5),
+            start_time=datetime.time(9, 15), end_time=datetime.time(17, 0), color='#ff0000'
+        )
+        ShiftSubmissionStatus.objects.create(
+            employee=employee, year=2030, month=1, submitted_at=timezone.now()
+        )
+        self.assertSameAsDRF(TimePresetSerializer(TimePreset.objects.all(), many=True).data)
+        self.assertSameAsDRF(DraftShiftRequestSerializer(draft).data)
+
+    def test_raw_values(self):
+        # ビューが直接返す値（シリアライザーを通らない日時・Decimal・遅延文字列など）
+        self.assertSameAsDRF({
+            'utc': datetime.datetime(2030, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+            'jst': datetime.datetime(2030, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=9))),
+            'naive': datetime.datetime(2030, 1, 2, 3, 4, 5),
+            'date': datetime.date(2030, 1, 2),
+            'time': datetime.time(9, 30, 1, 500000),
+            'decimal': decimal.Decimal('1.50'),
+            'lazy': gettext_lazy('シフト'),
+            7: 'int key',
+        })
+
+
+class CompressionMiddlewareTest(SimpleTestCase):
+    """レスポンスの圧縮（大きさのしきい値・Vary・ETag・ストリーミング）"""
+
+    def compress(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    @override_settings(COMPRESSION_MIN_BYTES=1024)
+    def test_small_response_is_not_compressed(self):
+        response = self.compress(HttpResponse(b'a' * 1023))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+    @override_settings(COMPRESSION_MIN_BYTES=1024)
+    def test_large_response_is_gzipped(self):
+        body = b'{"name": "shift"}' * 100
+        response = HttpResponse(body)
+        response['ETag'] = '"abc"'
+        response = self.compress(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        # 圧縮後は強いETagを弱いETagにする
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    @override_settings(COMPRESSION_MIN_BYTES=1024)
+    def test_vary_is_set_even_without_accepted_encoding(self):
+        response = self.compress(HttpResponse(b'a' * 2048), accept_encoding='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    @override_settings(COMPRESSION_MIN_BYTES=1024)
+    def test_weak_etag_is_kept(self):
+        response = HttpResponse(b'a' * 2048)
+        response['ETag'] = 'W/"abc"'
+        self.assertEqual(self.compress(response)['ETag'], 'W/"abc"')
+
+    @override_settings(COMPRESSION_MIN_BYTES=0)
+    def test_streaming_response_is_skipped(self):
+        response = self.compress(StreamingHttpResponse(iter([b'data: 1\n\n'] * 100)))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+        self.assertEqual(b''.join(response.streaming_content), b'data: 1\n\n' * 100)
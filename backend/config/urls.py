@@ -2,10 +2,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from config.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/notifications/', include('notifications.urls')),
     path('api/accounts/', include('accounts.urls')), 
     path('api/shifts/', include('shifts.urls')), 
+    path('api/metrics/', metrics_view, name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
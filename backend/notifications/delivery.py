@@ -0,0 +1,202 @@
+# LINE Messaging APIへの送信
+# 接続を使い回すセッションをバックグラウンドのイベントループで保持し、
+# 同じ送信先へのメッセージは1回のpushにまとめて送信する
+import asyncio
+import atexit
+import threading
+import uuid
+import aiohttp
+
+PUSH_PATH = '/v2/bot/message/push'
+# 1回のpushで送れるメッセージ数の上限
+MAX_MESSAGES_PER_PUSH = 5
+
+
+class LineDeliveryError(Exception):
+    """LINEへの送信失敗（sent: 失敗までに送信できたメッセージ数）"""
+
+    def __init__(self, message, status=None, sent=0, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.sent = sent
+        self.retry_after = retry_after  # Retry-After ヘッダーの秒数
+
+    @property
+    def retryable(self):
+        """再送で成功する可能性があるか（通信エラー・429・5xx）
+
+        429以外の4xx（不正なリクエスト・トークン・送信先）は何度送っても失敗する。
+        """
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+def to_message_dict(message):
+    """linebot.models のメッセージまたはdictをAPIに送る形式に変換"""
+    if hasattr(message, 'as_json_dict'):
+        return message.as_json_dict()
+    return message
+
+
+def chunk_messages(messages, size=MAX_MESSAGES_PER_PUSH):
+    """メッセージを順番を保ったまま size 件ずつに分割"""
+    return [messages[i:i + size] for i in range(0, len(messages), size)]
+
+
+class LineDeliveryClient:
+    """LINE Messaging APIの非同期クライアント（keep-aliveの接続プールを共有）"""
+
+    def __init__(self, access_token, base_url, max_connections=10, max_concurrent=4, timeout=10,
+                 retries=2, retry_backoff=1.0):
+        self.access_token = access_token
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Authorization': f'Bearer {self.access_token}'}
+            )
+        return self._session
+
+    async def push(self, to, messages):
+        """1回のpushで送信（最大5件）
+
+        429・5xx・通信エラーは retries 回まで間隔を空けて再送する。
+        再送には同じ X-Line-Retry-Key を付け、LINE側で二重に配信されないようにする。
+        """
+        if len(messages) > MAX_MESSAGES_PER_PUSH:
+            raise ValueError(f"1回のpushで送れるメッセージは{MAX_MESSAGES_PER_PUSH}件までです")
+        payload = {'to': to, 'messages': [to_message_dict(m) for m in messages]}
+        headers = {'X-Line-Retry-Key': str(uuid.uuid4())}
+        for attempt in range(self.retries + 1):
+            try:
+                await self._post(payload, headers, retried=attempt > 0)
+                return
+            except LineDeliveryError as e:
+                if not e.retryable or attempt == self.retries:
+                    raise
+                delay = e.retry_after if e.retry_after is not None else self.retry_backoff * 2 ** attempt
+                await asyncio.sleep(delay)
+
+    async def _post(self, payload, headers, retried):
+        async with self._semaphore:
+            try:
+                async with self._get_session().post(
+                    self.base_url + PUSH_PATH, json=payload, headers=headers
+                ) as response:
+                    # 409: 同じリトライキーのリクエストを受付済み（前回の送信が届いていた）
+                    if retried and response.status == 409:
+                        return
+                    if response.status >= 400:
+                        body = await response.text()
+                        retry_after = response.headers.get('Retry-After')
+                        raise LineDeliveryError(
+                            f"LINE API error {response.status}: {body}",
+                            status=response.status,
+                            retry_after=int(retry_after) if retry_after and retry_after.isdigit() else None
+                        )
+                    await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise LineDeliveryError(f"LINE API request failed: {e!r}")
+
+    async def send(self, to, messages):
+        """同じ送信先へのメッセージを5件ずつまとめて順番に送信し、送信数を返す"""
+        sent = 0
+        for chunk in chunk_messages(list(messages)):
+            try:
+                await self.push(to, chunk)
+            except LineDeliveryError as e:
+                e.sent = sent
+                raise
+            sent += len(chunk)
+        return sent
+
+    async def send_many(self, deliveries):
+        """送信先ごとのメッセージを並行して送信（送信先ごとの順番は保つ）
+
+        deliveries: {送信先: [メッセージ]}
+        戻り値: {送信先: 送信数 または LineDeliveryError}
+        """
+        targets = list(deliveries)
+        results = await asyncio.gather(
+            *(self.send(to, deliveries[to]) for to in targets),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, LineDeliveryError):
+                raise result
+        return dict(zip(targets, results))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class LineDelivery:
+    """同期コードから使う送信窓口
+
+    専用スレッドのイベントループでクライアントを動かすため、
+    リクエストやワーカーをまたいで接続が再利用される。
+    """
+
+    def __init__(self, client_factory):
+        self._client_factory = client_factory
+        self._client = None
+        self._loop = None
+        self._lock = threading.Lock()
+        # プロセス終了時にセッションを閉じる（ループを作り直しても登録は1回だけ）
+        atexit.register(self.close)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None or not self._loop.is_running():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                threading.Thread(target=run, name='line-delivery', daemon=True).start()
+                started.wait()
+                self._loop = loop
+                self._client = None
+            return self._loop
+
+    def _run(self, coroutine_function, *args):
+        loop = self._ensure_loop()
+
+        async def call():
+            # クライアントはループ上で作成する（セッションがループに紐づくため）
+            if self._client is None:
+                self._client = self._client_factory()
+            return await coroutine_function(self._client, *args)
+
+        return asyncio.run_coroutine_threadsafe(call(), loop).result()
+
+    def send(self, to, messages):
+        """メッセージを順番に送信し、送信数を返す（失敗時は LineDeliveryError）"""
+        return self._run(LineDeliveryClient.send, to, messages)
+
+    def send_many(self, deliveries):
+        """複数の送信先へ並行して送信"""
+        return self._run(LineDeliveryClient.send_many, deliveries)
+
+    def close(self):
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+        if loop is None:
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
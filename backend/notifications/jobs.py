@@ -0,0 +1,265 @@
+# 通知のバックグラウンドジョブ（シフト表のPDFの通知・公開済みシフトの変更の通知）
+# リクエスト処理とは別のワーカープロセス（run_notification_worker）で実行する
+import logging
+import time
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+from linebot.models import TextSendMessage, ImageSendMessage
+from notifications import render_cache, rendering
+from notifications.delivery import LineDeliveryError
+from notifications.line import line_delivery, GROUP_ID
+from notifications.models import NotificationJob, ShiftNotification, ShiftNotificationImage
+from shifts.models import PublishedSchedule
+from shifts.publishing import change_messages, decode_diff, encode_diff
+
+logger = logging.getLogger(__name__)
+
+# リトライ間隔（指数バックオフ）
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# 実行中のまま放置されたジョブを再投入するまでの時間
+STALE_JOB_SECONDS = 10 * 60
+
+
+class PermanentJobError(Exception):
+    """リトライしても成功しないエラー"""
+
+
+def enqueue_shift_notification(notification, base_url):
+    """シフト通知ジョブを登録"""
+    return NotificationJob.objects.create(
+        notification=notification,
+        payload={'base_url': base_url}
+    )
+
+
+def enqueue_schedule_changes(schedule, diff):
+    """公開したシフトの変更通知ジョブを登録（版のIDと差分を保存）"""
+    return NotificationJob.objects.create(
+        kind=NotificationJob.KIND_SCHEDULE_CHANGES,
+        payload={'schedule_id': schedule.id, 'diff': encode_diff(diff)}
+    )
+
+
+def render_notification_images(notification):
+    """PDFの全ページをJPEG画像に変換して保存"""
+    key = notification.content_hash or f'notification-{notification.id}'
+    pdf_path = notification.pdf_file.path
+    try:
+        pages = rendering.page_count(pdf_path)
+    except rendering.RenderError as e:
+        raise PermanentJobError(str(e))
+    if pages == 0:
+        raise PermanentJobError("PDFにページがありません")
+
+    # 同じ内容のPDFを変換済みであれば再利用し、足りないページだけ変換する
+    names = {page: render_cache.image_name(key, page) for page in range(pages)}
+    preview_names = {page: render_cache.preview_name(key, page) for page in range(pages)}
+    missing = [
+        page for page in range(pages)
+        if not (render_cache.touch(names[page]) and render_cache.touch(preview_names[page]))
+    ]
+
+    if missing:
+        try:
+            rendered = rendering.render_pages(pdf_path, missing)
+        except rendering.RenderError as e:
+            raise PermanentJobError(str(e))
+
+        # エンコード済みのJPEGをそのままストレージに保存
+        for page, (image, preview) in rendered.items():
+            for name in (names[page], preview_names[page]):
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+            names[page] = default_storage.save(names[page], ContentFile(image))
+            preview_names[page] = default_storage.save(preview_names[page], ContentFile(preview))
+
+    ShiftNotificationImage.objects.filter(notification=notification).delete()
+    ShiftNotificationImage.objects.bulk_create([
+        ShiftNotificationImage(
+            notification=notification,
+            page=page,
+            image_file=names[page],
+            preview_file=preview_names[page]
+        )
+        for page in range(pages)
+    ])
+    # 1ページ目は従来どおり image_file にも設定する
+    notification.image_file.name = names[0]
+    notification.save(update_fields=['image_file'])
+
+
+def push_notification(job):
+    """LINEにメッセージと画像を送信（5件ずつまとめてpush）"""
+    notification = job.notification
+
+    # 再試行時は送信済みのメッセージ・ページを飛ばす
+    messages = []
+    send_text = bool(notification.message) and not job.text_sent
+    if send_text:
+        messages.append(TextSendMessage(text=notification.message))
+
+    # 画像のURLを生成してページ順に並べる
+    base_url = job.payload.get('base_url', '').rstrip('/')
+    for image in notification.images.all()[job.pages_sent:]:
+        image_url = base_url + image.image_file.url
+        preview_url = base_url + image.preview_file.url if image.preview_file else image_url
+        messages.append(ImageSendMessage(
+            original_content_url=image_url,
+            preview_image_url=preview_url
+        ))
+
+    if not messages:
+        return
+    try:
+        sent = line_delivery.send(GROUP_ID, messages)
+        error = None
+    except LineDeliveryError as e:
+        sent = e.sent
+        error = e
+
+    # 失敗した場合も送信できた分は記録し、次回は続きから送信する
+    if sent:
+        if send_text:
+            job.text_sent = True
+            sent -= 1
+        job.pages_sent += sent
+        job.save(update_fields=['text_sent', 'pages_sent', 'updated_at'])
+    if error is not None:
+        if not error.retryable:
+            raise PermanentJobError(str(error))
+        raise error
+
+
+def push_schedule_changes(job):
+    """変更のあった従業員・日をLINEに通知（送信先ごとに1通）
+
+    送信できた送信先は payload の sent_to に記録し、再試行では残りだけに送る。
+    再送しても届かない送信先（429以外の4xx）は failed_to に記録して以降は送らない。
+    """
+    schedule = PublishedSchedule.objects.filter(id=job.payload.get('schedule_id')).first()
+    if schedule is None:
+        raise PermanentJobError("公開済みのシフトがありません")
+    messages = change_messages(schedule, decode_diff(job.payload['diff']))
+    done = set(job.payload.get('sent_to', [])) | set(job.payload.get('failed_to', []))
+    pending = {to: [TextSendMessage(text=text)] for to, text in messages.items() if to not in done}
+    if not pending:
+        return
+
+    results = line_delivery.send_many(pending)
+    errors = {to: result for to, result in results.items() if isinstance(result, LineDeliveryError)}
+    job.payload['sent_to'] = job.payload.get('sent_to', []) + [to for to in results if to not in errors]
+    job.payload['failed_to'] = job.payload.get('failed_to', []) + [
+        to for to, error in errors.items() if not error.retryable
+    ]
+    job.save(update_fields=['payload', 'updated_at'])
+
+    retryable = [error for error in errors.values() if error.retryable]
+    if retryable:
+        raise retryable[0]
+    if errors:
+        raise PermanentJobError(
+            f"{len(errors)}件の送信先に送信できませんでした: " + '; '.join(str(e) for e in errors.values())
+        )
+
+
+def retry_delay(attempts):
+    """attempts回目の失敗後の待ち時間（秒）"""
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def claim_next_job():
+    """実行可能なジョブを1件取得して実行中にする"""
+    now = timezone.now()
+    candidates = NotificationJob.objects.filter(
+        status=NotificationJob.STATUS_PENDING,
+        run_at__lte=now
+    ).values_list('id', flat=True)[:10]
+
+    for job_id in candidates:
+        # 他のワーカーと取り合わないよう、状態を条件にして更新する
+        claimed = NotificationJob.objects.filter(
+            id=job_id,
+            status=NotificationJob.STATUS_PENDING
+        ).update(
+            status=NotificationJob.STATUS_RUNNING,
+            attempts=F('attempts') + 1,
+            updated_at=now
+        )
+        if claimed:
+            return NotificationJob.objects.select_related('notification').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """ジョブを1件実行"""
+    try:
+        if job.kind == NotificationJob.KIND_SCHEDULE_CHANGES:
+            push_schedule_changes(job)
+        else:
+            if not job.notification.images.exists():
+                render_notification_images(job.notification)
+            push_notification(job)
+    except PermanentJobError as e:
+        logger.error("Notification job %s failed: %s", job.id, str(e))
+        job.status = NotificationJob.STATUS_FAILED
+        job.last_error = str(e)
+    except Exception as e:
+        logger.error("Notification job %s attempt %s failed: %s", job.id, job.attempts, str(e))
+        job.last_error = str(e)
+        if job.attempts >= job.max_attempts:
+            job.status = NotificationJob.STATUS_FAILED
+        else:
+            job.status = NotificationJob.STATUS_PENDING
+            job.run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+    else:
+        job.status = NotificationJob.STATUS_SUCCEEDED
+        job.last_error = ''
+    job.save()
+    return job
+
+
+def requeue_stale_jobs():
+    """ワーカー停止などで実行中のまま残ったジョブを待機中に戻す"""
+    threshold = timezone.now() - timedelta(seconds=STALE_JOB_SECONDS)
+    return NotificationJob.objects.filter(
+        status=NotificationJob.STATUS_RUNNING,
+        updated_at__lt=threshold
+    ).update(status=NotificationJob.STATUS_PENDING, run_at=timezone.now())
+
+
+def evict_render_cache():
+    """古いPDF・画像を削除（処理待ちのジョブが使うファイルは残す）"""
+    active = ShiftNotification.objects.filter(
+        jobs__status__in=[NotificationJob.STATUS_PENDING, NotificationJob.STATUS_RUNNING]
+    ).values_list('pdf_file', 'images__image_file', 'images__preview_file')
+    protected = [name for names in active for name in names]
+    removed = render_cache.evict(protected=protected)
+    if removed:
+        logger.info("Evicted %d cached render files", len(removed))
+    return removed
+
+
+def run_pending_jobs(limit=None):
+    """実行可能なジョブを順に処理し、処理件数を返す"""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def run_worker(poll_interval=1.0):
+    """ジョブを待ち受けて処理し続ける"""
+    requeue_stale_jobs()
+    while True:
+        if run_pending_jobs():
+            evict_render_cache()
+        else:
+            time.sleep(poll_interval)
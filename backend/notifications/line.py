@@ -0,0 +1,21 @@
+import os
+from django.conf import settings
+from notifications.delivery import LineDelivery, LineDeliveryClient
+
+GROUP_ID = os.getenv('LINE_GROUP_ID')
+
+
+def create_client():
+    """設定からLINE送信クライアントを作成"""
+    return LineDeliveryClient(
+        os.getenv('LINE_CHANNEL_ACCESS_TOKEN'),
+        base_url=settings.LINE_API_BASE_URL,
+        max_connections=settings.LINE_MAX_CONNECTIONS,
+        max_concurrent=settings.LINE_MAX_CONCURRENT_PUSHES,
+        timeout=settings.LINE_REQUEST_TIMEOUT_SECONDS,
+        retries=settings.LINE_PUSH_RETRIES
+    )
+
+
+# プロセス内で共有するLINE送信窓口（接続を使い回す）
+line_delivery = LineDelivery(create_client)
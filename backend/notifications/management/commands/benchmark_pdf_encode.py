@@ -0,0 +1,83 @@
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+import fitz  # PyMuPDFライブラリ
+from PIL import Image
+from notifications.management.commands.benchmark_pdf_render import build_sample_pdf
+from notifications.rendering import RENDER_ZOOM, JPEG_QUALITY, render_page
+
+
+def encode_legacy(pdf_path, storage):
+    """従来の変換: Pixmap → PIL → 一時ファイル → 再オープンして保存"""
+    with fitz.open(pdf_path) as pdf_document:
+        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_image:
+            page = pdf_document[0]
+            pix = page.get_pixmap(matrix=fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM)) # type: ignore
+            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples) # type: ignore
+            img.save(temp_image.name, 'JPEG', quality=JPEG_QUALITY)
+        with open(temp_image.name, 'rb') as f:
+            storage.save('legacy.jpg', File(f))
+        os.unlink(temp_image.name)
+
+
+def encode_direct(pdf_path, storage):
+    """現在の変換: PixmapからJPEGを直接エンコードして保存（プレビューも作成）"""
+    image, preview = render_page(pdf_path, 0)
+    storage.save('direct.jpg', ContentFile(image))
+    storage.save('direct_preview.jpg', ContentFile(preview))
+
+
+def measure(name, pdf_path, storage_dir, queue):
+    """別プロセスで実行し、所要時間と最大メモリ使用量の増加分を返す"""
+    storage = FileSystemStorage(location=storage_dir)
+    encode = {'legacy': encode_legacy, 'direct': encode_direct}[name]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    encode(pdf_path, storage)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({'seconds': elapsed, 'peak_rss_increase_kb': peak - baseline})
+
+
+class Command(BaseCommand):
+    help = 'PDF→JPEG変換の従来方式と直接エンコード方式の時間・メモリを比較する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='計測回数（最短時間・最小メモリを採用）')
+        parser.add_argument('--pdf', help='サンプルの代わりに使うPDFファイル')
+
+    def handle(self, *args, **options):
+        results = {}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = options['pdf'] or os.path.join(temp_dir, 'sample.pdf')
+            if not options['pdf']:
+                build_sample_pdf(pdf_path, 1)
+
+            for name in ('legacy', 'direct'):
+                runs = []
+                for i in range(options['repeat']):
+                    queue = multiprocessing.Queue()
+                    storage_dir = os.path.join(temp_dir, f'{name}_{i}')
+                    process = multiprocessing.Process(
+                        target=measure, args=(name, pdf_path, storage_dir, queue)
+                    )
+                    process.start()
+                    runs.append(queue.get())
+                    process.join()
+                results[name] = {
+                    'seconds': round(min(r['seconds'] for r in runs), 4),
+                    'peak_rss_increase_kb': min(r['peak_rss_increase_kb'] for r in runs),
+                }
+                files = os.listdir(os.path.join(temp_dir, f'{name}_0'))
+                results[name]['bytes'] = {
+                    f: os.path.getsize(os.path.join(temp_dir, f'{name}_0', f)) for f in files
+                }
+
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+import fitz  # PyMuPDFライブラリ
+from notifications.rendering import render_pages
+
+
+def build_sample_pdf(path, pages):
+    """シフト表に似た罫線と文字の多いPDFを作成"""
+    with fitz.open() as pdf_document:
+        for number in range(pages):
+            page = pdf_document.new_page(width=842, height=595)  # A4横
+            page.insert_text((40, 30), f"Shift schedule sample page {number + 1}", fontsize=14)
+            for row in range(40):
+                y = 45 + row * 13
+                page.draw_line((20, y), (822, y), width=0.3)
+                page.insert_text((24, y + 10), f"Employee {row:02d}", fontsize=7)
+                for day in range(31):
+                    x = 90 + day * 23.5
+                    page.insert_text((x, y + 10), "9-17" if (row + day) % 3 else "-", fontsize=6)
+            for day in range(32):
+                x = 86 + day * 23.5
+                page.draw_line((x, 45), (x, 565), width=0.3)
+        pdf_document.save(path)
+
+
+class Command(BaseCommand):
+    help = 'PDF→JPEG変換の直列・並列の所要時間を比較する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=10, help='サンプルPDFのページ数')
+        parser.add_argument('--repeat', type=int, default=3, help='計測回数（最短時間を採用）')
+        parser.add_argument('--pdf', help='サンプルの代わりに使うPDFファイル')
+        parser.add_argument('--processes', type=int, help='並列時のプロセス数（省略時はCPU数）')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = options['pdf'] or os.path.join(temp_dir, 'sample.pdf')
+            if not options['pdf']:
+                build_sample_pdf(pdf_path, options['pages'])
+            with fitz.open(pdf_path) as pdf_document:
+                pages = pdf_document.page_count
+
+            def measure(processes):
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    render_pages(pdf_path, range(pages), processes=processes)
+                    timings.append(time.perf_counter() - start)
+                return min(timings)
+
+            serial = measure(1)
+            processes = min(options['processes'] or os.cpu_count() or 1, pages)
+            parallel = measure(processes)
+
+        self.stdout.write(json.dumps({
+            'pages': pages,
+            'processes': processes,
+            'serial_seconds': round(serial, 3),
+            'parallel_seconds': round(parallel, 3),
+            'speedup': round(serial / parallel, 2) if parallel else None,
+        }, indent=2))
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from aiohttp import web
+from django.core.management.base import BaseCommand
+from notifications.delivery import MAX_MESSAGES_PER_PUSH, PUSH_PATH
+
+
+def create_app(delay=0.0, fail_every=0, fail_status=500, log=None):
+    """LINE Messaging APIのpushを受け付けて記録する疑似サーバー
+
+    log: 受け付けたpushの本文（JSON）を1行ずつ渡す関数
+    """
+    pushes = []
+    accepted_keys = set()
+    counter = {'requests': 0}
+
+    async def push(request):
+        counter['requests'] += 1
+        if not request.headers.get('Authorization', '').startswith('Bearer '):
+            return web.json_response({'message': 'Authentication failed'}, status=401)
+        body = await request.json()
+        messages = body.get('messages') or []
+        if not body.get('to') or not 1 <= len(messages) <= MAX_MESSAGES_PER_PUSH:
+            return web.json_response({'message': 'The request body has 1 error(s)'}, status=400)
+        if delay:
+            await asyncio.sleep(delay)
+        # 受付済みのリトライキーは本物のAPIと同じく409を返す
+        retry_key = request.headers.get('X-Line-Retry-Key')
+        if retry_key and retry_key in accepted_keys:
+            return web.json_response({'message': 'The retry key is already accepted'}, status=409)
+        # fail_every 回に1回はエラーを返す（再試行の確認用）
+        if fail_every and counter['requests'] % fail_every == 0:
+            return web.json_response({'message': 'Failed'}, status=fail_status)
+        if retry_key:
+            accepted_keys.add(retry_key)
+        pushes.append(body)
+        if log is not None:
+            log(json.dumps(body, ensure_ascii=False))
+        return web.json_response({})
+
+    async def list_pushes(request):
+        return web.json_response({'requests': counter['requests'], 'pushes': pushes})
+
+    async def clear_pushes(request):
+        pushes.clear()
+        accepted_keys.clear()
+        counter['requests'] = 0
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post(PUSH_PATH, push)
+    app.router.add_get('/fake/pushes', list_pushes)
+    app.router.add_delete('/fake/pushes', clear_pushes)
+    return app
+
+
+class Command(BaseCommand):
+    help = 'ローカル確認用のLINE Messaging API疑似サーバーを起動する（LINE_API_BASE_URL をこのサーバーに向ける）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8090)
+        parser.add_argument('--delay', type=float, default=0.0, help='1回のpushにかける秒数')
+        parser.add_argument('--fail-every', type=int, default=0, help='N回に1回エラーを返す')
+        parser.add_argument('--fail-status', type=int, default=500, help='エラーのステータスコード（429など）')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Fake LINE API on http://{options['host']}:{options['port']}")
+        web.run_app(
+            create_app(
+                delay=options['delay'],
+                fail_every=options['fail_every'],
+                fail_status=options['fail_status'],
+                log=self.stdout.write
+            ),
+            host=options['host'],
+            port=options['port'],
+            print=None
+        )
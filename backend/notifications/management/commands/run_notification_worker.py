@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from notifications.jobs import evict_render_cache, requeue_stale_jobs, run_pending_jobs, run_worker
+
+
+class Command(BaseCommand):
+    help = 'シフト通知ジョブを処理するワーカーを起動する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='ジョブがないときのポーリング間隔（秒）')
+        parser.add_argument('--once', action='store_true',
+                            help='実行可能なジョブを処理したら終了する')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            requeue_stale_jobs()
+            processed = run_pending_jobs()
+            removed = evict_render_cache()
+            self.stdout.write(f'{processed}件のジョブを処理しました')
+            self.stdout.write(f'{len(removed)}件のキャッシュファイルを削除しました')
+            return
+
+        self.stdout.write('通知ワーカーを起動しました')
+        try:
+            run_worker(poll_interval=options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('通知ワーカーを停止しました')
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notificationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shiftnotification',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
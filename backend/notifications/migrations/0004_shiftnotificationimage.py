@@ -0,0 +1,32 @@
+# Generated by Django 5.0 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_shiftnotification_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationjob',
+            name='pages_sent',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ShiftNotificationImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.IntegerField()),
+                ('image_file', models.ImageField(upload_to='shifts/images/')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='notifications.shiftnotification')),
+            ],
+            options={
+                'ordering': ['page'],
+                'unique_together': {('notification', 'page')},
+            },
+        ),
+    ]
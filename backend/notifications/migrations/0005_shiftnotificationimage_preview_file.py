@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_shiftnotificationimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shiftnotificationimage',
+            name='preview_file',
+            field=models.ImageField(blank=True, upload_to='shifts/previews/'),
+        ),
+    ]
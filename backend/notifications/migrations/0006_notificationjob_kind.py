@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-18 20:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_shiftnotificationimage_preview_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationjob',
+            name='kind',
+            field=models.CharField(choices=[('shift_notification', 'シフト表（PDF）の通知'), ('schedule_changes', '公開済みシフトの変更の通知')], default='shift_notification', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='notificationjob',
+            name='notification',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='notifications.shiftnotification'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class ShiftSubmissionForm(models.Model):
     deadline = models.DateTimeField()
@@ -10,5 +11,58 @@ class ShiftSubmissionForm(models.Model):
 class ShiftNotification(models.Model):
     pdf_file = models.FileField(upload_to='shifts/pdfs/')
     image_file = models.ImageField(upload_to='shifts/images/')
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)  # PDFのSHA-256
     message = models.TextField()
-    sent_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+class ShiftNotificationImage(models.Model):
+    """PDFの各ページから変換された画像"""
+    notification = models.ForeignKey(ShiftNotification, on_delete=models.CASCADE, related_name='images')
+    page = models.IntegerField()
+    image_file = models.ImageField(upload_to='shifts/images/')
+    preview_file = models.ImageField(upload_to='shifts/previews/', blank=True)  # LINEのプレビュー用の縮小画像
+
+    class Meta:
+        unique_together = ['notification', 'page']
+        ordering = ['page']
+
+class NotificationJob(models.Model):
+    """通知のバックグラウンドジョブ（DBをキューとして使用）"""
+    KIND_SHIFT_NOTIFICATION = 'shift_notification'
+    KIND_SCHEDULE_CHANGES = 'schedule_changes'
+    KIND_CHOICES = [
+        (KIND_SHIFT_NOTIFICATION, 'シフト表（PDF）の通知'),
+        (KIND_SCHEDULE_CHANGES, '公開済みシフトの変更の通知'),
+    ]
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '待機中'),
+        (STATUS_RUNNING, '実行中'),
+        (STATUS_SUCCEEDED, '完了'),
+        (STATUS_FAILED, '失敗'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, default=KIND_SHIFT_NOTIFICATION)
+    # シフト表の通知のみ。変更の通知は payload に版のIDと差分を持つ
+    notification = models.ForeignKey(
+        ShiftNotification, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    payload = models.JSONField(default=dict, blank=True)
+    text_sent = models.BooleanField(default=False)
+    pages_sent = models.IntegerField(default=0)  # 送信済みの画像枚数
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
@@ -0,0 +1,90 @@
+# アップロードされたPDFと変換済み画像のキャッシュ
+# ファイル内容のSHA-256をファイル名にして、同じPDFの再変換を避ける
+import hashlib
+import os
+import time
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+PDF_DIR = 'shifts/pdfs'
+IMAGE_DIR = 'shifts/images'
+PREVIEW_DIR = 'shifts/previews'
+
+
+def hash_upload(uploaded_file):
+    """アップロードファイルのSHA-256を計算"""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def pdf_name(content_hash):
+    return f'{PDF_DIR}/{content_hash}.pdf'
+
+
+def image_name(content_hash, page=0):
+    return f'{IMAGE_DIR}/{content_hash}_p{page}.jpg'
+
+
+def preview_name(content_hash, page=0):
+    return f'{PREVIEW_DIR}/{content_hash}_p{page}.jpg'
+
+
+def touch(name):
+    """最終利用日時を更新し、ファイルがあれば True を返す（キャッシュのヒット判定を兼ねる）
+
+    exists() で確認してから使うと、その間に evict() で削除される場合があるため、
+    ファイルに直接アクセスして FileNotFoundError をミスとして扱う。
+    """
+    try:
+        os.utime(default_storage.path(name))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def evict(max_age_seconds=None, max_total_bytes=None, protected=()):
+    """古いファイルを削除し、合計サイズを上限以下にする
+
+    protected に含まれるファイル（処理待ちのジョブが使うもの）は削除しない。
+    """
+    if max_age_seconds is None:
+        max_age_seconds = settings.RENDER_CACHE_MAX_AGE_SECONDS
+    if max_total_bytes is None:
+        max_total_bytes = settings.RENDER_CACHE_MAX_BYTES
+    protected = {os.path.normpath(default_storage.path(name)) for name in protected if name}
+
+    entries = []
+    for directory in (PDF_DIR, IMAGE_DIR, PREVIEW_DIR):
+        root = os.path.join(settings.MEDIA_ROOT, directory)
+        if not os.path.isdir(root):
+            continue
+        for entry in os.scandir(root):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, os.path.normpath(entry.path)))
+
+    # 古い順に並べ、期限切れまたはサイズ超過の分を削除
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    now = time.time()
+    removed = []
+    for mtime, size, path in entries:
+        expired = now - mtime > max_age_seconds
+        if not expired and total <= max_total_bytes:
+            break
+        if path in protected:
+            continue
+        try:
+            # 一覧の作成後に touch() で使われたファイルは残す
+            if os.stat(path).st_mtime != mtime:
+                continue
+            os.remove(path)
+        except FileNotFoundError:
+            total -= size
+            continue
+        total -= size
+        removed.append(path)
+    return removed
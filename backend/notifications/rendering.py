@@ -0,0 +1,89 @@
+# PDF→JPEG変換
+# ページごとに別プロセスで変換し、複数ページのPDFも短時間で処理する
+import io
+import multiprocessing
+import os
+import fitz  # PyMuPDFライブラリ
+from PIL import Image
+
+RENDER_ZOOM = 2
+JPEG_QUALITY = 85
+# LINEのプレビュー用画像の幅（px）
+PREVIEW_WIDTH = 240
+PREVIEW_JPEG_QUALITY = 75
+# 1ページあたりの変換時間の上限（秒）
+PAGE_TIMEOUT_SECONDS = 30
+
+
+class RenderError(Exception):
+    """PDFの変換に失敗した"""
+
+
+def page_count(pdf_path):
+    """PDFのページ数"""
+    try:
+        with fitz.open(pdf_path) as pdf_document:
+            return pdf_document.page_count
+    except Exception as e:
+        raise RenderError(f"PDFを開けません: {e}")
+
+
+def encode_jpeg(pix, quality):
+    """PixmapのバッファをコピーせずにPILでJPEGにエンコード"""
+    img = Image.frombuffer(
+        "RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride, 1
+    )
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def render_page(pdf_path, page_number, zoom=RENDER_ZOOM, quality=JPEG_QUALITY):
+    """1ページをJPEGに変換し、(本画像, プレビュー画像) のバイト列を返す
+
+    一時ファイルを経由せずメモリ上でエンコードする。
+    プレビューは縮小した倍率で直接レンダリングする。
+    """
+    with fitz.open(pdf_path) as pdf_document:
+        page = pdf_document[page_number]
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False) # type: ignore
+        image = encode_jpeg(pix, quality)
+        del pix
+
+        preview_zoom = min(PREVIEW_WIDTH / page.rect.width, zoom)
+        preview_pix = page.get_pixmap(matrix=fitz.Matrix(preview_zoom, preview_zoom), alpha=False) # type: ignore
+        preview = encode_jpeg(preview_pix, PREVIEW_JPEG_QUALITY)
+    return image, preview
+
+
+def render_pages(pdf_path, pages, processes=None, timeout=PAGE_TIMEOUT_SECONDS):
+    """複数ページを並列に変換し、ページ番号 → (本画像, プレビュー画像) を返す
+
+    processes を省略した場合はCPU数（ページ数が上限）のプロセスを使う。
+    """
+    pages = sorted(pages)
+    if not pages:
+        return {}
+
+    processes = min(processes or os.cpu_count() or 1, len(pages))
+    if processes == 1:
+        return {page: render_page(pdf_path, page) for page in pages}
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = {
+            page: pool.apply_async(render_page, (pdf_path, page))
+            for page in pages
+        }
+        rendered = {}
+        for page in pages:
+            try:
+                rendered[page] = results[page].get(timeout=timeout)
+            except multiprocessing.TimeoutError:
+                raise RenderError(f"{page + 1}ページ目の変換がタイムアウトしました")
+        pool.close()
+        return rendered
+    finally:
+        # タイムアウト・エラー時は変換中のプロセスも停止する
+        pool.terminate()
+        pool.join()
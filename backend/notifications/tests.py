@@ -1,3 +1,396 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import fitz
+from aiohttp.test_utils import TestServer
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from linebot.models import TextSendMessage
+from PIL import Image
+
+from accounts.models import Employee
+from notifications import jobs, render_cache, rendering
+from notifications.delivery import LineDeliveryClient, LineDeliveryError
+from notifications.line import GROUP_ID
+from notifications.management.commands.run_fake_line_server import create_app
+from notifications.models import NotificationJob, ShiftNotification, ShiftNotificationImage
+from shifts.publishing import publish_schedule
+
+
+def make_pdf(pages):
+    """ページ番号を書いた小さなPDF"""
+    with fitz.open() as pdf:
+        for page in range(pages):
+            pdf.new_page(width=200, height=100).insert_text((20, 50), f'page {page + 1}')
+        return pdf.tobytes()
+
+
+def use_media_root(test):
+    """一時ディレクトリを MEDIA_ROOT にする（テスト終了時に削除）"""
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    settings = override_settings(MEDIA_ROOT=media_root)
+    settings.enable()
+    test.addCleanup(settings.disable)
+    return media_root
+
+
+def create_job(pages=3, message='今月のシフトです', **fields):
+    notification = ShiftNotification.objects.create(
+        pdf_file='shifts/pdfs/test.pdf', image_file='shifts/images/test-0.jpg', message=message
+    )
+    ShiftNotificationImage.objects.bulk_create([
+        ShiftNotificationImage(
+            notification=notification,
+            page=page,
+            image_file=f'shifts/images/test-{page}.jpg',
+            preview_file=f'shifts/previews/test-{page}.jpg'
+        )
+        for page in range(pages)
+    ])
+    return NotificationJob.objects.create(
+        notification=notification, payload={'base_url': 'https://example.com'}, **fields
+    )
+
+
+class JobQueueTest(TestCase):
+    """ジョブの取得・再試行・再投入"""
+
+    def test_claim_marks_running_once(self):
+        job = create_job()
+        claimed = jobs.claim_next_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, NotificationJob.STATUS_RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        # 実行中のジョブは他のワーカーに渡さない
+        self.assertIsNone(jobs.claim_next_job())
+
+    def test_claim_skips_future_jobs(self):
+        create_job(run_at=timezone.now() + timedelta(minutes=5))
+        self.assertIsNone(jobs.claim_next_job())
+
+    def test_retry_delay_backs_off_to_maximum(self):
+        self.assertEqual(jobs.retry_delay(1), jobs.RETRY_BASE_SECONDS)
+        self.assertEqual(jobs.retry_delay(2), jobs.RETRY_BASE_SECONDS * 2)
+        self.assertEqual(jobs.retry_delay(3), jobs.RETRY_BASE_SECONDS * 4)
+        self.assertEqual(jobs.retry_delay(20), jobs.RETRY_MAX_SECONDS)
+
+    def test_requeue_stale_running_jobs(self):
+        stale = create_job(status=NotificationJob.STATUS_RUNNING)
+        fresh = create_job(status=NotificationJob.STATUS_RUNNING)
+        NotificationJob.objects.filter(id=stale.id).update(
+            updated_at=timezone.now() - timedelta(seconds=jobs.STALE_JOB_SECONDS + 1)
+        )
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, NotificationJob.STATUS_PENDING)
+        self.assertEqual(fresh.status, NotificationJob.STATUS_RUNNING)
+
+    @mock.patch('notifications.jobs.line_delivery')
+    def test_transient_error_is_retried_with_backoff(self, delivery):
+        delivery.send.side_effect = LineDeliveryError('error', status=500)
+        create_job()
+        job = jobs.run_job(jobs.claim_next_job())
+        self.assertEqual(job.status, NotificationJob.STATUS_PENDING)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=jobs.RETRY_BASE_SECONDS - 5))
+
+    @mock.patch('notifications.jobs.line_delivery')
+    def test_client_error_fails_without_retry(self, delivery):
+        delivery.send.side_effect = LineDeliveryError('unauthorized', status=401)
+        create_job()
+        job = jobs.run_job(jobs.claim_next_job())
+        self.assertEqual(job.status, NotificationJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    @mock.patch('notifications.jobs.line_delivery')
+    def test_rate_limit_is_retried(self, delivery):
+        delivery.send.side_effect = LineDeliveryError('too many requests', status=429)
+        create_job()
+        self.assertEqual(jobs.run_job(jobs.claim_next_job()).status, NotificationJob.STATUS_PENDING)
+
+    @mock.patch('notifications.jobs.line_delivery')
+    def test_resume_after_partial_send(self, delivery):
+        # テキストと1ページ目まで送信して失敗
+        delivery.send.side_effect = LineDeliveryError('error', status=503, sent=2)
+        create_job(pages=3)
+        job = jobs.run_job(jobs.claim_next_job())
+        self.assertTrue(job.text_sent)
+        self.assertEqual(job.pages_sent, 1)
+
+        delivery.send.side_effect = None
+        delivery.send.return_value = 2
+        NotificationJob.objects.filter(id=job.id).update(run_at=timezone.now())
+        job = jobs.run_job(jobs.claim_next_job())
+        self.assertEqual(job.status, NotificationJob.STATUS_SUCCEEDED)
+
+        # 再試行ではテキストを送らず、残りの2ページだけを送る
+        _, messages = delivery.send.call_args.args
+        self.assertEqual(
+            [m.original_content_url for m in messages],
+            ['https://example.com/media/shifts/images/test-1.jpg',
+             'https://example.com/media/shifts/images/test-2.jpg']
+        )
+
+
+class LineDeliveryClientTest(SimpleTestCase):
+    """疑似LINEサーバーに対する送信（分割・再送・途中失敗）"""
+
+    async def send(self, count, retries=2, **options):
+        """count 件を送り、(送信できた件数, エラー, サーバーが受け付けたpush) を返す"""
+        messages = [TextSendMessage(text=f'message {i}') for i in range(count)]
+        async with TestServer(create_app(**options)) as server:
+            client = LineDeliveryClient('token', str(server.make_url('')), retries=retries, retry_backoff=0)
+            error = None
+            try:
+                sent = await client.send('U1', messages)
+            except LineDeliveryError as e:
+                sent, error = e.sent, e
+            async with client._get_session().get(server.make_url('/fake/pushes')) as response:
+                recorded = await response.json()
+            await client.close()
+        return sent, error, recorded
+
+    async def test_messages_are_split_into_pushes_of_five(self):
+        sent, error, recorded = await self.send(12)
+        self.assertIsNone(error)
+        self.assertEqual(sent, 12)
+        self.assertEqual([len(push['messages']) for push in recorded['pushes']], [5, 5, 2])
+        self.assertEqual(recorded['pushes'][2]['messages'][1]['text'], 'message 11')
+
+    async def test_server_error_is_retried(self):
+        # 2回目のリクエスト（2つ目のpush）だけ500
+        sent, error, recorded = await self.send(10, fail_every=2)
+        self.assertIsNone(error)
+        self.assertEqual(sent, 10)
+        self.assertEqual(recorded['requests'], 3)
+        self.assertEqual(len(recorded['pushes']), 2)
+
+    async def test_rate_limit_is_retried(self):
+        sent, error, recorded = await self.send(5, fail_every=1, fail_status=429, retries=1)
+        # 毎回429なので再送しても失敗し、何も届かない
+        self.assertEqual(error.status, 429)
+        self.assertEqual(sent, 0)
+        self.assertEqual(recorded['requests'], 2)
+
+    async def test_partial_failure_reports_sent_count(self):
+        # 再送なしで2つ目のpushが失敗 → 最初の5件だけ届いている
+        sent, error, recorded = await self.send(7, fail_every=2, retries=0)
+        self.assertEqual(error.status, 500)
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(recorded['pushes']), 1)
+
+    async def test_client_error_is_not_retried(self):
+        sent, error, recorded = await self.send(3, fail_every=1, fail_status=400)
+        self.assertEqual(error.status, 400)
+        self.assertFalse(error.retryable)
+        self.assertEqual(recorded['requests'], 1)
+
+
+class ScheduleChangeJobTest(TestCase):
+    """公開済みシフトの変更通知ジョブ"""
+
+    def setUp(self):
+        alice = Employee.objects.create(name='Alice', line_user_id='U1')
+        bob = Employee.objects.create(name='Bob')
+        nine, five = datetime.time(9, 0), datetime.time(17, 0)
+        day = datetime.date(2030, 1, 7)
+        publish_schedule(2030, 1, [
+            {'employee_id': alice.id, 'date': day, 'start_time': nine, 'end_time': five},
+            {'employee_id': bob.id, 'date': day, 'start_time': nine, 'end_time': five},
+        ])
+        schedule, diff = publish_schedule(2030, 1, [
+            {'employee_id': alice.id, 'date': day, 'start_time': nine, 'end_time': datetime.time(15, 0)},
+            {'employee_id': bob.id, 'date': day, 'start_time': datetime.time(10, 0), 'end_time': five},
+        ])
+        self.job = jobs.enqueue_schedule_changes(schedule, diff)
+
+    @mock.patch('notifications.jobs.line_delivery')
+    def test_retry_sends_only_to_remaining(self, delivery):
+        delivery.send_many.return_value = {'U1': 1, GROUP_ID: LineDeliveryError('error', status=500)}
+        job = jobs.run_job(jobs.claim_next_job())
+        self.assertEqual(job.status, NotificationJob.STATUS_PENDING)
+        self.assertEqual(job.payload['sent_to'], ['U1'])
+        # Aliceには個別に、LINEのユーザーIDのないBobはグループに送る
+        sent = delivery.send_many.call_args.args[0]
+        self.assertEqual(set(sent), {'U1', GROUP_ID})
+        self.assertIn('9:00-17:00 → 9:00-15:00', sent['U1'][0].text)
+
+        delivery.send_many.return_value = {GROUP_ID: 1}
+        NotificationJob.objects.filter(id=job.id).update(run_at=timezone.now())
+        job = jobs.run_job(jobs.claim_next_job())
+        self.assertEqual(job.status, NotificationJob.STATUS_SUCCEEDED)
+        self.assertEqual(list(delivery.send_many.call_args.args[0]), [GROUP_ID])
+
+    @mock.patch('notifications.jobs.line_delivery')
+    def test_invalid_recipient_fails_job(self, delivery):
+        delivery.send_many.return_value = {'U1': LineDeliveryError('bad user', status=400), GROUP_ID: 1}
+        job = jobs.run_job(jobs.claim_next_job())
+        self.assertEqual(job.status, NotificationJob.STATUS_FAILED)
+        self.assertEqual(job.payload['failed_to'], ['U1'])
+        self.assertEqual(job.payload['sent_to'], [GROUP_ID])
+
+
+class RenderCacheTest(TestCase):
+    """アップロードされたPDF・変換済み画像のキャッシュ"""
+
+    def setUp(self):
+        self.media_root = use_media_root(self)
+        self.pdf = make_pdf(2)
+
+    def upload(self):
+        response = self.client.post('/api/notifications/send-shift-notification/', {
+            'file': SimpleUploadedFile('shift.pdf', self.pdf, content_type='application/pdf'),
+            'message': '今月のシフトです',
+        })
+        self.assertEqual(response.status_code, 202)
+        return NotificationJob.objects.get(id=response.json()['job_id']).notification
+
+    def pdf_files(self):
+        return os.listdir(os.path.join(self.media_root, render_cache.PDF_DIR))
+
+    def test_same_pdf_is_reused(self):
+        first = self.upload()
+        second = self.upload()
+        self.assertEqual(second.pdf_file.name, render_cache.pdf_name(first.content_hash))
+        self.assertEqual(self.pdf_files(), [f'{first.content_hash}.pdf'])
+
+    def test_removed_pdf_is_saved_again(self):
+        first = self.upload()
+        os.remove(first.pdf_file.path)
+        self.assertFalse(render_cache.touch(first.pdf_file.name))
+
+        second = self.upload()
+        self.assertEqual(second.pdf_file.name, render_cache.pdf_name(first.content_hash))
+        with open(second.pdf_file.path, 'rb') as f:
+            self.assertEqual(f.read(), self.pdf)
+
+    def write(self, name, size, age):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_evict_removes_expired_and_oldest_files(self):
+        expired = self.write(render_cache.pdf_name('expired'), 10, age=1000)
+        old = self.write(render_cache.image_name('old'), 10, age=100)
+        protected = self.write(render_cache.image_name('protected'), 10, age=50)
+        new = self.write(render_cache.preview_name('new'), 10, age=10)
+
+        removed = render_cache.evict(
+            max_age_seconds=500, max_total_bytes=20, protected=[render_cache.image_name('protected')]
+        )
+        self.assertEqual(removed, [expired, old])
+        self.assertTrue(os.path.exists(protected))
+        self.assertTrue(os.path.exists(new))
+
+    def test_evict_keeps_file_used_after_scan(self):
+        path = self.write(render_cache.pdf_name('used'), 10, age=1000)
+        scandir = os.scandir
+
+        def scan_then_use(root):
+            entries = list(scandir(root))
+            render_cache.touch(render_cache.pdf_name('used'))
+            return iter(entries)
+
+        with mock.patch('notifications.render_cache.os.scandir', scan_then_use):
+            self.assertEqual(render_cache.evict(max_age_seconds=500, max_total_bytes=100), [])
+        self.assertTrue(os.path.exists(path))
+
+
+class RenderPagesTest(SimpleTestCase):
+    """複数ページのPDFのプロセスプールでの変換"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.pdf_path = os.path.join(directory, 'shift.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(make_pdf(3))
+
+    def test_pages_are_rendered_in_pool(self):
+        self.assertEqual(rendering.page_count(self.pdf_path), 3)
+        rendered = rendering.render_pages(self.pdf_path, [2, 0, 1], processes=2)
+        self.assertEqual(sorted(rendered), [0, 1, 2])
+        serial = {page: rendering.render_page(self.pdf_path, page) for page in range(3)}
+        for page, (image, preview) in rendered.items():
+            self.assertEqual(image[:3], b'\xff\xd8\xff')  # JPEG
+            self.assertEqual(image, serial[page][0])
+        # ページごとに内容が違う
+        self.assertEqual(len({image for image, _ in rendered.values()}), 3)
+
+    def test_preview_is_downscaled_jpeg(self):
+        image, preview = rendering.render_page(self.pdf_path, 0)
+        with Image.open(io.BytesIO(image)) as full, Image.open(io.BytesIO(preview)) as small:
+            self.assertEqual((full.format, small.format), ('JPEG', 'JPEG'))
+            # 幅200ptのページを2倍で変換し、プレビューは PREVIEW_WIDTH に縮小する
+            self.assertEqual(full.size, (400, 200))
+            self.assertEqual(small.size, (rendering.PREVIEW_WIDTH, 120))
+        self.assertLess(len(preview), len(image))
+
+    def test_invalid_pdf_raises_render_error(self):
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b'not a pdf')
+        with self.assertRaises(rendering.RenderError):
+            rendering.page_count(self.pdf_path)
+
+
+class NotificationImagesTest(TestCase):
+    """通知のPDFの全ページを画像にして保存"""
+
+    def setUp(self):
+        self.media_root = use_media_root(self)
+
+    def create_notification(self, pages=3):
+        pdf = make_pdf(pages)
+        notification = ShiftNotification(content_hash=f'pdf{pages}', message='今月のシフトです')
+        notification.pdf_file.save('shift.pdf', SimpleUploadedFile('shift.pdf', pdf), save=False)
+        notification.save()
+        return notification
+
+    def test_all_pages_are_saved_in_order(self):
+        notification = self.create_notification()
+        jobs.render_notification_images(notification)
+        images = list(notification.images.order_by('page'))
+        self.assertEqual([image.page for image in images], [0, 1, 2])
+        self.assertEqual(
+            [image.image_file.name for image in images],
+            [render_cache.image_name('pdf3', page) for page in range(3)]
+        )
+        self.assertEqual(notification.image_file.name, images[0].image_file.name)
+
+    def test_previews_are_saved_for_each_page(self):
+        notification = self.create_notification(pages=2)
+        jobs.render_notification_images(notification)
+        for image in notification.images.all():
+            self.assertEqual(image.preview_file.name, render_cache.preview_name('pdf2', image.page))
+            with image.preview_file.open('rb') as f:
+                self.assertEqual(Image.open(f).width, rendering.PREVIEW_WIDTH)
+        # 一時ファイルを経由せず、画像とプレビューだけを保存する
+        saved = sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root) for name in names
+        )
+        self.assertEqual(saved, sorted([
+            notification.pdf_file.name,
+            *(render_cache.image_name('pdf2', page) for page in range(2)),
+            *(render_cache.preview_name('pdf2', page) for page in range(2)),
+        ]))
+
+    def test_rendered_pages_are_reused(self):
+        jobs.render_notification_images(self.create_notification())
+        with mock.patch('notifications.jobs.rendering.render_pages') as render_pages:
+            notification = self.create_notification()
+            jobs.render_notification_images(notification)
+        render_pages.assert_not_called()
+        self.assertEqual(notification.images.count(), 3)
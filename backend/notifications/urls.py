@@ -5,4 +5,5 @@ from . import views
 urlpatterns = [
     path('send-shift-form/', views.send_shift_form, name='send_shift_form'),
     path('send-shift-notification/', views.send_shift_notification, name='send_shift_notification'),
+    path('jobs/<int:job_id>/', views.notification_job_status, name='notification_job_status'),
 ]
\ No newline at end of file
@@ -1,26 +1,19 @@
 # 必要なライブラリのインポート
 import logging
 import os
-import tempfile
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
-from linebot import LineBotApi
-from linebot.models import TextSendMessage, ImageSendMessage
-import fitz  # PyMuPDFライブラリ
-from PIL import Image
-import tempfile
-import os
-from django.core.files import File
-from notifications.models import ShiftNotification, ShiftSubmissionForm
+from linebot.models import TextSendMessage
+from notifications import render_cache
+from notifications.jobs import enqueue_shift_notification
+from notifications.line import line_delivery, GROUP_ID
+from notifications.models import ShiftNotification, ShiftSubmissionForm, NotificationJob
 from django.utils import timezone
 from django.conf import settings
 
-# LINE Bot APIの初期化
-line_bot_api = LineBotApi(os.getenv('LINE_CHANNEL_ACCESS_TOKEN'))
-GROUP_ID = os.getenv('LINE_GROUP_ID')
-
 logger = logging.getLogger(__name__)
 
 # シフト提出フォームの送信エンドポイント
@@ -59,10 +52,9 @@ def send_shift_form(request):
             raise ValueError("LINE_GROUP_ID が設定されていません")
         
         # LINEグループにメッセージとURLを送信
-        line_bot_api.push_message(
-            GROUP_ID,
+        line_delivery.send(GROUP_ID, [
             TextSendMessage(text=f"{form.message}\n{form.form_url}")
-        )
+        ])
         
         return JsonResponse({'status': 'success'})
         
@@ -88,76 +80,56 @@ def send_shift_notification(request):
         # メディアディレクトリの存在確認
         os.makedirs(os.path.join(settings.MEDIA_ROOT, 'shifts/pdfs'), exist_ok=True)
         os.makedirs(os.path.join(settings.MEDIA_ROOT, 'shifts/images'), exist_ok=True)
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'shifts/previews'), exist_ok=True)
 
-        # PDFファイルとメッセージを保存
+        # PDFファイルとメッセージを保存（同じ内容のPDFは保存済みのものを使う）
+        upload = request.FILES['file']
+        content_hash = render_cache.hash_upload(upload)
         notification = ShiftNotification(
-            pdf_file=request.FILES['file'],
+            content_hash=content_hash,
             message=request.POST.get('message', '')
         )
+        pdf_name = render_cache.pdf_name(content_hash)
+        if render_cache.touch(pdf_name):
+            notification.pdf_file.name = pdf_name
+        else:
+            notification.pdf_file.save(f'{content_hash}.pdf', upload, save=False)
         notification.save()
-        
-        try:
-            # PDFファイルを画像に変換
-            pdf_document = fitz.open(notification.pdf_file.path)
-            
-            # 一時ファイルを作成
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_image:
-                # 最初のページのみを処理
-                page = pdf_document[0]
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2)) # type: ignore
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples) # type: ignore
-                img.save(temp_image.name, 'JPEG', quality=85)
-                
-                # 画像をモデルに保存
-                notification.image_file.save(
-                    f'shift_page_0.jpg',
-                    File(open(temp_image.name, 'rb'))
-                )
-                
-                # 一時ファイルを削除
-                temp_image_path = temp_image.name
-
-            # PDFを閉じる
-            pdf_document.close()
-            
-            # 一時ファイルを削除
-            if os.path.exists(temp_image_path):
-                os.unlink(temp_image_path)
-            
-            # LINEにメッセージを送信
-            if notification.message:
-                line_bot_api.push_message(
-                    GROUP_ID,
-                    TextSendMessage(text=notification.message)
-                )
 
-            # 画像のURLを生成して送信
-            image_url = request.build_absolute_uri(notification.image_file.url)
-            
-            line_bot_api.push_message(
-                GROUP_ID,
-                ImageSendMessage(
-                    original_content_url=image_url,
-                    preview_image_url=image_url
-                )
-            )
-
-            return JsonResponse({'status': 'success'})
+        # 画像変換とLINE送信はワーカーで実行する
+        job = enqueue_shift_notification(
+            notification,
+            base_url=request.build_absolute_uri('/')
+        )
 
-        except Exception as e:
-            # エラー時は作成したファイルを削除
-            if notification.pdf_file:
-                if os.path.exists(notification.pdf_file.path):
-                    os.remove(notification.pdf_file.path)
-            if notification.image_file:
-                if os.path.exists(notification.image_file.path):
-                    os.remove(notification.image_file.path)
-            notification.delete()
-            raise e
+        return JsonResponse({
+            'status': 'accepted',
+            'job_id': job.id
+        }, status=202)
 
     except Exception as e:
         logger.error("Error in send_shift_notification: %s", str(e))
         return JsonResponse({
             'status': 'error',
             'message': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+# 通知ジョブの状態確認エンドポイント
+@api_view(['GET'])
+def notification_job_status(request, job_id):
+    job = get_object_or_404(NotificationJob, id=job_id)
+    return JsonResponse({
+        'status': 'success',
+        'job': {
+            'id': job.id,
+            'kind': job.kind,
+            'notification_id': job.notification_id,
+            'status': job.status,
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'next_run_at': job.run_at.isoformat() if job.status == NotificationJob.STATUS_PENDING else None,
+            'last_error': job.last_error,
+            'created_at': job.created_at.isoformat(),
+            'updated_at': job.updated_at.isoformat(),
+        }
+    })
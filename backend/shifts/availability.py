@@ -0,0 +1,82 @@
+"""勤務可能スロットのビット列（ShiftRequestSummary.availability）の一括読み込み
+
+月内の全従業員分のビット列を1つのバッファに連結し、np.unpackbits で
+「従業員 × 日 × 15分スロット」の行列に展開する。
+行ごとにモデルや区間を組み立てないため、月全体の集計がベクトル演算だけで済む。
+"""
+import calendar
+
+import numpy as np
+
+from .models import (
+    AVAILABILITY_BYTES, AVAILABILITY_MAX_DAYS, AVAILABILITY_SLOT_MINUTES,
+    AVAILABILITY_SLOTS_PER_DAY, ShiftRequest,
+)
+
+
+def unpack_availability(blobs, days=AVAILABILITY_MAX_DAYS):
+    """ビット列のリストを (件数, days, 96) の bool 行列に展開（空・短いビット列は0埋め）"""
+    # 通常はすべて同じ長さなので、コピーせずそのまま1つのバッファに連結する
+    buffer = b''.join(
+        blob if blob is not None and len(blob) == AVAILABILITY_BYTES
+        else bytes(blob or b'').ljust(AVAILABILITY_BYTES, b'\0')
+        for blob in blobs
+    )
+    count = len(buffer) // AVAILABILITY_BYTES
+    packed = np.frombuffer(buffer, dtype=np.uint8).reshape(count, AVAILABILITY_BYTES)
+    bits = np.unpackbits(packed, axis=1).reshape(
+        count, AVAILABILITY_MAX_DAYS, AVAILABILITY_SLOTS_PER_DAY
+    )
+    return bits[:, :days, :].view(bool)
+
+
+class MonthAvailability:
+    """1ヶ月分の勤務可能行列"""
+
+    def __init__(self, year, month, request_ids, employee_ids, matrix, employee_values=None):
+        self.year = year
+        self.month = month
+        self.request_ids = request_ids  # (E,) ShiftRequest の id
+        self.employee_ids = employee_ids  # (E,) Employee の id
+        self.matrix = matrix  # (E, D, S) bool
+        self.employee_values = employee_values  # (E, F) load() の employee_fields の値
+
+    @classmethod
+    def load(cls, year, month, queryset=None, employee_fields=()):
+        """指定月に提出された ShiftRequest のビット列を読み込む（従業員の登録順）
+
+        queryset で対象の ShiftRequest を絞り込める（例: 新人を除外）。
+        employee_fields に指定した Employee の項目も同じクエリで読み込む。
+        """
+        queryset = ShiftRequest.objects.all() if queryset is None else queryset
+        rows = queryset.filter(year=year, month=month).order_by(
+            'employee__created_at', 'employee_id'
+        ).values_list(
+            'id', 'employee_id', 'summary__availability',
+            *[f'employee__{field}' for field in employee_fields]
+        )
+
+        # 1回のクエリの結果を列ごとに分ける（ビット列の列はそのまま1つのバッファに連結）
+        columns = list(zip(*rows)) or [()] * (3 + len(employee_fields))
+        request_ids, employee_ids, blobs, *values = columns
+        days = calendar.monthrange(year, month)[1]
+        return cls(
+            year, month,
+            np.array(request_ids, dtype=np.int64),
+            np.array(employee_ids, dtype=np.int64),
+            unpack_availability(blobs, days),
+            np.array(values).T.reshape(len(request_ids), len(employee_fields)),
+        )
+
+    def coverage(self):
+        """日 × スロットごとの勤務可能人数 (D, S)"""
+        return self.matrix.sum(axis=0, dtype=np.int32)
+
+    def hours(self):
+        """従業員ごとの月間勤務可能時間 (E,)"""
+        return self.matrix.sum(axis=(1, 2)) * AVAILABILITY_SLOT_MINUTES / 60
+
+    def overlap_hours(self):
+        """従業員どうしの勤務可能時間の重なり (E, E)"""
+        flat = self.matrix.reshape(len(self.matrix), -1).astype(np.float32)
+        return flat @ flat.T * AVAILABILITY_SLOT_MINUTES / 60
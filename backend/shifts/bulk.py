@@ -0,0 +1,87 @@
+"""シフト詳細の一括書き込み"""
+from django.db import transaction
+
+
+def sync_details(model, parent_field, parent, details, fields):
+    """詳細行を日付単位で差分更新する
+
+    details は検証済みの辞書のリスト。既存行と比較して
+    追加・更新・削除をそれぞれ一括で実行する。
+    """
+    incoming = {detail['date']: detail for detail in details}
+    existing = {
+        obj.date: obj
+        for obj in model.objects.filter(**{parent_field: parent})
+    }
+
+    to_create = []
+    to_update = []
+    for date, detail in incoming.items():
+        values = {field: detail.get(field, _default(model, field)) for field in fields}
+        obj = existing.get(date)
+        if obj is None:
+            to_create.append(model(**{parent_field: parent}, date=date, **values))
+        elif any(getattr(obj, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(obj, field, value)
+            to_update.append(obj)
+
+    stale = [obj.pk for date, obj in existing.items() if date not in incoming]
+
+    with transaction.atomic():
+        if stale:
+            model.objects.filter(pk__in=stale).delete()
+        if to_update:
+            model.objects.bulk_update(to_update, fields)
+        if to_create:
+            model.objects.bulk_create(to_create)
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(stale),
+    }
+
+
+def patch_details(model, parent_field, parent, changes, deleted, fields):
+    """指定した日付の詳細行だけを追加・更新・削除する
+
+    changes は日付 → 変更するフィールドの辞書。
+    指定されなかったフィールドは既存の値（新規の場合は既定値）のまま。
+    """
+    existing = {
+        obj.date: obj
+        for obj in model.objects.filter(
+            **{parent_field: parent},
+            date__in=set(changes) | set(deleted)
+        )
+    }
+
+    to_create = []
+    to_update = []
+    for date, values in changes.items():
+        obj = existing.get(date)
+        if obj is None:
+            defaults = {field: _default(model, field) for field in fields}
+            defaults.update(values)
+            to_create.append(model(**{parent_field: parent}, date=date, **defaults))
+        else:
+            for field, value in values.items():
+                setattr(obj, field, value)
+            to_update.append(obj)
+
+    stale = [existing[date].pk for date in deleted if date in existing]
+
+    with transaction.atomic():
+        if stale:
+            model.objects.filter(pk__in=stale).delete()
+        if to_update:
+            model.objects.bulk_update(to_update, fields)
+        if to_create:
+            model.objects.bulk_create(to_create)
+
+    return sorted(to_create + to_update, key=lambda obj: obj.date)
+
+
+def _default(model, field):
+    return model._meta.get_field(field).get_default()
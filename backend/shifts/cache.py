@@ -0,0 +1,82 @@
+"""シフト履歴のキャッシュ
+
+(employee_id, year, month) ごとにシリアライズ済みの履歴を保持する。
+year / month を指定しない一覧も同じキーの形式で保持し、書き込み時に
+該当する組み合わせをまとめて削除する。
+保存時のETagも合わせて保持し、現在のETagと違う場合は使わない
+（削除が届かなかった古い内容を新しいETagで返さないため）。
+ヒット・ミス数も同じキャッシュに incr で数え、共有バックエンドでは全ワーカーの合計になる。
+"""
+from django.core.cache import caches
+from django.db import transaction
+
+HISTORY_CACHE_ALIAS = 'history'
+ALL = 'all'
+STATS = ('hits', 'misses', 'invalidations')
+
+
+def _cache():
+    return caches[HISTORY_CACHE_ALIAS]
+
+
+def _key(employee_id, year, month):
+    return f'history:{employee_id}:{year if year is not None else ALL}:{month if month is not None else ALL}'
+
+
+def _stats_key(name):
+    return f'history-stats:{name}'
+
+
+def _count(name, value=1):
+    key = _stats_key(name)
+    # 数はキャッシュの有効期限で消さない
+    _cache().add(key, 0, timeout=None)
+    try:
+        _cache().incr(key, value)
+    except ValueError:
+        # add と incr の間に削除された場合は数え直す
+        _cache().add(key, value, timeout=None)
+
+
+def get_history(employee_id, year, month, loader, etag=None):
+    """キャッシュから履歴を取得（なければ、または etag が違えば loader で作成して保存）"""
+    key = _key(employee_id, year, month)
+    entry = _cache().get(key)
+    if entry is not None and entry[0] == etag:
+        _count('hits')
+        return entry[1]
+
+    _count('misses')
+    data = loader()
+    _cache().set(key, (etag, data))
+    return data
+
+
+def invalidate_history(employee_id, months):
+    """指定した月を含む履歴のキャッシュを削除
+
+    months は (year, month) のリスト。トランザクション中に呼んだ場合はコミット後に削除する
+    （コミット前に削除すると、その間の読み込みで変更前の内容が再びキャッシュされるため）。
+    """
+    keys = {_key(employee_id, None, None)}
+    for year, month in months:
+        keys.update([
+            _key(employee_id, year, month),
+            _key(employee_id, year, None),
+            _key(employee_id, None, month),
+        ])
+
+    def delete():
+        _cache().delete_many(list(keys))
+        _count('invalidations')
+
+    transaction.on_commit(delete)
+
+
+def cache_stats():
+    """ヒット・ミス数（キャッシュを共有する全ワーカーの合計）"""
+    values = _cache().get_many([_stats_key(name) for name in STATS])
+    stats = {name: values.get(_stats_key(name), 0) for name in STATS}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+    return stats
@@ -0,0 +1,63 @@
+"""スロットごとの勤務可能人数（ヒートマップ）の集計
+
+勤務可能スロットのビット列を行列に展開し、スキルごとの重み行列との積で人数を求める。
+"""
+import calendar
+import datetime
+
+import numpy as np
+
+from .availability import MonthAvailability
+from .models import AVAILABILITY_SLOT_MINUTES, ShiftRequest
+
+SLOT_MINUTES_CHOICES = (15, 30)
+
+# 内訳を出すスキル
+COVERAGE_SKILLS = [
+    'can_open',
+    'can_close_cleaning',
+    'can_close_cashier',
+    'can_close_floor',
+    'can_order',
+]
+
+
+def coverage_heatmap(year, month, slot_minutes=15):
+    """指定月の日 × スロットごとの勤務可能人数を集計（新人は除外）"""
+    if slot_minutes not in SLOT_MINUTES_CHOICES:
+        raise ValueError(f"slot_minutes は {SLOT_MINUTES_CHOICES} のいずれかである必要があります")
+
+    days = calendar.monthrange(year, month)[1]
+    slots = 24 * 60 // slot_minutes
+
+    data = MonthAvailability.load(
+        year, month,
+        ShiftRequest.objects.filter(employee__is_beginner=False),
+        employee_fields=COVERAGE_SKILLS,
+    )
+    # スロット全体をカバーしている場合のみ数える（30分なら15分スロット2つとも勤務可能）
+    per_slot = slot_minutes // AVAILABILITY_SLOT_MINUTES
+    available = data.matrix.reshape(len(data.matrix), days, slots, per_slot).all(axis=3)
+
+    # 列: 全体 + スキルごと
+    weights = np.ones((len(available), 1 + len(COVERAGE_SKILLS)), dtype=np.int32)
+    weights[:, 1:] = data.employee_values.astype(bool)
+    counts = (weights.T @ available.reshape(len(available), -1).astype(np.int32)).reshape(
+        1 + len(COVERAGE_SKILLS), days, slots
+    )
+
+    return {
+        'year': year,
+        'month': month,
+        'slot_minutes': slot_minutes,
+        'slot_times': [
+            datetime.time(s * slot_minutes // 60, s * slot_minutes % 60)
+            for s in range(slots)
+        ],
+        'dates': [datetime.date(year, month, d) for d in range(1, days + 1)],
+        'total': counts[0].tolist(),
+        'skills': {
+            skill: counts[k + 1].tolist()
+            for k, skill in enumerate(COVERAGE_SKILLS)
+        },
+    }
@@ -0,0 +1,116 @@
+"""提出状況の変更の配信（Server-Sent Events）
+
+提出・リセットのたびに同じプロセス内の購読者（SSEの接続）へ変更を送る。
+購読者は (year, month) ごとに登録し、各接続のイベントループのキューに渡す。
+配信はプロセス内だけなので、ASGIサーバーは1プロセスで動かす
+（複数プロセスの場合は接続したプロセスで処理された変更だけが届く）。
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ShiftSubmissionStatus
+
+# キューがあふれた（クライアントが読み遅れた）ときに送る、全件の取り直しの合図
+RESYNC = object()
+
+
+def format_event(event, data):
+    """SSEの1イベント分の文字列"""
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)}\n\n'
+
+
+class SubmissionEvents:
+    """(year, month) ごとの購読者に提出状況の変更を配信する"""
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, year, month):
+        """実行中のイベントループで受け取るキューを登録"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_queue))
+        with self._lock:
+            self._subscribers.setdefault((year, month), set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, year, month, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get((year, month))
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[(year, month)]
+
+    def publish(self, year, month, data):
+        """変更を配信（ビューなど同期のコードから呼べる）"""
+        with self._lock:
+            subscribers = list(self._subscribers.get((year, month), ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, data)
+            except RuntimeError:
+                # 接続のイベントループが終了済み
+                pass
+
+    @staticmethod
+    def _put(queue, data):
+        if queue.full():
+            # 読み遅れたクライアントには溜まった変更の代わりに全件を送り直す
+            while not queue.empty():
+                queue.get_nowait()
+            data = RESYNC
+        queue.put_nowait(data)
+
+
+submission_events = SubmissionEvents()
+
+
+def publish_submission_status(employee_id, year, month, is_submitted, submitted_at=None):
+    """1人分の提出状況の変更を配信"""
+    submission_events.publish(year, month, {
+        'employee_id': employee_id,
+        'year': year,
+        'month': month,
+        'is_submitted': is_submitted,
+        'submitted_at': submitted_at,
+    })
+
+
+async def submission_snapshot(year, month):
+    """指定月の全員分の提出状況 {employee_id: is_submitted}"""
+    rows = ShiftSubmissionStatus.objects.filter(
+        year=year, month=month
+    ).values_list('employee_id', 'is_submitted')
+    return {employee_id: is_submitted async for employee_id, is_submitted in rows}
+
+
+async def stream_submission_status(year, month):
+    """SSEの本文: 接続時に全件（snapshot）、以降は変更（status）を送る
+
+    変更がない間も一定間隔でコメント行を送り、プロキシによる切断を防ぐ。
+    """
+    heartbeat = settings.SUBMISSION_STREAM_HEARTBEAT_SECONDS
+    subscriber = submission_events.subscribe(year, month)
+    queue = subscriber[1]
+    try:
+        # 再接続までの待ち時間（ミリ秒）
+        yield f'retry: {settings.SUBMISSION_STREAM_RETRY_MS}\n\n'
+        # 購読してから全件を読むので、その間の変更も取りこぼさない
+        yield format_event('snapshot', await submission_snapshot(year, month))
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if data is RESYNC:
+                yield format_event('snapshot', await submission_snapshot(year, month))
+            else:
+                yield format_event('status', data)
+    finally:
+        submission_events.unsubscribe(year, month, subscriber)
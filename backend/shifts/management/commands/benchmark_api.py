@@ -0,0 +1,255 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from accounts.models import Employee
+from config.metrics import quantile
+from shifts.models import DraftShiftRequest, ShiftRequest, ShiftSubmissionStatus
+
+SCENARIOS = ('employees', 'history', 'draft_get', 'draft_save', 'submit', 'submit_race')
+QUERY_COUNT = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+# シナリオ上で起きて当然の4xx（errors ではなく rejected として数える）
+EXPECTED_STATUSES = {
+    'submit_race': {400},  # 先に提出したクライアント以外への「提出済」
+}
+
+
+class LocalClient:
+    """プロセス内でDjangoのミドルウェア・ビューを通してリクエストする"""
+
+    def __init__(self):
+        # ビューの例外は送出せず500として返す（エラーとして数える）
+        self.client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+
+    def request(self, method, path, body=None, headers=None):
+        if method == 'GET':
+            response = self.client.get(path, headers=headers)
+        else:
+            response = self.client.post(
+                path, json.dumps(body), content_type='application/json', headers=headers
+            )
+        return response.status_code, response.get('Server-Timing', '')
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpClient:
+    """起動中のサーバーにHTTPでリクエストする（keep-aliveの接続を使い回す）"""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.session.request(
+            method, self.base_url + path, json=body, headers=headers, timeout=30
+        )
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+    def close(self):
+        self.session.close()
+
+
+def draft_body(rng, year, month):
+    """下書き保存のリクエスト本文（数日分の希望）"""
+    days = rng.sample(range(1, 29), 8)
+    return {
+        'min_hours': 40, 'max_hours': 80, 'min_days_per_week': 2, 'max_days_per_week': 4,
+        'shift_details': [
+            {'date': f'{year}-{month:02d}-{day:02d}', 'start_time': '09:00',
+             'end_time': '17:00', 'is_holiday': False}
+            for day in sorted(days)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = '下書き・提出・履歴・従業員一覧のAPIに並行してリクエストし、スループット・レイテンシ・クエリ数をJSONで出力する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=4, help='並行クライアント数')
+        parser.add_argument('--requests', type=int, default=50, help='クライアントごと・シナリオごとのリクエスト数')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f'実行するシナリオ（カンマ区切り: {",".join(SCENARIOS)}）')
+        parser.add_argument('--base-url', help='起動中のサーバーのURL（省略時はプロセス内で実行）')
+        parser.add_argument('--month', default='2099-01',
+                            help='下書き・提出に使う月（実データと重ならない月。終了時に削除する）')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='結果のJSONを書き出すファイル')
+
+    def handle(self, *args, **options):
+        scenarios = [s for s in options['scenarios'].split(',') if s]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'不明なシナリオ: {", ".join(sorted(unknown))}')
+        try:
+            bench_year, bench_month = (int(v) for v in options['month'].split('-'))
+        except ValueError:
+            raise CommandError('--month は YYYY-MM で指定してください')
+
+        employee_ids = list(Employee.objects.values_list('id', flat=True))
+        if not employee_ids:
+            raise CommandError('従業員がいません。先に generate_shift_data を実行してください')
+        history_months = list(ShiftRequest.objects.values_list('employee_id', 'year', 'month')[:1000])
+
+        # 1リクエストごとのログやエラーのトレースバックは計測結果を埋もれさせるため止める
+        # （エラーは errors として数える）
+        logging.getLogger('config.metrics').setLevel(logging.WARNING)
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        self.cleanup(bench_year, bench_month)
+
+        results = {}
+        started = time.perf_counter()
+        for scenario in scenarios:
+            results[scenario] = self.run_scenario(
+                scenario, options, employee_ids, history_months, bench_year, bench_month
+            )
+        elapsed = time.perf_counter() - started
+        self.cleanup(bench_year, bench_month)
+
+        report = {
+            'database': connection.vendor,
+            'target': options['base_url'] or 'in-process',
+            'clients': options['clients'],
+            'requests_per_client': options['requests'],
+            'employees': len(employee_ids),
+            'seconds': round(elapsed, 3),
+            'scenarios': results,
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def cleanup(self, year, month):
+        """計測用の月のデータを削除"""
+        ShiftRequest.objects.filter(year=year, month=month).delete()
+        DraftShiftRequest.objects.filter(year=year, month=month).delete()
+        ShiftSubmissionStatus.objects.filter(year=year, month=month).delete()
+
+    def run_scenario(self, scenario, options, employee_ids, history_months, year, month):
+        samples = defaultdict(list)
+        lock = threading.Lock()
+        # 提出は従業員ごとに1回だけなので、クライアント間で従業員を分け合う
+        submit_queue = list(employee_ids)
+        random.Random(options['seed']).shuffle(submit_queue)
+        # submit_race: 全クライアントが同じ従業員・月に提出を繰り返す
+        # （偶数番のクライアントは同じ Idempotency-Key を付けた再送、奇数番はキーなしの連打）
+        race_employee = submit_queue[0]
+        race_path = f'/api/shifts/submit/{race_employee}/{year}/{month}/'
+        race_body = draft_body(random.Random(options['seed']), year, month)
+        if scenario == 'submit_race':
+            # 前のシナリオで提出済みの場合に備えて計測用の月を作り直す
+            self.cleanup(year, month)
+            client = HttpClient(options['base_url']) if options['base_url'] else LocalClient()
+            try:
+                client.request('POST', f'/api/shifts/draft/{race_employee}/{year}/{month}/', race_body)
+            finally:
+                client.close()
+
+        def worker(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            client = HttpClient(options['base_url']) if options['base_url'] else LocalClient()
+            try:
+                for _ in range(options['requests']):
+                    employee_id = rng.choice(employee_ids)
+                    if scenario == 'employees':
+                        calls = [('GET', '/api/accounts/employees/', None)]
+                    elif scenario == 'history':
+                        if history_months:
+                            e, y, m = rng.choice(history_months)
+                            calls = [('GET', f'/api/shifts/history/{e}/?year={y}&month={m}', None)]
+                        else:
+                            calls = [('GET', f'/api/shifts/history/{employee_id}/', None)]
+                    elif scenario == 'draft_get':
+                        calls = [('GET', f'/api/shifts/draft/{employee_id}/{year}/{month}/', None)]
+                    elif scenario == 'draft_save':
+                        calls = [('POST', f'/api/shifts/draft/{employee_id}/{year}/{month}/',
+                                  draft_body(rng, year, month))]
+                    elif scenario == 'submit_race':
+                        headers = {'Idempotency-Key': 'benchmark-race'} if index % 2 == 0 else None
+                        calls = [('POST', race_path, race_body, headers)]
+                    else:
+                        with lock:
+                            if not submit_queue:
+                                break
+                            employee_id = submit_queue.pop()
+                        body = draft_body(rng, year, month)
+                        # 提出には下書きが必要なため先に保存する（計測は提出のみ）
+                        # 保存に失敗した従業員は提出せず、draft_errors として数える
+                        try:
+                            status, _ = client.request(
+                                'POST', f'/api/shifts/draft/{employee_id}/{year}/{month}/', body
+                            )
+                        except Exception:
+                            status = 0
+                        if not 200 <= status < 300:
+                            with lock:
+                                samples['draft_errors'].append(status)
+                            continue
+                        calls = [('POST', f'/api/shifts/submit/{employee_id}/{year}/{month}/', body)]
+
+                    for method, path, body, *headers in calls:
+                        start = time.perf_counter()
+                        try:
+                            status, timing = client.request(method, path, body, *headers)
+                        except Exception:
+                            status, timing = 0, ''
+                        latency = time.perf_counter() - start
+                        match = QUERY_COUNT.search(timing)
+                        with lock:
+                            samples['latency'].append(latency)
+                            samples['status'].append(status)
+                            if match:
+                                samples['queries'].append(int(match.group(1)))
+            finally:
+                client.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['clients'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(samples['latency'])
+        queries = samples['queries']
+        expected = EXPECTED_STATUSES.get(scenario, set())
+        rejected = sum(1 for s in samples['status'] if s in expected)
+        errors = sum(1 for s in samples['status'] if not 200 <= s < 400 and s not in expected)
+        result = {
+            'requests': len(latencies),
+            'errors': errors,
+            'rejected': rejected,
+            'status_codes': {str(code): n for code, n in sorted(Counter(samples['status']).items())},
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0,
+            'latency_ms': {
+                'p50': round(quantile(latencies, 0.5) * 1000, 2),
+                'p95': round(quantile(latencies, 0.95) * 1000, 2),
+                'p99': round(quantile(latencies, 0.99) * 1000, 2),
+                'max': round(latencies[-1] * 1000, 2) if latencies else 0,
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2) if queries else None,
+                'max': max(queries) if queries else None,
+            },
+        }
+        if scenario == 'submit':
+            result['draft_errors'] = len(samples['draft_errors'])
+            result['errors'] += result['draft_errors']
+        if scenario == 'submit_race':
+            # 2回目以降は提出済（400）か保存済みのレスポンスの再送（201）になり、提出は1件だけ残る
+            result['shift_requests'] = ShiftRequest.objects.filter(
+                employee_id=race_employee, year=year, month=month
+            ).count()
+        return result
@@ -0,0 +1,80 @@
+import calendar
+import datetime
+import json
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from accounts.models import Employee
+from config.renderers import FastJSONRenderer, fast_json_available
+from shifts.models import ShiftDetail, ShiftRequest, ShiftRequestSummary
+from shifts.serializers import HistoricalShiftRequestSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_month(employees, year, month):
+    """従業員 × 1ヶ月分の提出済みシフトを作成"""
+    days = calendar.monthrange(year, month)[1]
+    for i in range(employees):
+        employee = Employee.objects.create(name=f'ベンチマーク{i:03d}')
+        shift_request = ShiftRequest.objects.create(
+            employee=employee, year=year, month=month,
+            min_hours=40, max_hours=120, min_days_per_week=2, max_days_per_week=5
+        )
+        ShiftDetail.objects.bulk_create([
+            ShiftDetail(
+                shift_request=shift_request,
+                date=datetime.date(year, month, day),
+                start_time=None if (i + day) % 7 == 0 else datetime.time(9 + (i + day) % 4, 0),
+                end_time=None if (i + day) % 7 == 0 else datetime.time(17 + (i + day) % 4, 30),
+                is_holiday=(i + day) % 7 == 0
+            )
+            for day in range(1, days + 1)
+        ])
+        ShiftRequestSummary.refresh(shift_request)
+
+
+class Command(BaseCommand):
+    help = '100人 × 1ヶ月の履歴データでJSONレンダリング時間と圧縮後のサイズを比較する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100, help='従業員数')
+        parser.add_argument('--repeat', type=int, default=20, help='計測回数（最短時間を採用）')
+
+    def handle(self, *args, **options):
+        # 計測用のデータは最後にロールバックする
+        with transaction.atomic():
+            build_month(options['employees'], 2099, 1)
+            queryset = ShiftRequest.objects.filter(year=2099, month=1).select_related(
+                'summary'
+            ).prefetch_related('shift_details')
+            data = HistoricalShiftRequestSerializer(queryset, many=True).data
+            transaction.set_rollback(True)
+
+        def measure(renderer):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                body = renderer.render(data)
+                timings.append(time.perf_counter() - start)
+            return min(timings), body
+
+        results = {}
+        for name, renderer in (('drf_json', JSONRenderer()), ('fast_json', FastJSONRenderer())):
+            seconds, body = measure(renderer)
+            sizes = {'identity': len(body), 'gzip': len(compress_string(body))}
+            if brotli is not None:
+                sizes['br'] = len(brotli.compress(body, quality=5))
+            results[name] = {'render_ms': round(seconds * 1000, 3), 'bytes': sizes}
+
+        self.stdout.write(json.dumps({
+            'employees': options['employees'],
+            'orjson': fast_json_available(),
+            'brotli': brotli is not None,
+            'results': results,
+        }, indent=2))
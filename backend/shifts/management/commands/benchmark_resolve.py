@@ -0,0 +1,74 @@
+import datetime
+import json
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from config.metrics import quantile
+from shifts.models import ShiftDetail, ShiftRequest, ShiftRequestSummary
+from shifts.scheduler import generate_schedule, resolve_schedule
+
+
+class Command(BaseCommand):
+    help = '1人1日の希望を変更したときの再作成（resolve_schedule）と全体の作成の時間を比較する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int)
+        parser.add_argument('--month', type=int, help='省略時は提出のある最新の月')
+        parser.add_argument('--repeat', type=int, default=20, help='変更を試す回数')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        if year is None or month is None:
+            latest = ShiftRequest.objects.order_by('-year', '-month').values_list('year', 'month').first()
+            if latest is None:
+                raise CommandError('提出がありません。先に generate_shift_data を実行してください')
+            year, month = latest
+        requests = list(ShiftRequest.objects.filter(year=year, month=month))
+        if not requests:
+            raise CommandError(f'{year}年{month}月の提出がありません')
+        rng = random.Random(options['seed'])
+
+        start = time.perf_counter()
+        schedule = generate_schedule(year, month)
+        full_seconds = time.perf_counter() - start
+        assignments = schedule.to_dict()['assignments']
+
+        timings, diff_sizes = [], []
+        for _ in range(options['repeat']):
+            shift_request = rng.choice(requests)
+            date = datetime.date(year, month, rng.randint(1, schedule.problem.days))
+            # 変更は計測ごとにロールバックする
+            with transaction.atomic():
+                detail, _ = ShiftDetail.objects.get_or_create(shift_request=shift_request, date=date)
+                if detail.start_time is None:
+                    detail.start_time, detail.end_time = datetime.time(9, 0), datetime.time(17, 0)
+                else:
+                    detail.start_time = detail.end_time = None
+                detail.save()
+                ShiftRequestSummary.refresh(shift_request)
+
+                start = time.perf_counter()
+                result = resolve_schedule(year, month, assignments, [date])
+                timings.append(time.perf_counter() - start)
+                diff_sizes.append(len(result['added']) + len(result['removed']) + len(result['changed']))
+                transaction.set_rollback(True)
+
+        timings.sort()
+        self.stdout.write(json.dumps({
+            'year': year,
+            'month': month,
+            'employees': len(requests),
+            'assignments': len(assignments),
+            'full_solve_ms': round(full_seconds * 1000, 2),
+            'resolve_ms': {
+                'p50': round(quantile(timings, 0.5) * 1000, 2),
+                'p95': round(quantile(timings, 0.95) * 1000, 2),
+                'max': round(timings[-1] * 1000, 2),
+            },
+            'diff_size': {
+                'mean': round(sum(diff_sizes) / len(diff_sizes), 2),
+                'max': max(diff_sizes),
+            },
+        }, indent=2))
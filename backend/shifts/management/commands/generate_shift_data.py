@@ -0,0 +1,178 @@
+import calendar
+import datetime
+import random
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import Employee
+from shifts.models import (
+    DraftShiftDetail, DraftShiftRequest, ShiftDetail, ShiftRequest,
+    ShiftRequestSummary, ShiftSubmissionStatus, TimePreset,
+)
+
+# 生成した従業員の名前の接頭辞（--clear で削除する対象）
+NAME_PREFIX = '合成データ'
+
+# よく使われる時間帯 (名前, 開始, 終了)
+PRESETS = [
+    ('朝', datetime.time(7, 0), datetime.time(12, 0)),
+    ('昼', datetime.time(11, 0), datetime.time(17, 0)),
+    ('夕方', datetime.time(17, 0), datetime.time(22, 0)),
+    ('通し', datetime.time(9, 0), datetime.time(18, 0)),
+    ('閉店', datetime.time(18, 0), datetime.time(22, 30)),
+]
+
+
+def shift_months(year, month, count):
+    """指定月から遡った count ヶ月分の (年, 月)（古い順）"""
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months[::-1]
+
+
+def generate_details(rng, presets, year, month):
+    """1ヶ月分の希望 (date, start_time, end_time, is_holiday) を作成
+
+    曜日ごとに出やすさを変え、基本は登録済みのプリセットから時間帯を選ぶ。
+    """
+    details = []
+    weekday_rate = [rng.uniform(0.3, 0.9) for _ in range(7)]
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        date = datetime.date(year, month, day)
+        roll = rng.random()
+        if roll < weekday_rate[date.weekday()]:
+            name, start, end = rng.choice(presets)
+            details.append((date, start, end, False))
+        elif roll < weekday_rate[date.weekday()] + 0.15:
+            details.append((date, None, None, True))
+    return details
+
+
+class Command(BaseCommand):
+    help = '負荷試験用の従業員・シフト希望・プリセット・下書きを生成する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100, help='従業員数')
+        parser.add_argument('--months', type=int, default=12, help='提出済みの月数（今月から遡る）')
+        parser.add_argument('--seed', type=int, default=0, help='乱数のシード（同じ値なら同じデータ）')
+        parser.add_argument('--draft-rate', type=float, default=0.6,
+                            help='来月分（画面で提出する月）の下書きを作成中の従業員の割合')
+        parser.add_argument('--clear', action='store_true',
+                            help=f'名前が「{NAME_PREFIX}」で始まる従業員とそのデータを先に削除する')
+
+    def handle(self, *args, **options):
+        if options['employees'] < 0 or options['months'] < 0:
+            raise CommandError('--employees と --months は0以上で指定してください')
+        rng = random.Random(options['seed'])
+
+        # 提出画面は来月分を扱うので、今月までを提出済み・来月を下書き中にする
+        today = timezone.localdate()
+        months = shift_months(today.year, today.month, options['months'])
+        next_month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+
+        with transaction.atomic():
+            if options['clear']:
+                deleted, _ = Employee.objects.filter(name__startswith=NAME_PREFIX).delete()
+                self.stdout.write(f'{deleted}件の既存データを削除しました')
+
+            start = Employee.objects.filter(name__startswith=NAME_PREFIX).count()
+            employees = Employee.objects.bulk_create([
+                Employee(
+                    name=f'{NAME_PREFIX}{start + i:05d}',
+                    can_open=rng.random() < 0.4,
+                    can_close_cleaning=rng.random() < 0.5,
+                    can_close_cashier=rng.random() < 0.4,
+                    can_close_floor=rng.random() < 0.5,
+                    can_order=rng.random() < 0.2,
+                    is_beginner=rng.random() < 0.15,
+                )
+                for i in range(options['employees'])
+            ])
+            # SQLiteなど bulk_create で id が返らないDBに備えて取り直す
+            employees = list(Employee.objects.filter(
+                name__in=[e.name for e in employees]
+            ).order_by('id'))
+
+            presets = {}
+            preset_rows = []
+            for employee in employees:
+                chosen = rng.sample(PRESETS, rng.randint(2, 4))
+                presets[employee.id] = [(name, s, e) for name, s, e in chosen]
+                preset_rows += [
+                    TimePreset(employee=employee, name=name, start_time=s, end_time=e)
+                    for name, s, e in chosen
+                ]
+            TimePreset.objects.bulk_create(preset_rows)
+
+            # 提出済みの月（全員が毎月提出するとは限らない）
+            requests, details = [], {}
+            for employee in employees:
+                min_hours = rng.choice([20, 40, 60, 80])
+                for year, month in months:
+                    if rng.random() < 0.1:
+                        continue
+                    min_days = rng.randint(1, 3)
+                    requests.append(ShiftRequest(
+                        employee=employee, year=year, month=month,
+                        min_hours=min_hours, max_hours=min_hours + rng.choice([20, 40, 60]),
+                        min_days_per_week=min_days, max_days_per_week=min_days + rng.randint(1, 3),
+                    ))
+                    details[(employee.id, year, month)] = generate_details(
+                        rng, presets[employee.id], year, month
+                    )
+            ShiftRequest.objects.bulk_create(requests, batch_size=500)
+            requests = list(ShiftRequest.objects.filter(employee__in=employees))
+
+            ShiftDetail.objects.bulk_create([
+                ShiftDetail(shift_request=r, date=d, start_time=s, end_time=e, is_holiday=h)
+                for r in requests
+                for d, s, e, h in details[(r.employee_id, r.year, r.month)]
+            ], batch_size=2000)
+            ShiftRequestSummary.objects.bulk_create([
+                ShiftRequestSummary(
+                    shift_request=r,
+                    **ShiftRequestSummary.values_for(r, details[(r.employee_id, r.year, r.month)])
+                )
+                for r in requests
+            ], batch_size=500)
+            ShiftSubmissionStatus.objects.bulk_create([
+                ShiftSubmissionStatus(
+                    employee_id=r.employee_id, year=r.year, month=r.month,
+                    is_submitted=True, submitted_at=timezone.now()
+                )
+                for r in requests
+            ], batch_size=500, ignore_conflicts=True)
+
+            # 来月分の作成中の下書き
+            drafting = [e for e in employees if rng.random() < options['draft_rate']]
+            DraftShiftRequest.objects.bulk_create([
+                DraftShiftRequest(
+                    employee=employee, year=next_month[0], month=next_month[1],
+                    min_hours=40, max_hours=80, min_days_per_week=2, max_days_per_week=4
+                )
+                for employee in drafting
+            ], ignore_conflicts=True)
+            ShiftSubmissionStatus.objects.bulk_create([
+                ShiftSubmissionStatus(employee=employee, year=next_month[0], month=next_month[1])
+                for employee in drafting
+            ], ignore_conflicts=True)
+            drafts = DraftShiftRequest.objects.filter(
+                employee__in=drafting, year=next_month[0], month=next_month[1]
+            )
+            draft_details = []
+            for draft in drafts:
+                filled = generate_details(rng, presets[draft.employee_id], *next_month)
+                # 途中まで入力した状態にする
+                for date, s, e, h in filled[:rng.randint(0, len(filled))]:
+                    draft_details.append(DraftShiftDetail(
+                        draft=draft, date=date, start_time=s, end_time=e, is_holiday=h
+                    ))
+            DraftShiftDetail.objects.bulk_create(draft_details, batch_size=2000, ignore_conflicts=True)
+
+        self.stdout.write(
+            f'従業員{len(employees)}人、プリセット{len(preset_rows)}件、'
+            f'提出済み{len(requests)}件（詳細{sum(len(details[(r.employee_id, r.year, r.month)]) for r in requests)}件）、'
+            f'下書き{len(drafting)}件を作成しました'
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from shifts.rollover import next_month, prepare_month
+
+
+class Command(BaseCommand):
+    help = '指定月（既定は翌月）の提出状況と下書きを全従業員分まとめて作成する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='対象の年（省略時は翌月）')
+        parser.add_argument('--month', type=int, help='対象の月（省略時は翌月）')
+
+    def handle(self, *args, **options):
+        if (options['year'] is None) != (options['month'] is None):
+            raise CommandError('--year と --month は両方指定してください')
+        if options['year'] is None:
+            year, month = next_month()
+        else:
+            year, month = options['year'], options['month']
+            if not 1 <= month <= 12:
+                raise CommandError('月は1〜12で指定してください')
+
+        created = prepare_month(year, month)
+        self.stdout.write(
+            f"{year}年{month}月: 提出状況{created['statuses']}件、下書き{created['drafts']}件を作成しました"
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shifts', '0002_alter_timepreset_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='draftshiftrequest',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
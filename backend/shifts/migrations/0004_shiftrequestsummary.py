@@ -0,0 +1,49 @@
+# Generated by Django 5.0 on 2026-10-18 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_summaries(apps, schema_editor):
+    from shifts.models import summarize_shift_details
+
+    ShiftRequest = apps.get_model('shifts', 'ShiftRequest')
+    ShiftDetail = apps.get_model('shifts', 'ShiftDetail')
+    ShiftRequestSummary = apps.get_model('shifts', 'ShiftRequestSummary')
+
+    details = {}
+    for row in ShiftDetail.objects.values_list(
+        'shift_request_id', 'date', 'start_time', 'end_time', 'is_holiday'
+    ):
+        details.setdefault(row[0], []).append(row[1:])
+
+    ShiftRequestSummary.objects.bulk_create([
+        ShiftRequestSummary(
+            shift_request_id=request_id,
+            **summarize_shift_details(details.get(request_id, []))
+        )
+        for request_id in ShiftRequest.objects.values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shifts', '0003_draftshiftrequest_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftRequestSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_hours', models.FloatField(default=0)),
+                ('available_days', models.IntegerField(default=0)),
+                ('days_per_week', models.JSONField(default=dict)),
+                ('holiday_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shift_request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='shifts.shiftrequest')),
+            ],
+        ),
+        migrations.RunPython(create_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+def pack_summaries(apps, schema_editor):
+    from shifts.models import pack_availability
+
+    ShiftDetail = apps.get_model('shifts', 'ShiftDetail')
+    ShiftRequestSummary = apps.get_model('shifts', 'ShiftRequestSummary')
+
+    details = {}
+    for row in ShiftDetail.objects.values_list(
+        'shift_request_id', 'date', 'start_time', 'end_time', 'is_holiday'
+    ):
+        details.setdefault(row[0], []).append(row[1:])
+
+    summaries = list(ShiftRequestSummary.objects.select_related('shift_request'))
+    for summary in summaries:
+        request = summary.shift_request
+        summary.availability = pack_availability(
+            details.get(request.id, []), request.year, request.month
+        )
+    ShiftRequestSummary.objects.bulk_update(summaries, ['availability'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shifts', '0004_shiftrequestsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shiftrequestsummary',
+            name='availability',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(pack_summaries, migrations.RunPython.noop),
+    ]
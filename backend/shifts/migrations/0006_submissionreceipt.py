@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-18 19:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('shifts', '0005_shiftrequestsummary_availability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('status_code', models.IntegerField()),
+                ('response', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0 on 2026-10-18 19:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_employee_line_user_id'),
+        ('shifts', '0006_submissionreceipt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublishedSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('version', models.IntegerField()),
+                ('message', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['year', 'month', 'version'],
+                'unique_together': {('year', 'month', 'version')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PublishedAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.employee')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='shifts.publishedschedule')),
+            ],
+            options={
+                'ordering': ['date', 'employee_id'],
+                'unique_together': {('schedule', 'employee', 'date')},
+            },
+        ),
+    ]
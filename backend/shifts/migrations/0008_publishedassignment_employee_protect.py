@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-18 20:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_employee_line_user_id'),
+        ('shifts', '0007_publishedschedule'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='publishedassignment',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.employee'),
+        ),
+    ]
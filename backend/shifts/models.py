@@ -1,5 +1,4 @@
 from django.db import models
-from django.utils import timezone
 from accounts.models import Employee
 
 class TimePreset(models.Model):
@@ -30,29 +29,29 @@ class ShiftSubmissionStatus(models.Model):
 
     @classmethod
     def get_or_create_for_month(cls, employee, year, month):
-        """指定月のステータスを取得または作成"""
-        today = timezone.now()
-        first_day_current = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        target_date = today.replace(year=year, month=month, day=1)
-        
-        if target_date == first_day_current:
-            status, created = cls.objects.get_or_create(
-                employee=employee,
-                year=year,
-                month=month
-            )
-            if not created and status.is_submitted:
-                status.is_submitted = False
-                status.submitted_at = None
-                status.save()
-            return status
-        
+        """指定月のステータスを取得（月の切り替えは rollover_month コマンドで事前に作成）"""
         return cls.objects.get_or_create(
             employee=employee,
             year=year,
             month=month
         )[0]
 
+class SubmissionReceipt(models.Model):
+    """Idempotency-Key ごとの提出結果（再送されたリクエストには保存したレスポンスを返す）"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    year = models.IntegerField()
+    month = models.IntegerField()
+    status_code = models.IntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['employee', 'key']
+
+# 新しい月の下書きに前回の提出から引き継ぐ項目
+DRAFT_CARRYOVER_FIELDS = ['min_hours', 'max_hours', 'min_days_per_week', 'max_days_per_week']
+
 class DraftShiftRequest(models.Model):
     """下書き状態のシフトリクエスト"""
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
@@ -62,54 +61,48 @@ class DraftShiftRequest(models.Model):
     max_hours = models.IntegerField(null=True, blank=True)
     min_days_per_week = models.IntegerField(null=True, blank=True)
     max_days_per_week = models.IntegerField(null=True, blank=True)
+    version = models.IntegerField(default=0)  # 更新のたびに加算（古い書き込みの検出用）
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['employee', 'year', 'month']
 
+    @property
+    def etag(self):
+        return f'"draft-{self.id}-{self.version}"'
+
+    @classmethod
+    def carryover_requests(cls, year, month):
+        """引き継ぎ元になる提出（指定月より前の月のもの、新しい順）"""
+        return ShiftRequest.objects.filter(
+            models.Q(year__lt=year) | models.Q(year=year, month__lt=month)
+        ).order_by('-year', '-month')
+
+    @classmethod
+    def initial_values(cls, last_request):
+        """前回の提出から引き継ぐ希望時間・日数"""
+        if last_request is None:
+            return {}
+        return {field: getattr(last_request, field) for field in DRAFT_CARRYOVER_FIELDS}
+
     @classmethod
     def get_or_create_for_month(cls, employee, year, month):
-        """指定月の下書きを取得または作成（月初めの場合はリセット）"""
-        today = timezone.now()
-        first_day_current = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        target_date = today.replace(year=year, month=month, day=1)
-        
-        if target_date == first_day_current:
-            # 既存の下書きを削除
-            cls.objects.filter(
-                employee=employee,
-                year=year,
-                month=month
-            ).delete()
-
-            # 前回の希望時間・日数を取得
-            last_request = ShiftRequest.objects.filter(
-                employee=employee
-            ).order_by('-year', '-month').first()
-
-            # 新しい下書きを作成
-            if last_request:
-                return cls.objects.create(
-                    employee=employee,
-                    year=year,
-                    month=month,
-                    min_hours=last_request.min_hours,
-                    max_hours=last_request.max_hours,
-                    min_days_per_week=last_request.min_days_per_week,
-                    max_days_per_week=last_request.max_days_per_week
-                )
-            
-            return cls.objects.create(
-                employee=employee,
-                year=year,
-                month=month
-            )
-        
+        """指定月の下書きを取得
+
+        通常は rollover_month コマンドで作成済みのため読み込みだけで済む。
+        未作成の場合のみ前回の希望時間・日数を引き継いで作成する。
+        """
+        draft = cls.objects.filter(employee=employee, year=year, month=month).first()
+        if draft is not None:
+            return draft
+
+        last_request = cls.carryover_requests(year, month).filter(employee=employee).first()
         draft, created = cls.objects.get_or_create(
             employee=employee,
             year=year,
-            month=month
+            month=month,
+            defaults=cls.initial_values(last_request)
         )
         return draft
 
@@ -156,4 +149,136 @@ class ShiftDetail(models.Model):
 
     class Meta:
         unique_together = ['shift_request', 'date']
-        ordering = ['date']
\ No newline at end of file
+        ordering = ['date']
+
+def summarize_shift_details(details):
+    """シフト詳細から勤務可能時間・日数を集計"""
+    total_minutes = 0
+    days_per_week = {}
+    holiday_count = 0
+    for date, start_time, end_time, is_holiday in details:
+        if is_holiday:
+            holiday_count += 1
+            continue
+        if start_time is None or end_time is None:
+            continue
+        minutes = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+        if minutes <= 0:
+            continue
+        total_minutes += minutes
+        iso_year, iso_week, _ = date.isocalendar()
+        week = f'{iso_year}-W{iso_week:02d}'
+        days_per_week[week] = days_per_week.get(week, 0) + 1
+    return {
+        'total_hours': total_minutes / 60,
+        'available_days': sum(days_per_week.values()),
+        'days_per_week': days_per_week,
+        'holiday_count': holiday_count,
+    }
+
+# 勤務可能スロットのビット列（1日96スロット × 31日、先頭ビットが1日0:00〜0:15）
+AVAILABILITY_SLOT_MINUTES = 15
+AVAILABILITY_SLOTS_PER_DAY = 24 * 60 // AVAILABILITY_SLOT_MINUTES
+AVAILABILITY_MAX_DAYS = 31
+AVAILABILITY_BITS = AVAILABILITY_SLOTS_PER_DAY * AVAILABILITY_MAX_DAYS
+AVAILABILITY_BYTES = AVAILABILITY_BITS // 8
+
+def pack_availability(details, year, month):
+    """シフト詳細を15分スロットのビット列に変換（スロット全体が勤務可能な場合のみ1）"""
+    bits = 0
+    for date, start_time, end_time, is_holiday in details:
+        if is_holiday or start_time is None or end_time is None:
+            continue
+        if date.year != year or date.month != month:
+            continue
+        start = -(-(start_time.hour * 60 + start_time.minute) // AVAILABILITY_SLOT_MINUTES)
+        end = (end_time.hour * 60 + end_time.minute) // AVAILABILITY_SLOT_MINUTES
+        if end <= start:
+            continue
+        # 先頭から数えて [first, last) ビット目を立てる（int の上位ビットが先頭）
+        first = (date.day - 1) * AVAILABILITY_SLOTS_PER_DAY + start
+        last = (date.day - 1) * AVAILABILITY_SLOTS_PER_DAY + end
+        bits |= ((1 << (last - first)) - 1) << (AVAILABILITY_BITS - last)
+    return bits.to_bytes(AVAILABILITY_BYTES, 'big')
+
+class ShiftRequestSummary(models.Model):
+    """確定したシフトリクエストの集計（書き込み時に更新）"""
+    shift_request = models.OneToOneField(ShiftRequest, on_delete=models.CASCADE, related_name='summary')
+    total_hours = models.FloatField(default=0)
+    available_days = models.IntegerField(default=0)
+    days_per_week = models.JSONField(default=dict)  # ISO週 ("2024-W49") → 勤務可能日数
+    holiday_count = models.IntegerField(default=0)
+    availability = models.BinaryField(default=bytes)  # pack_availability のビット列
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def values_for(cls, shift_request, details):
+        """シフト詳細 (date, start_time, end_time, is_holiday) から保存する値を作成"""
+        details = list(details)
+        values = summarize_shift_details(details)
+        values['availability'] = pack_availability(details, shift_request.year, shift_request.month)
+        return values
+
+    @classmethod
+    def refresh(cls, shift_request):
+        """シフト詳細から集計をやり直して保存"""
+        details = ShiftDetail.objects.filter(
+            shift_request=shift_request
+        ).values_list('date', 'start_time', 'end_time', 'is_holiday')
+        summary, _ = cls.objects.update_or_create(
+            shift_request=shift_request,
+            defaults=cls.values_for(shift_request, details)
+        )
+        return summary
+
+class PublishedModel(models.Model):
+    """公開済みのシフト（作成後は save() での変更・delete() での削除を拒否する）
+
+    QuerySet の update() / delete()、bulk_update() はモデルのメソッドを通らないため
+    拒否されない。公開済みの版はこれらで変更しないこと。
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("公開済みのシフトは変更できません")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("公開済みのシフトは削除できません")
+
+class PublishedSchedule(PublishedModel):
+    """公開したシフトの版（作成後は変更しない。修正は新しい版として公開する）"""
+    year = models.IntegerField()
+    month = models.IntegerField()
+    version = models.IntegerField()  # 月ごとに1から採番
+    message = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['year', 'month', 'version']
+        ordering = ['year', 'month', 'version']
+
+    def assignment_map(self):
+        """{(employee_id, date): (start_time, end_time)}"""
+        return {
+            (employee_id, date): (start_time, end_time)
+            for employee_id, date, start_time, end_time in self.assignments.values_list(
+                'employee_id', 'date', 'start_time', 'end_time'
+            )
+        }
+
+class PublishedAssignment(PublishedModel):
+    """公開したシフトの1件（1人1日1シフト）"""
+    schedule = models.ForeignKey(PublishedSchedule, on_delete=models.CASCADE, related_name='assignments')
+    # 公開済みの版に載っている従業員は削除させない
+    employee = models.ForeignKey(Employee, on_delete=models.PROTECT)
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        unique_together = ['schedule', 'employee', 'date']
+        ordering = ['date', 'employee_id']
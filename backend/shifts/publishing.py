@@ -0,0 +1,187 @@
+"""公開したシフトの版の管理と変更の通知
+
+版ごとに全件を保存し、差分は2つの版の (employee_id, date) → 時間帯 の辞書を比べて求める。
+修正を公開したときは、変更のあった従業員・日だけを短いテキストで通知する
+（LINEのユーザーIDがある従業員には個別に、それ以外はまとめてグループに送る）。
+通知の送信は通知ジョブ（notifications.jobs）としてワーカーで行う。
+"""
+from django.db import transaction
+from django.utils.dateparse import parse_date, parse_time
+
+from accounts.models import Employee
+from notifications.line import GROUP_ID
+from .models import PublishedAssignment, PublishedSchedule
+
+WEEKDAYS = '月火水木金土日'
+# 1通のテキストの最大文字数（LINEの上限は5000文字）
+MAX_MESSAGE_LENGTH = 2000
+
+
+def diff_assignments(before, after):
+    """2つの版の割り当て {(employee_id, date): (start_time, end_time)} の差分
+
+    added / removed: 追加・削除された割り当て。
+    changed: 同じ従業員・日で時間帯が変わった割り当て（previous_* に変更前の時間帯）。
+    """
+    def item(key, times):
+        return {'employee_id': key[0], 'date': key[1], 'start_time': times[0], 'end_time': times[1]}
+
+    def order(key):
+        return key[1], key[0]
+
+    return {
+        'added': [item(k, after[k]) for k in sorted(after.keys() - before.keys(), key=order)],
+        'removed': [item(k, before[k]) for k in sorted(before.keys() - after.keys(), key=order)],
+        'changed': [
+            {
+                **item(k, after[k]),
+                'previous_start_time': before[k][0],
+                'previous_end_time': before[k][1],
+            }
+            for k in sorted(before.keys() & after.keys(), key=order)
+            if before[k] != after[k]
+        ],
+    }
+
+
+def version_diff(year, month, from_version, to_version):
+    """公開済みの2つの版の差分（from_version=0 は空の版として扱う）"""
+    versions = {
+        schedule.version: schedule
+        for schedule in PublishedSchedule.objects.filter(
+            year=year, month=month, version__in=[from_version, to_version]
+        )
+    }
+    if to_version not in versions or (from_version and from_version not in versions):
+        raise PublishedSchedule.DoesNotExist
+    before = versions[from_version].assignment_map() if from_version else {}
+    return diff_assignments(before, versions[to_version].assignment_map())
+
+
+def publish_schedule(year, month, assignments, message=''):
+    """割り当てを新しい版として公開し、(版, 直前の版との差分) を返す
+
+    直前の版と同じ内容の場合は新しい版を作らず (None, 空の差分) を返す。
+    同時に公開された場合は版番号の一意制約で IntegrityError になる。
+    """
+    after = {
+        (item['employee_id'], item['date']): (item['start_time'], item['end_time'])
+        for item in assignments
+    }
+    with transaction.atomic():
+        latest = PublishedSchedule.objects.select_for_update().filter(
+            year=year, month=month
+        ).order_by('-version').first()
+        diff = diff_assignments(latest.assignment_map() if latest else {}, after)
+        if latest is not None and not any(diff.values()):
+            return None, diff
+
+        schedule = PublishedSchedule.objects.create(
+            year=year,
+            month=month,
+            version=latest.version + 1 if latest else 1,
+            message=message
+        )
+        PublishedAssignment.objects.bulk_create([
+            PublishedAssignment(
+                schedule=schedule,
+                employee_id=employee_id,
+                date=date,
+                start_time=start_time,
+                end_time=end_time
+            )
+            for (employee_id, date), (start_time, end_time) in after.items()
+        ], batch_size=1000)
+    return schedule, diff
+
+
+def format_date(date):
+    return f'{date.month}/{date.day}({WEEKDAYS[date.weekday()]})'
+
+
+def format_times(start_time, end_time):
+    if start_time is None:
+        return 'なし'
+    return f'{start_time.hour}:{start_time.minute:02d}-{end_time.hour}:{end_time.minute:02d}'
+
+
+def change_lines(diff):
+    """従業員ごとの変更内容の行 {employee_id: [行]}（日付順）"""
+    lines = {}
+
+    def add(employee_id, date, before, after):
+        lines.setdefault(employee_id, []).append(
+            (date, f'{format_date(date)} {format_times(*before)} → {format_times(*after)}')
+        )
+
+    for item in diff['added']:
+        add(item['employee_id'], item['date'], (None, None), (item['start_time'], item['end_time']))
+    for item in diff['removed']:
+        add(item['employee_id'], item['date'], (item['start_time'], item['end_time']), (None, None))
+    for item in diff['changed']:
+        add(
+            item['employee_id'], item['date'],
+            (item['previous_start_time'], item['previous_end_time']),
+            (item['start_time'], item['end_time'])
+        )
+    return {employee_id: [line for _, line in sorted(items)] for employee_id, items in lines.items()}
+
+
+def truncate(text):
+    if len(text) <= MAX_MESSAGE_LENGTH:
+        return text
+    return text[:MAX_MESSAGE_LENGTH - 2] + '\n…'
+
+
+def change_messages(schedule, diff):
+    """変更の通知文 {送信先: テキスト}（変更のあった従業員・日だけ）"""
+    lines = change_lines(diff)
+    if not lines:
+        return {}
+    title = f'【シフト変更】{schedule.year}年{schedule.month}月（第{schedule.version}版）'
+    if schedule.message:
+        title += f'\n{schedule.message}'
+
+    messages = {}
+    group_lines = []
+    employees = Employee.objects.filter(id__in=lines).only('id', 'name', 'line_user_id').order_by('id')
+    for employee in employees:
+        if employee.line_user_id:
+            messages[employee.line_user_id] = truncate('\n'.join([title, *lines[employee.id]]))
+        else:
+            group_lines.append(f'■{employee.name}')
+            group_lines += lines[employee.id]
+    if group_lines and GROUP_ID:
+        messages[GROUP_ID] = truncate('\n'.join([title, *group_lines]))
+    return messages
+
+
+DIFF_DATE_FIELDS = ('date',)
+DIFF_TIME_FIELDS = ('start_time', 'end_time', 'previous_start_time', 'previous_end_time')
+
+
+def encode_diff(diff):
+    """差分をJSONで保存できる形に変換（日付・時刻はISO形式の文字列）"""
+    return {
+        key: [
+            {field: value.isoformat() if field in DIFF_DATE_FIELDS + DIFF_TIME_FIELDS else value
+             for field, value in item.items()}
+            for item in items
+        ]
+        for key, items in diff.items()
+    }
+
+
+def decode_diff(data):
+    """encode_diff の逆変換"""
+    def parse(field, value):
+        if field in DIFF_DATE_FIELDS:
+            return parse_date(value)
+        if field in DIFF_TIME_FIELDS:
+            return parse_time(value)
+        return value
+
+    return {
+        key: [{field: parse(field, value) for field, value in item.items()} for item in items]
+        for key, items in data.items()
+    }
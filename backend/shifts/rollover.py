@@ -0,0 +1,73 @@
+"""月の切り替え処理
+
+新しい月の提出状況と下書きを全従業員分まとめて作成し、
+リクエスト処理では読み込みだけで済むようにする。
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from accounts.models import Employee
+from .models import DraftShiftRequest, ShiftRequest, ShiftSubmissionStatus
+
+
+def next_month(today=None):
+    """翌月の (年, 月)"""
+    today = today or date.today()
+    if today.month == 12:
+        return today.year + 1, 1
+    return today.year, today.month + 1
+
+
+def prepare_month(year, month):
+    """指定月の提出状況・下書きを未作成の従業員分だけ作成し、作成件数を返す
+
+    既存の提出状況・下書きはそのまま残すため、何度実行してもよい。
+    """
+    with transaction.atomic():
+        # 従業員の行をロックし、終わるまで他のリクエストが同じ従業員の提出状況・下書きを作成しないようにする
+        employee_ids = list(Employee.objects.select_for_update().values_list('id', flat=True))
+
+        # ignore_conflicts で作成しなかった行も bulk_create の戻り値に含まれるため、
+        # 作成件数は前後の行数の差で数える
+        statuses = ShiftSubmissionStatus.objects.filter(year=year, month=month)
+        drafts = DraftShiftRequest.objects.filter(year=year, month=month)
+        statuses_before, drafts_before = statuses.count(), drafts.count()
+
+        existing_statuses = set(statuses.values_list('employee_id', flat=True))
+        ShiftSubmissionStatus.objects.bulk_create([
+            ShiftSubmissionStatus(employee_id=employee_id, year=year, month=month)
+            for employee_id in employee_ids
+            if employee_id not in existing_statuses
+        ], ignore_conflicts=True)
+
+        existing_drafts = set(drafts.values_list('employee_id', flat=True))
+        missing = [employee_id for employee_id in employee_ids if employee_id not in existing_drafts]
+
+        # 各従業員の最新の提出（対象月より前）から希望時間・日数を引き継ぐ
+        latest_ids = Employee.objects.filter(id__in=missing).annotate(
+            latest_request_id=Subquery(
+                DraftShiftRequest.carryover_requests(year, month).filter(
+                    employee=OuterRef('pk')
+                ).values('id')[:1]
+            )
+        ).values_list('latest_request_id', flat=True)
+        last_requests = {
+            shift_request.employee_id: shift_request
+            for shift_request in ShiftRequest.objects.filter(id__in=[i for i in latest_ids if i])
+        }
+        DraftShiftRequest.objects.bulk_create([
+            DraftShiftRequest(
+                employee_id=employee_id,
+                year=year,
+                month=month,
+                **DraftShiftRequest.initial_values(last_requests.get(employee_id))
+            )
+            for employee_id in missing
+        ], ignore_conflicts=True)
+
+        return {
+            'statuses': statuses.count() - statuses_before,
+            'drafts': drafts.count() - drafts_before,
+        }
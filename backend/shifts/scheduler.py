@@ -0,0 +1,478 @@
+"""シフト自動作成エンジン
+
+提出済みの ShiftRequest の勤務可能ビット列（shifts.availability）から「従業員 × 日 × 15分スロット」の
+勤務可能行列を作り、貪欲法でシフトを割り当てる。勤務可能な時間が途切れる日は最も長い連続区間を1シフトとする。
+各割り当て後は変化した日の列だけを再計算する（増分スコアリング）。
+作成後に一部の日の希望が変わった場合は、その日だけを割り当て直して差分を返す（resolve_schedule）。
+"""
+import calendar
+import datetime
+
+import numpy as np
+
+from .availability import MonthAvailability
+from .models import AVAILABILITY_SLOT_MINUTES, ShiftRequest
+
+SLOT_MINUTES = AVAILABILITY_SLOT_MINUTES
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DEFAULT_REQUIRED_STAFF = 2
+
+# スキル列の並び（skills 行列の列順）
+SKILL_FIELDS = [
+    'can_open',
+    'can_close_cleaning',
+    'can_close_cashier',
+    'can_close_floor',
+    'can_order',
+]
+OPEN_SKILLS = [0]
+CLOSE_SKILLS = [1, 2, 3]
+ORDER_SKILLS = [4]
+
+# スコアの重み
+SKILL_WEIGHT = 40.0
+MIN_HOURS_WEIGHT = 2.0
+BEGINNER_PENALTY = 0.5
+
+
+def longest_runs(availability):
+    """(E, D, S) の勤務可能スロットを日ごとに最も長い連続区間だけに絞る（同じ長さなら早い方）
+
+    1人1日1シフトのため、途中に勤務できない時間がある日は1つの区間だけを使う。
+    """
+    result = availability.copy()
+    previous = np.zeros_like(availability)
+    previous[..., 1:] = availability[..., :-1]
+    starts = availability & ~previous
+    for e, d in zip(*np.nonzero(starts.sum(axis=2) > 1)):
+        row = availability[e, d]
+        begin = np.flatnonzero(starts[e, d])
+        end = np.flatnonzero(row & ~np.append(row[1:], False)) + 1
+        k = int(np.argmax(end - begin))
+        result[e, d] = False
+        result[e, d, begin[k]:end[k]] = True
+    return result
+
+
+def slot_to_time(slot):
+    """スロット番号を時刻に変換"""
+    if slot >= SLOTS_PER_DAY:
+        return datetime.time(23, 59)
+    minutes = slot * SLOT_MINUTES
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+class SchedulingProblem:
+    """1ヶ月分のシフト作成問題"""
+
+    def __init__(self, year, month, employees, availability, skills,
+                 min_hours, max_hours, min_days_per_week, max_days_per_week,
+                 required_staff=DEFAULT_REQUIRED_STAFF):
+        self.year = year
+        self.month = month
+        self.days = calendar.monthrange(year, month)[1]
+        self.dates = [datetime.date(year, month, d + 1) for d in range(self.days)]
+
+        self.employees = list(employees)
+        # 勤務可能行列 (E, D, S)。1日の勤務は連続した1区間に絞る
+        self.availability = longest_runs(np.asarray(availability, dtype=bool))
+        self.availability_count = self.availability.astype(np.int32)
+        self.skills = np.asarray(skills, dtype=bool)  # (E, K)
+        self.is_beginner = np.array(
+            [getattr(e, 'is_beginner', False) for e in self.employees], dtype=bool
+        )
+        self.min_hours = np.asarray(min_hours, dtype=float)
+        self.max_hours = np.asarray(max_hours, dtype=float)
+        self.min_days_per_week = np.asarray(min_days_per_week, dtype=int)
+        self.max_days_per_week = np.asarray(max_days_per_week, dtype=int)
+
+        # 日 → 週番号（月内の ISO 週を 0 から振り直す）
+        iso_weeks = [d.isocalendar()[:2] for d in self.dates]
+        week_ids = {w: i for i, w in enumerate(sorted(set(iso_weeks)))}
+        self.week_of_day = np.array([week_ids[w] for w in iso_weeks], dtype=int)
+        self.weeks = len(week_ids)
+        week_lengths = np.bincount(self.week_of_day, minlength=self.weeks)
+        self.full_weeks = week_lengths == 7
+
+        # 必要人数: 誰かが勤務可能なスロットに required_staff 人（可能人数が上限）
+        available_count = self.availability.sum(axis=0)  # (D, S)
+        self.demand = np.minimum(available_count, required_staff)
+
+        # 開店・閉店スロット（需要がない日は -1）
+        has_demand = self.demand > 0
+        any_demand = has_demand.any(axis=1)
+        first = has_demand.argmax(axis=1)
+        last = SLOTS_PER_DAY - 1 - has_demand[:, ::-1].argmax(axis=1)
+        self.open_slot = np.where(any_demand, first, -1)
+        self.close_slot = np.where(any_demand, last, -1)
+
+    @classmethod
+    def from_month(cls, year, month, required_staff=DEFAULT_REQUIRED_STAFF):
+        """指定月に提出されたシフト希望から問題を作成"""
+        data = MonthAvailability.load(year, month)
+        by_id = ShiftRequest.objects.select_related('employee').in_bulk(data.request_ids.tolist())
+        requests = [by_id[request_id] for request_id in data.request_ids.tolist()]
+        employees = [r.employee for r in requests]
+        availability = data.matrix
+
+        skills = [[getattr(e, f) for f in SKILL_FIELDS] for e in employees]
+        return cls(
+            year, month, employees, availability,
+            np.array(skills, dtype=bool).reshape(len(employees), len(SKILL_FIELDS)),
+            [r.min_hours for r in requests],
+            [r.max_hours for r in requests],
+            [r.min_days_per_week for r in requests],
+            [r.max_days_per_week for r in requests],
+            required_staff=required_staff,
+        )
+
+    def assignment_matrix(self, assignments):
+        """[{'employee_id', 'date'}, ...] を割り当て行列 (E, D) に変換
+
+        提出のない従業員・対象月以外の日は無視する。
+        """
+        index = {employee.id: i for i, employee in enumerate(self.employees)}
+        assigned = np.zeros((len(self.employees), self.days), dtype=bool)
+        for item in assignments:
+            e = index.get(item['employee_id'])
+            date = item['date']
+            if e is None or (date.year, date.month) != (self.year, self.month):
+                continue
+            assigned[e, date.day - 1] = True
+        return assigned
+
+
+class Schedule:
+    """シフト作成結果"""
+
+    def __init__(self, problem, assigned):
+        self.problem = problem
+        self.assigned = assigned  # (E, D) bool
+
+    @property
+    def coverage(self):
+        """スロットごとの配置人数 (D, S)"""
+        return np.einsum('ed,eds->ds', self.assigned, self.problem.availability_count)
+
+    @property
+    def hours(self):
+        """従業員ごとの月間労働時間"""
+        p = self.problem
+        slots = np.einsum('ed,eds->e', self.assigned, p.availability_count)
+        return slots * SLOT_MINUTES / 60
+
+    @property
+    def days_per_week(self):
+        """従業員ごとの週あたり勤務日数 (E, W)"""
+        p = self.problem
+        week_matrix = np.zeros((p.days, p.weeks), dtype=int)
+        week_matrix[np.arange(p.days), p.week_of_day] = 1
+        return self.assigned.astype(int) @ week_matrix
+
+    def violations(self):
+        """制約違反の一覧"""
+        p = self.problem
+        result = []
+        hours = self.hours
+        days_per_week = self.days_per_week
+
+        for i, employee in enumerate(p.employees):
+            if hours[i] < p.min_hours[i]:
+                result.append({
+                    'type': 'min_hours',
+                    'employee_id': employee.id,
+                    'value': float(hours[i]),
+                    'limit': float(p.min_hours[i]),
+                })
+            if hours[i] > p.max_hours[i]:
+                result.append({
+                    'type': 'max_hours',
+                    'employee_id': employee.id,
+                    'value': float(hours[i]),
+                    'limit': float(p.max_hours[i]),
+                })
+            short_weeks = np.flatnonzero(
+                p.full_weeks & (days_per_week[i] < p.min_days_per_week[i])
+            )
+            for w in short_weeks:
+                result.append({
+                    'type': 'min_days_per_week',
+                    'employee_id': employee.id,
+                    'week': int(w),
+                    'value': int(days_per_week[i, w]),
+                    'limit': int(p.min_days_per_week[i]),
+                })
+            # 上限は月の途中で切れる週も対象にする
+            long_weeks = np.flatnonzero(days_per_week[i] > p.max_days_per_week[i])
+            for w in long_weeks:
+                result.append({
+                    'type': 'max_days_per_week',
+                    'employee_id': employee.id,
+                    'week': int(w),
+                    'value': int(days_per_week[i, w]),
+                    'limit': int(p.max_days_per_week[i]),
+                })
+
+        coverage = self.coverage
+        for d in range(p.days):
+            if p.open_slot[d] < 0:
+                continue
+            on_duty = self.assigned[:, d]
+            checks = [
+                ('open', OPEN_SKILLS, p.availability[:, d, p.open_slot[d]]),
+                ('close', CLOSE_SKILLS, p.availability[:, d, p.close_slot[d]]),
+                ('order', ORDER_SKILLS, np.ones(len(p.employees), dtype=bool)),
+            ]
+            for name, columns, present in checks:
+                staff = on_duty & present
+                for k in columns:
+                    if not (staff & p.skills[:, k]).any():
+                        result.append({
+                            'type': 'skill',
+                            'skill': SKILL_FIELDS[k],
+                            'date': p.dates[d],
+                            'role': name,
+                        })
+            shortage = int(np.maximum(p.demand[d] - coverage[d], 0).sum())
+            if shortage:
+                result.append({
+                    'type': 'shortage',
+                    'date': p.dates[d],
+                    'slots': shortage,
+                })
+        return result
+
+    def assignment(self, e, d):
+        """1件の割り当て（その日の勤務可能な連続区間）"""
+        p = self.problem
+        slots = np.flatnonzero(p.availability[e, d])
+        return {
+            'employee_id': p.employees[e].id,
+            'date': p.dates[d],
+            'start_time': slot_to_time(int(slots[0])),
+            'end_time': slot_to_time(int(slots[-1]) + 1),
+        }
+
+    def to_dict(self):
+        p = self.problem
+        assignments = [self.assignment(e, d) for e, d in zip(*np.nonzero(self.assigned))]
+        hours = self.hours
+        return {
+            'year': p.year,
+            'month': p.month,
+            'assignments': assignments,
+            'employees': [
+                {
+                    'employee_id': employee.id,
+                    'name': employee.name,
+                    'hours': float(hours[i]),
+                    'days': int(self.assigned[i].sum()),
+                }
+                for i, employee in enumerate(p.employees)
+            ],
+            'violations': self.violations(),
+        }
+
+
+class ScheduleSolver:
+    """勤務可能行列に対する貪欲法ソルバー
+
+    1日1人1シフト（その日の勤務可能な連続区間）を単位として割り当てる。
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+        p = problem
+        self.shift_slots = p.availability.sum(axis=2)  # (E, D)
+        self.shift_hours = self.shift_slots * SLOT_MINUTES / 60
+
+        # 役割判定用: 開店・閉店スロットに勤務可能か (E, D)
+        days = np.arange(p.days)
+        self.covers_open = np.where(
+            p.open_slot >= 0, p.availability[:, days, np.maximum(p.open_slot, 0)], False
+        )
+        self.covers_close = np.where(
+            p.close_slot >= 0, p.availability[:, days, np.maximum(p.close_slot, 0)], False
+        )
+
+    def solve(self, assigned=None, frozen=None):
+        """シフトを割り当てて Schedule を返す
+
+        assigned: 初期割り当て (E, D)。frozen: 変更しないセル (E, D)。
+        """
+        p = self.problem
+        E, D = self.shift_slots.shape
+        assigned = np.zeros((E, D), dtype=bool) if assigned is None else assigned.copy()
+        frozen = np.zeros((E, D), dtype=bool) if frozen is None else frozen
+
+        coverage = np.einsum('ed,eds->ds', assigned, p.availability_count)
+        hours = (assigned * self.shift_hours).sum(axis=1)
+        week_days = np.zeros((E, p.weeks), dtype=int)
+        for w in range(p.weeks):
+            week_days[:, w] = assigned[:, p.week_of_day == w].sum(axis=1)
+
+        # 未充足のスキル (D, K)
+        skill_need = np.zeros((D, len(SKILL_FIELDS)), dtype=bool)
+        active = p.open_slot >= 0
+        skill_need[active] = True
+        skill_need &= ~self._skills_covered(assigned)
+
+        # 初期スコア（全日分）
+        gain = self._coverage_gain(coverage, np.arange(D))  # (E, D)
+
+        # 第1段階: 人員不足を埋める
+        while True:
+            score = self._score(gain, skill_need, hours)
+            feasible = self._feasible(assigned, frozen, hours, week_days)
+            score = np.where(feasible & (score > 0), score, -np.inf)
+            flat = int(np.argmax(score))
+            if not np.isfinite(score.flat[flat]):
+                break
+            e, d = divmod(flat, D)
+            self._assign(e, d, assigned, coverage, hours, week_days, skill_need)
+            gain[:, d] = self._coverage_gain(coverage, [d])[:, 0]
+
+        # 第2段階: 最低労働時間・最低出勤日数を満たすよう追加する
+        while True:
+            below_hours = hours < p.min_hours
+            below_days = (
+                (week_days < p.min_days_per_week[:, None]) & p.full_weeks[None, :]
+            )[:, p.week_of_day]  # (E, D)
+            need = below_hours[:, None] | below_days
+            feasible = self._feasible(assigned, frozen, hours, week_days) & need
+            if not feasible.any():
+                break
+            score = np.where(feasible, gain + self.shift_hours * 0.01, -np.inf)
+            e, d = divmod(int(np.argmax(score)), D)
+            self._assign(e, d, assigned, coverage, hours, week_days, skill_need)
+            gain[:, d] = self._coverage_gain(coverage, [d])[:, 0]
+
+        return Schedule(p, assigned)
+
+    def resolve(self, previous, days):
+        """前回の割り当て previous (E, D) のうち days の日だけを割り当て直す
+
+        days 以外の日は固定する。days の日は勤務できなくなった割り当てだけを外し、
+        残りはそのままにして不足分を追加する（変更を最小限にする）。
+        """
+        days = np.asarray(days, dtype=int)
+        assigned = previous.copy()
+        assigned[:, days] &= self.shift_slots[:, days] > 0
+        frozen = np.ones_like(assigned)
+        frozen[:, days] = False
+        return self.solve(assigned=assigned, frozen=frozen)
+
+    def _coverage_gain(self, coverage, days):
+        """割り当てで埋まる不足スロット数 (E, len(days))"""
+        p = self.problem
+        days = np.asarray(days)
+        deficit = (p.demand[days] - coverage[days]) > 0  # (d, S)
+        return np.einsum(
+            'eds,ds->ed', p.availability_count[:, days], deficit.astype(np.int32)
+        ).astype(float)
+
+    def _skills_covered(self, assigned):
+        """日ごとに各スキルが満たされているか (D, K)"""
+        p = self.problem
+        result = np.zeros((p.days, len(SKILL_FIELDS)), dtype=bool)
+        for columns, present in (
+            (OPEN_SKILLS, self.covers_open),
+            (CLOSE_SKILLS, self.covers_close),
+            (ORDER_SKILLS, np.ones_like(self.covers_open)),
+        ):
+            staff = (assigned & present).astype(int)  # (E, D)
+            result[:, columns] = (staff.T @ p.skills[:, columns].astype(int)) > 0
+        return result
+
+    def _score(self, gain, skill_need, hours):
+        p = self.problem
+        # スキル貢献: 未充足スキルを担当できる日に加点
+        skill_bonus = np.zeros_like(gain)
+        for columns, present in (
+            (OPEN_SKILLS, self.covers_open),
+            (CLOSE_SKILLS, self.covers_close),
+            (ORDER_SKILLS, np.ones_like(self.covers_open)),
+        ):
+            fills = p.skills[:, columns].astype(float) @ skill_need[:, columns].T.astype(float)
+            skill_bonus += fills * present
+
+        # 最低労働時間に届いていない従業員を優先
+        shortfall = np.clip(p.min_hours - hours, 0, None) / np.maximum(p.min_hours, 1)
+        score = gain + SKILL_WEIGHT * skill_bonus + MIN_HOURS_WEIGHT * shortfall[:, None] * (gain > 0)
+        score = np.where(p.is_beginner[:, None], score * BEGINNER_PENALTY, score)
+        return score
+
+    def _feasible(self, assigned, frozen, hours, week_days):
+        p = self.problem
+        within_hours = (hours[:, None] + self.shift_hours) <= p.max_hours[:, None]
+        within_days = (week_days < p.max_days_per_week[:, None])[:, p.week_of_day]
+        return (
+            ~assigned & ~frozen & (self.shift_slots > 0) & within_hours & within_days
+        )
+
+    def _assign(self, e, d, assigned, coverage, hours, week_days, skill_need):
+        p = self.problem
+        assigned[e, d] = True
+        coverage[d] += p.availability[e, d]
+        hours[e] += self.shift_hours[e, d]
+        week_days[e, p.week_of_day[d]] += 1
+        skill_need[d, OPEN_SKILLS] &= ~(p.skills[e, OPEN_SKILLS] & self.covers_open[e, d])
+        skill_need[d, CLOSE_SKILLS] &= ~(p.skills[e, CLOSE_SKILLS] & self.covers_close[e, d])
+        skill_need[d, ORDER_SKILLS] &= ~p.skills[e, ORDER_SKILLS]
+
+
+def generate_schedule(year, month, required_staff=DEFAULT_REQUIRED_STAFF):
+    """指定月のシフトを自動作成"""
+    problem = SchedulingProblem.from_month(year, month, required_staff=required_staff)
+    return ScheduleSolver(problem).solve()
+
+
+def schedule_diff(previous, schedule, days):
+    """前回の割り当て previous（[{'employee_id', 'date', 'start_time', 'end_time'}, ...]）と
+    schedule の days の日の差分
+
+    added / removed: 追加・削除された割り当て。
+    changed: 同じ従業員・日で時間帯が変わった割り当て（previous に時間帯がある場合のみ）。
+    """
+    p = schedule.problem
+    targets = {p.dates[d] for d in days}
+    before = {
+        (item['employee_id'], item['date']): item
+        for item in previous if item['date'] in targets
+    }
+    after = {
+        (p.employees[e].id, p.dates[d]): schedule.assignment(e, d)
+        for d in days
+        for e in np.flatnonzero(schedule.assigned[:, d])
+    }
+
+    changed = []
+    for key in before.keys() & after.keys():
+        old, new = before[key], after[key]
+        if 'start_time' not in old or 'end_time' not in old:
+            continue
+        if (old['start_time'], old['end_time']) != (new['start_time'], new['end_time']):
+            changed.append(new)
+
+    def order(item):
+        return item['date'], item['employee_id']
+
+    return {
+        'added': sorted((after[k] for k in after.keys() - before.keys()), key=order),
+        'removed': sorted((before[k] for k in before.keys() - after.keys()), key=order),
+        'changed': sorted(changed, key=order),
+    }
+
+
+def resolve_schedule(year, month, previous, dates, required_staff=DEFAULT_REQUIRED_STAFF):
+    """作成済みのシフト previous のうち dates の日だけを最新の希望で割り当て直し、差分を返す"""
+    problem = SchedulingProblem.from_month(year, month, required_staff=required_staff)
+    days = sorted({date.day - 1 for date in dates})
+    schedule = ScheduleSolver(problem).resolve(problem.assignment_matrix(previous), days)
+    return {
+        'year': year,
+        'month': month,
+        'dates': [problem.dates[d] for d in days],
+        **schedule_diff(previous, schedule, days),
+        'violations': schedule.violations(),
+    }
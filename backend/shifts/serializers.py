@@ -1,7 +1,13 @@
+import calendar
+import datetime
+from django.db import transaction
 from rest_framework import serializers
+from accounts.models import Employee
+from config.pagination import DynamicFieldsMixin
 from .models import (
     TimePreset, ShiftSubmissionStatus, DraftShiftRequest,
-    DraftShiftDetail, ShiftRequest, ShiftDetail
+    DraftShiftDetail, ShiftRequest, ShiftDetail, ShiftRequestSummary,
+    PublishedSchedule, PublishedAssignment
 )
 
 class TimePresetSerializer(serializers.ModelSerializer):
@@ -37,12 +43,17 @@ class DraftShiftRequestSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'year', 'month', 'min_hours', 'max_hours',
             'min_days_per_week', 'max_days_per_week', 'shift_details',
-            'submission_status'
+            'submission_status', 'version'
         ]
 
     def get_submission_status(self, obj):
+        # ビューで取得済みの場合はそれを使う
+        if 'submission_status' in self.context:
+            status = self.context['submission_status']
+            return ShiftSubmissionStatusSerializer(status).data if status else None
+
         status = ShiftSubmissionStatus.objects.filter(
-            employee=obj.employee,
+            employee_id=obj.employee_id,
             year=obj.year,
             month=obj.month
         ).first()
@@ -82,19 +93,28 @@ class ShiftRequestSerializer(serializers.ModelSerializer):
         year = self.context.get('year')
         month = self.context.get('month')
 
-        # ShiftRequestを作成
-        shift_request = ShiftRequest.objects.create(
-            employee_id=employee_id,
-            year=year,
-            month=month,
-            **validated_data
-        )
+        with transaction.atomic():
+            # ShiftRequestを作成
+            shift_request = ShiftRequest.objects.create(
+                employee_id=employee_id,
+                year=year,
+                month=month,
+                **validated_data
+            )
 
-        # シフト詳細を作成
-        for detail_data in shift_details_data:
-            ShiftDetail.objects.create(
+            # シフト詳細を一括作成
+            details = ShiftDetail.objects.bulk_create([
+                ShiftDetail(shift_request=shift_request, **detail_data)
+                for detail_data in shift_details_data
+            ])
+
+            # 集計を作成
+            ShiftRequestSummary.objects.create(
                 shift_request=shift_request,
-                **detail_data
+                **ShiftRequestSummary.values_for(
+                    shift_request,
+                    ((d.date, d.start_time, d.end_time, d.is_holiday) for d in details)
+                )
             )
 
         return shift_request
@@ -106,13 +126,147 @@ class ShiftRequestSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Minimum days per week cannot be greater than maximum days per week")
         return data
 
-class HistoricalShiftRequestSerializer(serializers.ModelSerializer):
+class ShiftRequestSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShiftRequestSummary
+        fields = ['total_hours', 'available_days', 'days_per_week', 'holiday_count']
+
+class HistoricalShiftRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     shift_details = ShiftDetailSerializer(many=True)
+    summary = ShiftRequestSummarySerializer(read_only=True)
     
     class Meta:
         model = ShiftRequest
         fields = [
             'id', 'year', 'month', 'min_hours', 'max_hours',
             'min_days_per_week', 'max_days_per_week', 'shift_details',
-            'submitted_at'
-        ]
\ No newline at end of file
+            'submitted_at', 'summary'
+        ]
+        # ?expand=shift_details を指定した場合のみ出力（新しいパラメータを使う場合）
+        expandable_fields = ['shift_details']
+
+class MonthlySummarySerializer(serializers.ModelSerializer):
+    """店舗全体の提出状況確認用（希望条件と勤務可能時間の比較）"""
+    employee_id = serializers.IntegerField(source='employee.id')
+    name = serializers.CharField(source='employee.name')
+    summary = ShiftRequestSummarySerializer(read_only=True)
+    meets_min_hours = serializers.SerializerMethodField()
+    meets_min_days_per_week = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShiftRequest
+        fields = [
+            'employee_id', 'name', 'min_hours', 'max_hours',
+            'min_days_per_week', 'max_days_per_week', 'summary',
+            'meets_min_hours', 'meets_min_days_per_week'
+        ]
+
+    def get_meets_min_hours(self, obj):
+        summary = getattr(obj, 'summary', None)
+        return summary.total_hours >= obj.min_hours if summary else None
+
+    def get_meets_min_days_per_week(self, obj):
+        summary = getattr(obj, 'summary', None)
+        if not summary:
+            return None
+        # 月をまたぐ週は判定から除外する
+        return all(
+            summary.days_per_week.get(week, 0) >= obj.min_days_per_week
+            for week in full_iso_weeks(obj.year, obj.month)
+        )
+
+def full_iso_weeks(year, month):
+    """指定月に7日すべてが含まれるISO週の一覧"""
+    days = calendar.monthrange(year, month)[1]
+    counts = {}
+    for day in range(1, days + 1):
+        iso_year, iso_week, _ = datetime.date(year, month, day).isocalendar()
+        week = f'{iso_year}-W{iso_week:02d}'
+        counts[week] = counts.get(week, 0) + 1
+    return [week for week, count in counts.items() if count == 7]
+
+class RosterSerializer(serializers.ModelSerializer):
+    """店舗全体の月間シフト一覧（従業員ごとの提出状況とシフト）"""
+    submission_status = serializers.SerializerMethodField()
+    shift_request = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Employee
+        fields = [
+            'id', 'name', 'can_open', 'can_close_cleaning', 'can_close_cashier',
+            'can_close_floor', 'can_order', 'is_beginner',
+            'submission_status', 'shift_request'
+        ]
+
+    def get_submission_status(self, obj):
+        # ビュー側で一括取得したものをcontextから参照する
+        status = self.context.get('statuses', {}).get(obj.id)
+        return ShiftSubmissionStatusSerializer(status).data if status else None
+
+    def get_shift_request(self, obj):
+        shift_request = self.context.get('shift_requests', {}).get(obj.id)
+        return HistoricalShiftRequestSerializer(shift_request).data if shift_request else None
+
+class ScheduleAssignmentSerializer(serializers.Serializer):
+    """作成済みシフトの1件（自動作成の assignments の要素）"""
+    employee_id = serializers.IntegerField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField(required=False)
+    end_time = serializers.TimeField(required=False)
+
+class ScheduleChangeSerializer(serializers.Serializer):
+    """希望が変更された従業員・日"""
+    employee_id = serializers.IntegerField()
+    date = serializers.DateField()
+
+class ScheduleResolveSerializer(serializers.Serializer):
+    """変更された日だけのシフトの再作成"""
+    assignments = ScheduleAssignmentSerializer(many=True)
+    changes = ScheduleChangeSerializer(many=True, allow_empty=False)
+    required_staff = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_changes(self, changes):
+        year, month = self.context['year'], self.context['month']
+        if any((c['date'].year, c['date'].month) != (year, month) for c in changes):
+            raise serializers.ValidationError("対象月以外の日が含まれています")
+        return changes
+
+class PublishedAssignmentSerializer(serializers.ModelSerializer):
+    employee_id = serializers.IntegerField()
+
+    class Meta:
+        model = PublishedAssignment
+        fields = ['employee_id', 'date', 'start_time', 'end_time']
+
+class PublishedScheduleSerializer(serializers.ModelSerializer):
+    assignments = PublishedAssignmentSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = PublishedSchedule
+        fields = ['year', 'month', 'version', 'message', 'created_at', 'assignments']
+
+class PublishScheduleSerializer(serializers.Serializer):
+    """シフトの公開（自動作成・再作成の assignments をそのまま渡せる）"""
+    assignments = PublishedAssignmentSerializer(many=True)
+    message = serializers.CharField(required=False, allow_blank=True, default='')
+    notify = serializers.BooleanField(default=True)
+
+    def validate_assignments(self, assignments):
+        year, month = self.context['year'], self.context['month']
+        keys = set()
+        for item in assignments:
+            if (item['date'].year, item['date'].month) != (year, month):
+                raise serializers.ValidationError("対象月以外の日が含まれています")
+            if item['start_time'] >= item['end_time']:
+                raise serializers.ValidationError("開始時間は終了時間より前である必要があります")
+            keys.add((item['employee_id'], item['date']))
+        if len(keys) != len(assignments):
+            raise serializers.ValidationError("同じ従業員・日の割り当てが重複しています")
+
+        employee_ids = {employee_id for employee_id, _ in keys}
+        found = set(Employee.objects.filter(id__in=employee_ids).values_list('id', flat=True))
+        if employee_ids - found:
+            raise serializers.ValidationError(
+                f"存在しない従業員が含まれています: {sorted(employee_ids - found)}"
+            )
+        return assignments
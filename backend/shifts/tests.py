@@ -1,3 +1,1066 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import logging
+import re
+import time
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import Employee
+from notifications.models import NotificationJob
+from .availability import MonthAvailability, unpack_availability
+from .bulk import sync_details
+from .management.commands.benchmark_api import SCENARIOS
+from .cache import HISTORY_CACHE_ALIAS
+from .publishing import change_messages
+from .rollover import prepare_month
+from .scheduler import SLOTS_PER_DAY, Schedule, SchedulingProblem, ScheduleSolver, schedule_diff
+from .models import (
+    ShiftSubmissionStatus, SubmissionReceipt, DraftShiftRequest, DraftShiftDetail,
+    ShiftRequest, ShiftDetail, ShiftRequestSummary, PublishedSchedule, DRAFT_CARRYOVER_FIELDS,
+    AVAILABILITY_BYTES, pack_availability
+)
+
+
+def create_shift_request(employee, year, month, days=28):
+    shift_request = ShiftRequest.objects.create(
+        employee=employee, year=year, month=month,
+        min_hours=40, max_hours=80, min_days_per_week=2, max_days_per_week=5
+    )
+    ShiftDetail.objects.bulk_create([
+        ShiftDetail(
+            shift_request=shift_request,
+            date=datetime.date(year, month, day),
+            start_time=datetime.time(9, 0),
+            end_time=datetime.time(17, 0)
+        )
+        for day in range(1, days + 1)
+    ])
+    ShiftRequestSummary.refresh(shift_request)
+    ShiftSubmissionStatus.objects.create(
+        employee=employee, year=year, month=month, is_submitted=True
+    )
+    return shift_request
+
+
+class QueryCountTest(TestCase):
+    """データ量が増えてもエンドポイントのクエリ数が変わらないことを確認"""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches[HISTORY_CACHE_ALIAS].clear()
+
+    def count_queries(self, url):
+        caches[HISTORY_CACHE_ALIAS].clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_history_is_constant_in_months(self):
+        employee = Employee.objects.create(name='履歴')
+        create_shift_request(employee, 2030, 1)
+        url = f'/api/shifts/history/{employee.id}/'
+        baseline = self.count_queries(url)
+
+        for i in range(1, 24):
+            create_shift_request(employee, 2030 + i // 12, i % 12 + 1)
+        self.assertEqual(self.count_queries(url), baseline)
+
+    def test_roster_is_constant_in_employees(self):
+        self.assert_constant_in_employees('/api/shifts/roster/2030/1/')
+
+    def test_summary_is_constant_in_employees(self):
+        self.assert_constant_in_employees('/api/shifts/summary/2030/1/')
+
+    def test_coverage_is_constant_in_employees(self):
+        self.assert_constant_in_employees('/api/shifts/coverage/2030/1/')
+
+    def test_draft_is_constant_in_days(self):
+        employee = Employee.objects.create(name='下書き')
+        draft = DraftShiftRequest.objects.create(employee=employee, year=2030, month=1)
+        url = f'/api/shifts/draft/{employee.id}/2030/1/'
+        DraftShiftDetail.objects.create(draft=draft, date=datetime.date(2030, 1, 1))
+        # 初回は提出状況が作成されるため2回目から計測する
+        self.client.get(url)
+        baseline = self.count_queries(url)
+
+        DraftShiftDetail.objects.bulk_create([
+            DraftShiftDetail(draft=draft, date=datetime.date(2030, 1, day))
+            for day in range(2, 32)
+        ])
+        self.assertEqual(self.count_queries(url), baseline)
+
+    def test_bootstrap_has_fixed_query_budget(self):
+        employee = Employee.objects.create(name='提出')
+        create_shift_request(employee, 2029, 12)
+        DraftShiftRequest.objects.create(employee=employee, year=2030, month=1)
+        ShiftSubmissionStatus.objects.create(employee=employee, year=2030, month=1)
+        url = f'/api/shifts/bootstrap/{employee.id}/2030/1/'
+        # 従業員・提出状況・下書き・下書きの詳細・プリセット・前月の提出
+        self.assertEqual(self.count_queries(url), 6)
+
+        draft = DraftShiftRequest.objects.get(employee=employee, year=2030, month=1)
+        DraftShiftDetail.objects.bulk_create([
+            DraftShiftDetail(draft=draft, date=datetime.date(2030, 1, day))
+            for day in range(1, 32)
+        ])
+        for i in range(10):
+            employee.time_presets.create(name=f'プリセット{i}', start_time='09:00', end_time='17:00')
+        self.assertEqual(self.count_queries(url), 6)
+
+    def assert_constant_in_employees(self, url):
+        employee = Employee.objects.create(name='従業員0')
+        create_shift_request(employee, 2030, 1)
+        baseline = self.count_queries(url)
+
+        for i in range(1, 100):
+            employee = Employee.objects.create(name=f'従業員{i}')
+            create_shift_request(employee, 2030, 1)
+        self.assertEqual(self.count_queries(url), baseline)
+
+
+class SubmitShiftTest(TestCase):
+    """提出の二重送信・再送"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.employee = Employee.objects.create(name='提出')
+        DraftShiftRequest.objects.create(employee=self.employee, year=2030, month=1)
+        self.url = f'/api/shifts/submit/{self.employee.id}/2030/1/'
+        self.body = {
+            'min_hours': 40, 'max_hours': 80, 'min_days_per_week': 2, 'max_days_per_week': 4,
+            'shift_details': [
+                {'date': '2030-01-07', 'start_time': '09:00', 'end_time': '17:00', 'is_holiday': False},
+            ],
+        }
+
+    def submit(self, body=None, **headers):
+        return self.client.post(self.url, body or self.body, format='json', headers=headers)
+
+    def test_second_submit_is_rejected(self):
+        self.assertEqual(self.submit().status_code, 201)
+        response = self.submit()
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['submitted'])
+        self.assertEqual(ShiftRequest.objects.filter(employee=self.employee).count(), 1)
+
+    def test_replay_returns_stored_response(self):
+        first = self.submit(**{'Idempotency-Key': 'abc'})
+        self.assertEqual(first.status_code, 201)
+        self.assertFalse(DraftShiftRequest.objects.filter(employee=self.employee).exists())
+
+        replay = self.submit(**{'Idempotency-Key': 'abc'})
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay['Idempotency-Replayed'], 'true')
+        self.assertEqual(ShiftRequest.objects.filter(employee=self.employee).count(), 1)
+        self.assertEqual(SubmissionReceipt.objects.count(), 1)
+
+    def test_failed_submit_is_not_stored(self):
+        body = dict(self.body, shift_details=[{'date': 'x'}])
+        self.assertEqual(self.submit(body, **{'Idempotency-Key': 'abc'}).status_code, 400)
+        self.assertEqual(self.submit(**{'Idempotency-Key': 'abc'}).status_code, 201)
+
+
+class SubmissionStreamTest(TestCase):
+    """提出状況の配信"""
+
+    async def test_stream_sends_snapshot_and_changes(self):
+        employee = await Employee.objects.acreate(name='配信')
+        await ShiftSubmissionStatus.objects.acreate(
+            employee=employee, year=2030, month=1, is_submitted=True
+        )
+        response = await self.async_client.get('/api/shifts/submissions/2030/1/stream/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertIn(f'"{employee.id}": true'.encode(), await anext(stream))
+
+        await self.async_client.post(f'/api/shifts/history/{employee.id}/reset/')
+        event = await anext(stream)
+        self.assertTrue(event.startswith(b'event: status'))
+        self.assertIn(b'"is_submitted": false', event)
+        await response.streaming_content.aclose()
+
+
+class SolveTest(SimpleTestCase):
+    """シフトの自動作成と制約違反"""
+
+    def make_problem(self, availability=None, skills=None, **constraints):
+        n = 4
+        if availability is None:
+            availability = np.zeros((n, 31, SLOTS_PER_DAY), dtype=bool)
+            availability[:, :, 36:68] = True  # 全員が毎日 9:00〜17:00
+        employees = [SimpleNamespace(id=i + 1, name=f'従業員{i}', is_beginner=False) for i in range(n)]
+        values = {'min_hours': 40, 'max_hours': 200, 'min_days_per_week': 2, 'max_days_per_week': 5}
+        values.update(constraints)
+        return SchedulingProblem(
+            2030, 1, employees, availability,
+            np.ones((n, 5), dtype=bool) if skills is None else skills,
+            *([v] * n if np.isscalar(v) else v for v in values.values())
+        )
+
+    def solve(self, problem):
+        schedule = ScheduleSolver(problem).solve()
+        return schedule, schedule.violations()
+
+    def types(self, violations):
+        return {v['type'] for v in violations}
+
+    def test_feasible_problem_has_no_violations(self):
+        schedule, violations = self.solve(self.make_problem())
+        self.assertEqual(violations, [])
+        # 毎日2人以上が 9:00〜17:00 に入り、上限も守る
+        self.assertTrue((schedule.assigned.sum(axis=0) >= 2).all())
+        self.assertTrue((schedule.hours <= 200).all())
+        self.assertTrue((schedule.days_per_week <= 5).all())
+
+    def test_missing_skill(self):
+        skills = np.ones((4, 5), dtype=bool)
+        skills[:, 0] = False  # 開店作業ができる人がいない
+        _, violations = self.solve(self.make_problem(skills=skills))
+        self.assertEqual(self.types(violations), {'skill'})
+        self.assertEqual({v['skill'] for v in violations}, {'can_open'})
+        self.assertEqual(len(violations), 31)
+
+    def test_min_hours_cannot_be_met(self):
+        # 1人目の最低労働時間が上限（週5日 × 8時間）を超える
+        problem = self.make_problem(min_hours=[300, 40, 40, 40], max_hours=400)
+        schedule, violations = self.solve(problem)
+        self.assertEqual(violations, [
+            {'type': 'min_hours', 'employee_id': 1, 'value': float(schedule.hours[0]), 'limit': 300.0}
+        ])
+
+    def test_max_hours_is_respected_and_reported(self):
+        # 上限を守ると人が足りない日は人員不足として報告する
+        schedule, violations = self.solve(self.make_problem(min_hours=0, max_hours=16, min_days_per_week=0))
+        self.assertTrue((schedule.hours <= 16).all())
+        self.assertIn('shortage', self.types(violations))
+        self.assertNotIn('max_hours', self.types(violations))
+        # 手直しで上限を超えた割り当ては違反として報告する
+        assigned = np.zeros((4, 31), dtype=bool)
+        assigned[0, :3] = True
+        violations = Schedule(schedule.problem, assigned).violations()
+        self.assertIn(
+            {'type': 'max_hours', 'employee_id': 1, 'value': 24.0, 'limit': 16.0}, violations
+        )
+
+    def test_min_days_per_week_cannot_be_met(self):
+        # 1人目は月・火しか勤務できない
+        availability = np.zeros((4, 31, SLOTS_PER_DAY), dtype=bool)
+        availability[:, :, 36:68] = True
+        weekend = [d for d in range(31) if datetime.date(2030, 1, d + 1).weekday() >= 2]
+        availability[0, weekend] = False
+        _, violations = self.solve(self.make_problem(availability, min_hours=0, min_days_per_week=3))
+        short = [v for v in violations if v['type'] == 'min_days_per_week']
+        # 月内に7日ある週（1/7〜1/27 の3週）だけを対象にする
+        self.assertEqual([(v['employee_id'], v['week'], v['value']) for v in short],
+                         [(1, 1, 2), (1, 2, 2), (1, 3, 2)])
+
+    def test_month_of_60_employees_solves_in_seconds(self):
+        rng = np.random.default_rng(0)
+        availability = np.zeros((60, 31, SLOTS_PER_DAY), dtype=bool)
+        starts = rng.integers(28, 56, size=(60, 31))
+        lengths = rng.integers(16, 40, size=(60, 31))
+        for e, d in zip(*np.nonzero(rng.random((60, 31)) < 0.6)):
+            availability[e, d, starts[e, d]:starts[e, d] + lengths[e, d]] = True
+        employees = [SimpleNamespace(id=i + 1, name=f'従業員{i}', is_beginner=i % 5 == 0) for i in range(60)]
+        problem = SchedulingProblem(
+            2030, 1, employees, availability, rng.random((60, 5)) < 0.5,
+            [40] * 60, [120] * 60, [2] * 60, [5] * 60, required_staff=4
+        )
+
+        start = time.perf_counter()
+        schedule = ScheduleSolver(problem).solve()
+        schedule.to_dict()
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertTrue((schedule.hours <= 120).all())
+        self.assertTrue((schedule.days_per_week <= 5).all())
+        self.assertFalse((schedule.assigned & (availability.sum(axis=2) == 0)).any())
+
+
+class AutoScheduleViewTest(TestCase):
+    """提出済みのシフト希望からの自動作成（/api/shifts/auto/）"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.employees = [
+            Employee.objects.create(
+                name=f'従業員{i}', can_open=True, can_close_cleaning=True, can_close_cashier=True,
+                can_close_floor=True, can_order=True
+            )
+            for i in range(4)
+        ]
+        for employee in self.employees:
+            create_shift_request(employee, 2030, 1)
+
+    def test_schedule_from_submitted_requests(self):
+        response = self.client.get('/api/shifts/auto/2030/1/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual({e['employee_id'] for e in data['employees']}, {e.id for e in self.employees})
+        self.assertTrue(data['assignments'])
+        for assignment in data['assignments']:
+            self.assertLessEqual(assignment['date'], '2030-01-28')
+            self.assertEqual((assignment['start_time'], assignment['end_time']), ('09:00:00', '17:00:00'))
+        for employee in data['employees']:
+            self.assertLessEqual(employee['hours'], 80)
+        # 提出のない 29〜31日は人員不足にもスキル不足にもしない
+        self.assertEqual([v for v in data['violations'] if v.get('date', '') > '2030-01-28'], [])
+
+    def test_invalid_required_staff(self):
+        response = self.client.get('/api/shifts/auto/2030/1/?required_staff=x')
+        self.assertEqual(response.status_code, 400)
+
+
+class ResolveTest(SimpleTestCase):
+    """変更された日だけのシフトの再作成"""
+
+    def make_problem(self, availability):
+        employees = [SimpleNamespace(id=i + 1, name=f'従業員{i}', is_beginner=False) for i in range(4)]
+        return SchedulingProblem(
+            2030, 1, employees, availability, np.ones((4, 5), dtype=bool),
+            [0] * 4, [200] * 4, [0] * 4, [7] * 4
+        )
+
+    def setUp(self):
+        self.availability = np.zeros((4, 31, SLOTS_PER_DAY), dtype=bool)
+        self.availability[:, :, 36:68] = True  # 全員が毎日 9:00〜17:00
+        self.schedule = ScheduleSolver(self.make_problem(self.availability)).solve()
+        self.previous = self.schedule.to_dict()['assignments']
+
+    def resolve(self, days):
+        problem = self.make_problem(self.availability)
+        return ScheduleSolver(problem).resolve(problem.assignment_matrix(self.previous), days)
+
+    def test_unchanged_day_has_empty_diff(self):
+        diff = schedule_diff(self.previous, self.resolve([4]), [4])
+        self.assertEqual(diff, {'added': [], 'removed': [], 'changed': []})
+
+    def test_only_changed_day_is_reassigned(self):
+        e = int(np.flatnonzero(self.schedule.assigned[:, 4])[0])
+        self.availability[e, 4] = False
+        resolved = self.resolve([4])
+
+        diff = schedule_diff(self.previous, resolved, [4])
+        self.assertEqual([a['employee_id'] for a in diff['removed']], [e + 1])
+        self.assertEqual(len(diff['added']), 1)
+        self.assertEqual(diff['changed'], [])
+        others = [d for d in range(31) if d != 4]
+        self.assertTrue((resolved.assigned[:, others] == self.schedule.assigned[:, others]).all())
+
+    def test_max_days_per_week_is_reported(self):
+        # 手直しで週の上限を超えた割り当て（2030-01-07〜13 の週に4日）
+        problem = self.make_problem(self.availability)
+        problem.max_days_per_week[:] = 3
+        assigned = np.zeros((4, 31), dtype=bool)
+        assigned[0, 6:10] = True
+        violations = [
+            v for v in Schedule(problem, assigned).violations() if v['type'] == 'max_days_per_week'
+        ]
+        self.assertEqual(violations, [
+            {'type': 'max_days_per_week', 'employee_id': 1, 'week': 1, 'value': 4, 'limit': 3}
+        ])
+
+    def test_shift_does_not_span_unavailable_gap(self):
+        # 9:00〜11:00 と 12:00〜17:00 に勤務可能な日は長い方の区間だけを割り当てる
+        self.availability[:, 4, 44:48] = False
+        schedule = ScheduleSolver(self.make_problem(self.availability)).solve()
+        day = [a for a in schedule.to_dict()['assignments'] if a['date'] == datetime.date(2030, 1, 5)]
+        self.assertTrue(day)
+        for assignment in day:
+            self.assertEqual(
+                (assignment['start_time'], assignment['end_time']), (datetime.time(12, 0), datetime.time(17, 0))
+            )
+        # 労働時間・配置人数も割り当てた区間だけで数える
+        self.assertEqual(int(schedule.problem.availability[0, 4].sum()), 20)
+        self.assertEqual(int(schedule.coverage[4, 40]), 0)
+
+    def test_changed_hours_are_reported(self):
+        e = int(np.flatnonzero(self.schedule.assigned[:, 4])[0])
+        self.availability[e, 4, 60:68] = False  # 15:00 までに変更
+        diff = schedule_diff(self.previous, self.resolve([4]), [4])
+        self.assertEqual(len(diff['changed']), 1)
+        self.assertEqual(diff['changed'][0]['end_time'], datetime.time(15, 0))
+
+
+class PublishedScheduleTest(TestCase):
+    """公開済みシフトの版と差分"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = Employee.objects.create(name='Alice', line_user_id='U123')
+        self.bob = Employee.objects.create(name='Bob')
+        self.url = '/api/shifts/published/2030/1/'
+        self.assignments = [
+            {'employee_id': self.alice.id, 'date': '2030-01-07', 'start_time': '09:00', 'end_time': '17:00'},
+            {'employee_id': self.bob.id, 'date': '2030-01-07', 'start_time': '12:00', 'end_time': '20:00'},
+            {'employee_id': self.bob.id, 'date': '2030-01-08', 'start_time': '12:00', 'end_time': '20:00'},
+        ]
+
+    def publish(self, assignments):
+        return self.client.post(
+            self.url, {'assignments': assignments, 'notify': False}, format='json'
+        )
+
+    def test_versions_and_diff(self):
+        self.assertEqual(self.publish(self.assignments).data['version'], 1)
+        changed = [
+            dict(self.assignments[0], end_time='15:00'),
+            self.assignments[1],
+            {'employee_id': self.alice.id, 'date': '2030-01-09', 'start_time': '09:00', 'end_time': '13:00'},
+        ]
+        response = self.publish(changed)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['version'], 2)
+        diff = response.data['diff']
+        self.assertEqual([(a['employee_id'], str(a['date'])) for a in diff['added']], [(self.alice.id, '2030-01-09')])
+        self.assertEqual([(a['employee_id'], str(a['date'])) for a in diff['removed']], [(self.bob.id, '2030-01-08')])
+        self.assertEqual(diff['changed'][0]['previous_end_time'], datetime.time(17, 0))
+
+        # 同じ内容は新しい版にしない
+        self.assertFalse(self.publish(changed).data['created'])
+        self.assertEqual(self.client.get(self.url).data['version'], 2)
+        self.assertEqual(len(self.client.get(self.url + '?version=1').data['assignments']), 3)
+        response = self.client.get(self.url + 'diff/')
+        self.assertEqual((response.data['from'], response.data['to']), (1, 2))
+        self.assertEqual(len(response.data['changed']), 1)
+
+    def test_versions_are_immutable(self):
+        self.publish(self.assignments)
+        schedule = PublishedSchedule.objects.get()
+        schedule.message = '変更'
+        with self.assertRaises(ValueError):
+            schedule.save()
+        with self.assertRaises(ValueError):
+            schedule.delete()
+
+        assignment = schedule.assignments.first()
+        assignment.end_time = datetime.time(23, 0)
+        with self.assertRaises(ValueError):
+            assignment.save()
+        with self.assertRaises(ValueError):
+            assignment.delete()
+        self.assertEqual(schedule.assignments.count(), 3)
+        self.assertEqual(schedule.assignment_map(), PublishedSchedule.objects.get().assignment_map())
+
+    def test_employee_on_published_version_cannot_be_deleted(self):
+        self.publish(self.assignments)
+        before = PublishedSchedule.objects.get().assignment_map()
+        response = self.client.delete(f'/api/accounts/employees/{self.bob.id}/')
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Employee.objects.filter(id=self.bob.id).exists())
+        self.assertEqual(PublishedSchedule.objects.get().assignment_map(), before)
+
+    @mock.patch('notifications.jobs.line_delivery')
+    def test_change_notification_is_queued(self, delivery):
+        self.assertEqual(self.publish(self.assignments).status_code, 201)
+        response = self.client.post(self.url, {
+            'assignments': [dict(self.assignments[0], end_time='15:00'), *self.assignments[1:]],
+        }, format='json')
+        # 送信はワーカーで行い、公開のリクエストではLINEに送らない
+        self.assertEqual(response.status_code, 202)
+        job = NotificationJob.objects.get(id=response.data['notification']['job_id'])
+        self.assertEqual(job.kind, NotificationJob.KIND_SCHEDULE_CHANGES)
+        self.assertEqual(job.payload['schedule_id'], PublishedSchedule.objects.get(version=2).id)
+        delivery.send_many.assert_not_called()
+
+    def test_messages_only_cover_changes(self):
+        self.publish(self.assignments)
+        self.publish([
+            dict(self.assignments[0], end_time='15:00'),
+            *self.assignments[1:],
+        ])
+        schedule = PublishedSchedule.objects.get(version=2)
+        diff = self.client.get(self.url + 'diff/').data
+        messages = change_messages(schedule, diff)
+        # Aliceには個別に送り、変更のないBobには送らない
+        self.assertEqual(list(messages), ['U123'])
+        self.assertIn('1/7(月) 9:00-17:00 → 9:00-15:00', messages['U123'])
+
+
+class HistoryCacheTest(TestCase):
+    """履歴のキャッシュが書き込みで無効になること"""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches[HISTORY_CACHE_ALIAS].clear()
+        self.employee = Employee.objects.create(name='履歴')
+        create_shift_request(self.employee, 2030, 1, days=3)
+        self.url = f'/api/shifts/history/{self.employee.id}/'
+
+    def end_times(self, response):
+        return [str(detail['end_time']) for detail in response.json()[0]['shift_details']]
+
+    def test_update_shift_invalidates_cache(self):
+        before = self.client.get(self.url)
+        self.assertEqual(self.end_times(before), ['17:00:00'] * 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(f'{self.url}update/', {
+                'year': 2030, 'month': 1, 'date': '2030-01-02',
+                'start_time': '09:00', 'end_time': '12:00', 'is_holiday': False,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        after = self.client.get(self.url)
+        self.assertEqual(self.end_times(after), ['17:00:00', '12:00:00', '17:00:00'])
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        # 古いETagでの条件付きGETは新しい内容を返す
+        response = self.client.get(self.url, headers={'If-None-Match': before['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_reset_shift_invalidates_cache(self):
+        self.assertEqual(len(self.client.get(self.url).json()), 1)
+        key = f'history:{self.employee.id}:all:all'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.client.post(f'{self.url}reset/').status_code, 200)
+        # 削除がコミットされるまではキャッシュを消さない
+        self.assertIsNotNone(caches[HISTORY_CACHE_ALIAS].get(key))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(caches[HISTORY_CACHE_ALIAS].get(key))
+        self.assertEqual(self.client.get(self.url).json(), [])
+
+    def test_stale_entry_is_not_served_with_new_etag(self):
+        self.client.get(self.url)
+        # 削除が届かなかったワーカーを想定してキャッシュを残したまま直接更新する
+        detail = ShiftDetail.objects.get(shift_request__employee=self.employee, date='2030-01-03')
+        detail.end_time = datetime.time(13, 0)
+        detail.save()
+        ShiftRequestSummary.refresh(detail.shift_request)
+        self.assertEqual(self.end_times(self.client.get(self.url)), ['17:00:00', '17:00:00', '13:00:00'])
+
+    def test_stats_are_kept_in_cache(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        stats = self.client.get('/api/shifts/history/cache-stats/').json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+        # 数はキャッシュに置き、キャッシュを共有する他のワーカーからも見える
+        self.assertEqual(caches[HISTORY_CACHE_ALIAS].get('history-stats:hits'), 1)
+
+
+class RolloverTest(TestCase):
+    """月の切り替え（提出状況・下書きの事前作成）"""
+
+    def setUp(self):
+        self.alice = Employee.objects.create(name='Alice')
+        self.bob = Employee.objects.create(name='Bob')
+
+    def test_second_run_is_noop(self):
+        self.assertEqual(prepare_month(2030, 2), {'statuses': 2, 'drafts': 2})
+        draft = DraftShiftRequest.objects.get(employee=self.alice, year=2030, month=2)
+        draft.min_hours = 10
+        draft.save()
+
+        self.assertEqual(prepare_month(2030, 2), {'statuses': 0, 'drafts': 0})
+        self.assertEqual(ShiftSubmissionStatus.objects.filter(year=2030, month=2).count(), 2)
+        self.assertEqual(DraftShiftRequest.objects.filter(year=2030, month=2).count(), 2)
+        # 作成済みの下書きは上書きしない
+        draft.refresh_from_db()
+        self.assertEqual(draft.min_hours, 10)
+
+    def test_carryover_from_latest_request(self):
+        older = create_shift_request(self.alice, 2029, 11)
+        latest = create_shift_request(self.alice, 2030, 1)
+        later = create_shift_request(self.alice, 2030, 3)
+        ShiftRequest.objects.filter(id=older.id).update(min_hours=10, max_hours=20)
+        ShiftRequest.objects.filter(id=latest.id).update(
+            min_hours=30, max_hours=60, min_days_per_week=1, max_days_per_week=3
+        )
+        ShiftRequest.objects.filter(id=later.id).update(min_hours=99, max_hours=99)
+        prepare_month(2030, 2)
+
+        # 対象月より前の最新の提出（2030年1月）から引き継ぐ
+        draft = DraftShiftRequest.objects.get(employee=self.alice, year=2030, month=2)
+        latest.refresh_from_db()
+        for field in DRAFT_CARRYOVER_FIELDS:
+            self.assertEqual(getattr(draft, field), getattr(latest, field))
+        # 提出のない従業員は空の下書き
+        draft = DraftShiftRequest.objects.get(employee=self.bob, year=2030, month=2)
+        self.assertEqual([getattr(draft, field) for field in DRAFT_CARRYOVER_FIELDS], [None] * 4)
+
+        # 事前に作成していない場合も同じ提出から引き継ぐ
+        DraftShiftRequest.objects.filter(employee=self.alice, year=2030, month=2).delete()
+        draft = DraftShiftRequest.get_or_create_for_month(self.alice, 2030, 2)
+        for field in DRAFT_CARRYOVER_FIELDS:
+            self.assertEqual(getattr(draft, field), getattr(latest, field))
+
+    def test_only_new_rows_are_counted(self):
+        ShiftSubmissionStatus.objects.create(employee=self.alice, year=2030, month=2)
+        DraftShiftRequest.objects.create(employee=self.bob, year=2030, month=2)
+        self.assertEqual(prepare_month(2030, 2), {'statuses': 1, 'drafts': 1})
+
+
+class AvailabilityTest(TestCase):
+    """勤務可能スロットのビット列の変換と読み込み"""
+
+    def slots(self, matrix, day):
+        return list(np.flatnonzero(matrix[day - 1]))
+
+    def test_pack_unpack_round_trip(self):
+        t = datetime.time
+        details = [
+            # 15分に満たない端は含めない（9:15〜10:15 の4スロット）
+            (datetime.date(2030, 1, 1), t(9, 10), t(10, 20), False),
+            # 日の始まりと終わり
+            (datetime.date(2030, 1, 2), t(0, 0), t(0, 15), False),
+            (datetime.date(2030, 1, 2), t(23, 30), t(23, 59), False),
+            # 月末（31日）の最後のスロット
+            (datetime.date(2030, 1, 31), t(23, 45), t(23, 59), False),
+            (datetime.date(2030, 1, 31), t(22, 0), t(23, 45), False),
+            # 休み・時間なし・他の月は含めない
+            (datetime.date(2030, 1, 3), t(9, 0), t(17, 0), True),
+            (datetime.date(2030, 1, 4), None, None, False),
+            (datetime.date(2030, 2, 1), t(9, 0), t(17, 0), False),
+        ]
+        blob = pack_availability(details, 2030, 1)
+        self.assertEqual(len(blob), AVAILABILITY_BYTES)
+
+        matrix = unpack_availability([blob], days=31)[0]
+        self.assertEqual(matrix.shape, (31, 96))
+        self.assertEqual(self.slots(matrix, 1), [37, 38, 39, 40])
+        self.assertEqual(self.slots(matrix, 2), [0, 94])
+        self.assertEqual(self.slots(matrix, 31), list(range(88, 95)))
+        self.assertEqual(int(matrix.sum()), 4 + 2 + 7)
+
+    def test_unpack_pads_missing_and_short_blobs(self):
+        blob = pack_availability(
+            [(datetime.date(2030, 4, 30), datetime.time(0, 0), datetime.time(1, 0), False)], 2030, 4
+        )
+        matrix = unpack_availability([None, blob, blob[:10]], days=30)
+        self.assertEqual(matrix.shape, (3, 30, 96))
+        self.assertFalse(matrix[0].any())
+        self.assertEqual(self.slots(matrix[1], 30), [0, 1, 2, 3])
+        self.assertFalse(matrix[2].any())
+
+    def test_load_keeps_rows_aligned(self):
+        employees = [Employee.objects.create(name=f'従業員{i}', can_open=i % 2 == 0) for i in range(3)]
+        requests = [create_shift_request(employee, 2030, 1, days=i + 1) for i, employee in enumerate(employees)]
+        data = MonthAvailability.load(2030, 1, employee_fields=['can_open'])
+        self.assertEqual(list(data.request_ids), [r.id for r in requests])
+        self.assertEqual(list(data.employee_ids), [e.id for e in employees])
+        self.assertEqual(data.employee_values.tolist(), [[True], [False], [True]])
+        self.assertEqual(list(data.hours()), [8.0, 16.0, 24.0])
+
+        empty = MonthAvailability.load(2031, 1, employee_fields=['can_open'])
+        self.assertEqual(empty.matrix.shape, (0, 31, 96))
+        self.assertEqual(empty.employee_values.shape, (0, 1))
+
+
+class DraftSaveTest(TestCase):
+    """下書き保存での詳細の差分更新"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.employee = Employee.objects.create(name='下書き')
+        self.url = f'/api/shifts/draft/{self.employee.id}/2030/1/'
+
+    def save(self, *days, **fields):
+        details = [
+            {'date': f'2030-01-{day:02d}', 'start_time': start, 'end_time': end, 'is_holiday': False}
+            for day, start, end in days
+        ]
+        return self.client.post(self.url, {'shift_details': details, **fields}, format='json')
+
+    def detail_ids(self):
+        return dict(DraftShiftDetail.objects.values_list('date__day', 'id'))
+
+    @override_settings(DEBUG=True)
+    def test_query_count_header(self):
+        self.save((1, '09:00', '17:00'))
+        response = self.client.get(self.url, headers={'Origin': 'http://localhost:3000'})
+        # Server-Timing と同じ件数を返し、ブラウザから読めるよう公開する
+        queries = re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1)
+        self.assertEqual(response['X-Query-Count'], queries)
+        self.assertIn('x-query-count', response['Access-Control-Expose-Headers'].split(', '))
+
+    def test_post_syncs_details_by_date(self):
+        response = self.save(
+            (1, '09:00', '17:00'), (2, '09:00', '17:00'), (3, '09:00', '17:00'), min_hours=40
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['min_hours'], 40)
+        before = self.detail_ids()
+        self.assertEqual(list(before), [1, 2, 3])
+
+        # 1日は変更なし、2日は時間を変更、3日は削除、4日は追加
+        response = self.save((1, '09:00', '17:00'), (2, '10:00', '15:00'), (4, '12:00', '18:00'))
+        self.assertEqual(response.status_code, 200)
+        after = self.detail_ids()
+        self.assertEqual(list(after), [1, 2, 4])
+        # 既存の行は作り直さずに更新する
+        self.assertEqual(after[1], before[1])
+        self.assertEqual(after[2], before[2])
+        detail = DraftShiftDetail.objects.get(date__day=2)
+        self.assertEqual((detail.start_time, detail.end_time), (datetime.time(10, 0), datetime.time(15, 0)))
+        self.assertEqual(
+            [d['date'] for d in response.data['shift_details']],
+            ['2030-01-01', '2030-01-02', '2030-01-04']
+        )
+        # 保存のたびにバージョンを上げる
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(response['ETag'], DraftShiftRequest.objects.get().etag)
+
+    def test_sync_details_counts(self):
+        draft = DraftShiftRequest.objects.create(employee=self.employee, year=2030, month=1)
+        fields = ['start_time', 'end_time', 'is_holiday', 'color']
+        day = datetime.date(2030, 1, 1)
+        nine, five = datetime.time(9, 0), datetime.time(17, 0)
+        details = [{'date': day, 'start_time': nine, 'end_time': five, 'is_holiday': False}]
+        self.assertEqual(
+            sync_details(DraftShiftDetail, 'draft', draft, details, fields),
+            {'created': 1, 'updated': 0, 'deleted': 0}
+        )
+        # 同じ内容なら書き込まない
+        with CaptureQueriesContext(connection) as queries:
+            result = sync_details(DraftShiftDetail, 'draft', draft, details, fields)
+        self.assertEqual(result, {'created': 0, 'updated': 0, 'deleted': 0})
+        self.assertFalse([
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ])
+        self.assertEqual(
+            sync_details(DraftShiftDetail, 'draft', draft, [], fields),
+            {'created': 0, 'updated': 0, 'deleted': 1}
+        )
+
+
+class DraftPatchTest(TestCase):
+    """下書きの日ごとの更新（PATCH / DELETE）と古い書き込みの拒否"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.employee = Employee.objects.create(name='下書き')
+        self.draft = DraftShiftRequest.objects.create(employee=self.employee, year=2030, month=1)
+        DraftShiftDetail.objects.create(
+            draft=self.draft, date=datetime.date(2030, 1, 1),
+            start_time=datetime.time(9, 0), end_time=datetime.time(17, 0)
+        )
+        self.url = f'/api/shifts/draft/{self.employee.id}/2030/1/'
+
+    def days(self):
+        return {
+            detail.date.day: (detail.start_time, detail.end_time, detail.is_holiday)
+            for detail in DraftShiftDetail.objects.filter(draft=self.draft)
+        }
+
+    def test_patch_single_day(self):
+        response = self.patch_day('2030-01-01', {'end_time': '12:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+        self.assertEqual(response['ETag'], '"draft-%d-1"' % self.draft.id)
+        # 指定しなかった項目はそのまま
+        self.assertEqual(self.days(), {1: (datetime.time(9, 0), datetime.time(12, 0), False)})
+
+    def test_patch_batch_and_delete(self):
+        response = self.client.patch(self.url, {'shift_details': [
+            {'date': '2030-01-02', 'is_holiday': True},
+            {'date': '2030-01-03', 'start_time': '10:00', 'end_time': '14:00'},
+            {'date': '2030-01-01', 'deleted': True},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([d['date'] for d in response.data['shift_details']], ['2030-01-02', '2030-01-03'])
+        self.assertEqual(response.data['deleted'], [datetime.date(2030, 1, 1)])
+        self.assertEqual(self.days(), {
+            2: (None, None, True),
+            3: (datetime.time(10, 0), datetime.time(14, 0), False),
+        })
+
+        response = self.client.delete(f'{self.url}2030-01-03/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.days()), [2])
+        self.assertEqual(DraftShiftRequest.objects.get().version, 2)
+
+    def patch_day(self, date, body, **headers):
+        return self.client.patch(f'{self.url}{date}/', body, format='json', headers=headers)
+
+    def test_stale_version_is_rejected(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.patch_day('2030-01-02', {'is_holiday': True}, **{'If-Match': etag}).status_code, 200)
+        # 同じETag（更新前）での書き込みは412
+        response = self.patch_day('2030-01-03', {'is_holiday': True}, **{'If-Match': etag})
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.data['version'], 1)
+        # 本文の version でも同じ
+        response = self.client.patch(self.url, {
+            'version': 0, 'shift_details': [{'date': '2030-01-03', 'is_holiday': True}]
+        }, format='json')
+        self.assertEqual(response.status_code, 412)
+        self.assertNotIn(3, self.days())
+        # 弱いETag（圧縮後）も受け付ける
+        response = self.patch_day('2030-01-03', {'is_holiday': True}, **{'If-Match': 'W/' + response['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_date_in_other_month_is_rejected(self):
+        response = self.patch_day('2030-02-01', {'is_holiday': True})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(self.url, {'shift_details': [
+            {'date': '2030-01-02', 'is_holiday': True},
+            {'date': '2029-12-31', 'deleted': True},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(self.days()), [1])
+
+
+class MonthlySummaryTest(TestCase):
+    """提出の集計（ShiftRequestSummary）と希望条件の判定"""
+
+    def create_request(self, name, days, min_days_per_week=2, start=datetime.time(9, 0)):
+        employee = Employee.objects.create(name=name)
+        shift_request = ShiftRequest.objects.create(
+            employee=employee, year=2030, month=1,
+            min_hours=10, max_hours=80, min_days_per_week=min_days_per_week, max_days_per_week=5
+        )
+        ShiftDetail.objects.bulk_create([
+            ShiftDetail(
+                shift_request=shift_request, date=datetime.date(2030, 1, day),
+                start_time=start, end_time=datetime.time(17, 0)
+            )
+            for day in days
+        ])
+        return ShiftRequestSummary.refresh(shift_request)
+
+    def test_summary_values(self):
+        summary = self.create_request('集計', [7, 8], start=datetime.time(8, 30))
+        ShiftDetail.objects.bulk_create([
+            ShiftDetail(shift_request=summary.shift_request, date=datetime.date(2030, 1, 9), is_holiday=True),
+            # 時間のない日・終了が開始以前の日は数えない
+            ShiftDetail(shift_request=summary.shift_request, date=datetime.date(2030, 1, 10)),
+            ShiftDetail(
+                shift_request=summary.shift_request, date=datetime.date(2030, 1, 14),
+                start_time=datetime.time(17, 0), end_time=datetime.time(9, 0)
+            ),
+            ShiftDetail(
+                shift_request=summary.shift_request, date=datetime.date(2030, 1, 31),
+                start_time=datetime.time(9, 0), end_time=datetime.time(12, 15)
+            ),
+        ])
+        summary = ShiftRequestSummary.refresh(summary.shift_request)
+        self.assertEqual(summary.total_hours, 8.5 * 2 + 3.25)
+        self.assertEqual(summary.available_days, 3)
+        self.assertEqual(summary.days_per_week, {'2030-W02': 2, '2030-W05': 1})
+        self.assertEqual(summary.holiday_count, 1)
+
+    def test_partial_weeks_are_not_judged(self):
+        # 2030年1月: 1〜6日（W01）と28〜31日（W05）は月をまたぐ週
+        full_weeks = [7, 8, 14, 15, 21, 22]
+        self.create_request('満たす', full_weeks)
+        self.create_request('不足', [7, 8, 14, 21, 22, 1, 2, 28, 29])
+        response = self.client.get('/api/shifts/summary/2030/1/')
+        self.assertEqual(response.status_code, 200)
+        results = {e['name']: e for e in response.json()['employees']}
+        self.assertTrue(results['満たす']['meets_min_days_per_week'])
+        self.assertTrue(results['満たす']['meets_min_hours'])
+        self.assertEqual(results['満たす']['summary']['available_days'], 6)
+        # 月をまたぐ週で多く働いても、W03 の不足は補えない
+        self.assertFalse(results['不足']['meets_min_days_per_week'])
+
+
+class CoverageTest(TestCase):
+    """スロットごとの勤務可能人数"""
+
+    def setUp(self):
+        self.client = APIClient()
+        t = datetime.time
+        for name, start, end, skills in [
+            ('開店', t(9, 0), t(17, 0), {'can_open': True}),
+            ('昼', t(9, 15), t(12, 0), {'can_order': True}),
+            ('新人', t(9, 0), t(17, 0), {'can_open': True, 'is_beginner': True}),
+        ]:
+            employee = Employee.objects.create(name=name, **skills)
+            shift_request = ShiftRequest.objects.create(
+                employee=employee, year=2030, month=1,
+                min_hours=0, max_hours=80, min_days_per_week=0, max_days_per_week=5
+            )
+            ShiftDetail.objects.create(
+                shift_request=shift_request, date=datetime.date(2030, 1, 2), start_time=start, end_time=end
+            )
+            ShiftRequestSummary.refresh(shift_request)
+
+    def get(self, **params):
+        response = self.client.get('/api/shifts/coverage/2030/1/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_per_15_minutes(self):
+        data = self.get()
+        self.assertEqual(len(data['dates']), 31)
+        self.assertEqual(len(data['slot_times']), 96)
+        day = data['total'][1]
+        # 新人は数えない
+        self.assertEqual([day[35], day[36], day[37], day[47], day[48], day[67], day[68]], [0, 1, 2, 2, 1, 1, 0])
+        self.assertEqual(data['skills']['can_open'][1][37], 1)
+        self.assertEqual(data['skills']['can_order'][1][37], 1)
+        self.assertEqual(data['skills']['can_close_floor'][1][37], 0)
+        self.assertEqual(sum(data['total'][0]), 0)
+
+    def test_30_minute_slots_need_full_cover(self):
+        data = self.get(slot_minutes=30)
+        self.assertEqual(data['slot_times'][18], '09:00:00')
+        day = data['total'][1]
+        # 9:00〜9:30 は9:15からの人を含めない
+        self.assertEqual([day[18], day[19], day[23], day[24]], [1, 2, 2, 1])
+
+    def test_invalid_slot_minutes(self):
+        self.assertEqual(self.client.get('/api/shifts/coverage/2030/1/', {'slot_minutes': 20}).status_code, 400)
+
+
+class ConditionalGetTest(TestCase):
+    """ETag / If-None-Match による304"""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches[HISTORY_CACHE_ALIAS].clear()
+        self.employee = Employee.objects.create(name='条件付き')
+        self.employee.time_presets.create(name='朝', start_time='07:00', end_time='12:00')
+        create_shift_request(self.employee, 2029, 12, days=3)
+        DraftShiftRequest.objects.create(employee=self.employee, year=2030, month=1)
+        ShiftSubmissionStatus.objects.create(employee=self.employee, year=2030, month=1)
+        self.urls = [
+            f'/api/shifts/presets/{self.employee.id}/',
+            '/api/accounts/employees/',
+            f'/api/shifts/draft/{self.employee.id}/2030/1/',
+            f'/api/shifts/history/{self.employee.id}/',
+        ]
+
+    def test_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                response = self.client.get(url, headers={'If-None-Match': etag})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(self.client.get(url, headers={'If-None-Match': '"other"'}).status_code, 200)
+
+    @override_settings(COMPRESSION_MIN_BYTES=0)
+    def test_weak_etag_after_gzip(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                etag = response['ETag']
+                self.assertTrue(etag.startswith('W/"'))
+                # 圧縮後の弱いETagでも304になり、304は圧縮しない
+                response = self.client.get(url, headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_change_updates_etag(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        self.employee.time_presets.create(name='夜', start_time='17:00', end_time='22:00')
+        self.employee.name = '変更'
+        self.employee.save()
+        self.client.patch(f'{self.urls[2]}2030-01-05/', {'is_holiday': True}, format='json')
+        self.client.post(f'{self.urls[3]}reset/')
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+
+class KeysetPaginationTest(TestCase):
+    """cursor / page_size によるページ分割と fields / expand による項目の選択"""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches[HISTORY_CACHE_ALIAS].clear()
+        self.employee = Employee.objects.create(name='履歴')
+        for month in range(1, 6):
+            create_shift_request(self.employee, 2030, month, days=2)
+        self.url = f'/api/shifts/history/{self.employee.id}/'
+
+    def pages(self, url):
+        """next をたどって全ページの results を返す"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json()['results'])
+            url = response.json()['next']
+        return pages
+
+    def test_history_pages_follow_cursor(self):
+        pages = self.pages(self.url + '?page_size=2')
+        self.assertEqual([[r['month'] for r in page] for page in pages], [[5, 4], [3, 2], [1]])
+        # 新しいパラメータを使う場合、入れ子の詳細は expand を指定したときだけ
+        self.assertNotIn('shift_details', pages[0][0])
+        self.assertIn('summary', pages[0][0])
+
+    def test_employee_pages_break_ties_by_id(self):
+        Employee.objects.bulk_create([Employee(name=f'従業員{i}') for i in range(4)])
+        Employee.objects.update(created_at=datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc))
+        pages = self.pages('/api/accounts/employees/?page_size=2&fields=id,name')
+        ids = [row['id'] for page in pages for row in page]
+        self.assertEqual(ids, sorted(Employee.objects.values_list('id', flat=True)))
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(set(pages[0][0]), {'id', 'name'})
+
+    def test_fields_and_expand(self):
+        rows = self.client.get(self.url + '?fields=year,month').json()
+        self.assertEqual([set(row) for row in rows], [{'year', 'month'}] * 5)
+
+        rows = self.client.get(self.url + '?fields=month&expand=shift_details').json()
+        self.assertEqual(set(rows[0]), {'month', 'shift_details'})
+        self.assertEqual(len(rows[0]['shift_details']), 2)
+
+        # パラメータなしは従来どおり全項目
+        rows = self.client.get(self.url).json()
+        self.assertIn('shift_details', rows[0])
+        self.assertIn('submitted_at', rows[0])
+
+    def test_bad_cursor_is_not_found(self):
+        for url in (self.url, '/api/accounts/employees/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url + '?cursor=not-a-cursor').status_code, 404)
+                # 形式は正しくても並び順の項目数が違うカーソル
+                self.assertEqual(self.client.get(url + '?cursor=WyIxIl0=').status_code, 404)
+
+
+class BenchmarkApiTest(TransactionTestCase):
+    """benchmark_api を少ない回数で実行できること"""
+
+    def setUp(self):
+        for i in range(3):
+            create_shift_request(Employee.objects.create(name=f'計測{i}'), 2030, 1, days=3)
+        # コマンドが変更するログレベルを元に戻す
+        for name in ('config.metrics', 'django.request'):
+            logger = logging.getLogger(name)
+            self.addCleanup(logger.setLevel, logger.level)
+
+    def benchmark(self, *args):
+        output = io.StringIO()
+        call_command('benchmark_api', '--requests', '2', *args, stdout=output)
+        return json.loads(output.getvalue())
+
+    def test_all_scenarios_run_without_errors(self):
+        # テスト用のSQLiteは同時の書き込みでロックエラーになるため1クライアントで実行する
+        report = self.benchmark('--clients', '1')
+        self.assertEqual(report['employees'], 3)
+        self.assertEqual(set(report['scenarios']), set(SCENARIOS))
+        for name, result in report['scenarios'].items():
+            with self.subTest(scenario=name):
+                self.assertGreater(result['requests'], 0)
+                self.assertEqual(result['errors'], 0, result['status_codes'])
+        # 計測用の月は終了時に削除する
+        self.assertFalse(ShiftRequest.objects.filter(year=2099).exists())
+
+    def test_losing_submitters_are_not_errors(self):
+        race = self.benchmark('--clients', '2', '--scenarios', 'submit_race')['scenarios']['submit_race']
+        # キーなしの連打への「提出済」（400）は rejected として数える
+        self.assertEqual(race['shift_requests'], 1)
+        self.assertEqual(race['errors'], 0, race['status_codes'])
+        self.assertEqual(race['rejected'], race['status_codes'].get('400', 0))
+        self.assertGreater(race['rejected'], 0)
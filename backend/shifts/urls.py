@@ -14,17 +14,34 @@ urlpatterns = [
     path('draft/<int:employee_id>/<int:year>/<int:month>/',
          views.DraftShiftView.as_view(),
          name='draft-shift'),
+    path('draft/<int:employee_id>/<int:year>/<int:month>/<str:date>/',
+         views.DraftShiftDayView.as_view(),
+         name='draft-shift-day'),
     
+    # シフト提出画面の初期データ（下書き・提出状況・プリセット・前月の集計）
+    path('bootstrap/<int:employee_id>/<int:year>/<int:month>/',
+         views.SubmitBootstrapView.as_view(),
+         name='submit-bootstrap'),
+
     # シフト提出
     path('submit/<int:employee_id>/<int:year>/<int:month>/',
          views.SubmitShiftView.as_view(),
          name='submit-shift'),
          
+    # 提出状況の変更の配信（Server-Sent Events）
+    path('submissions/<int:year>/<int:month>/stream/',
+         views.submission_stream,
+         name='submission-stream'),
+
     # シフト履歴
     path('history/<int:employee_id>/',
          views.HistoricalShiftView.as_view(),
          name='shift-history'),
 
+     path('history/cache-stats/',
+          views.history_cache_stats,
+          name='history-cache-stats'),
+
      path('history/<int:employee_id>/update/',
           views.update_shift,
           name='update-shift'),
@@ -40,4 +57,37 @@ urlpatterns = [
      path('history/<int:employee_id>/reset/',
           views.reset_shift,
           name='reset-shift'),
+
+     # 全従業員の月間シフト一覧
+     path('roster/<int:year>/<int:month>/',
+          views.RosterView.as_view(),
+          name='shift-roster'),
+
+     # 全従業員の勤務可能時間・日数の集計
+     path('summary/<int:year>/<int:month>/',
+          views.MonthlySummaryView.as_view(),
+          name='monthly-summary'),
+
+     # 時間帯ごとの勤務可能人数
+     path('coverage/<int:year>/<int:month>/',
+          views.CoverageView.as_view(),
+          name='shift-coverage'),
+
+     # シフト自動作成
+     path('auto/<int:year>/<int:month>/',
+          views.AutoScheduleView.as_view(),
+          name='auto-schedule'),
+
+     # 希望が変更された日だけのシフトの再作成（差分を返す）
+     path('auto/<int:year>/<int:month>/resolve/',
+          views.AutoScheduleResolveView.as_view(),
+          name='auto-schedule-resolve'),
+
+     # 公開済みシフト（版ごとに保存）と版の差分
+     path('published/<int:year>/<int:month>/',
+          views.PublishedScheduleView.as_view(),
+          name='published-schedule'),
+     path('published/<int:year>/<int:month>/diff/',
+          views.PublishedScheduleDiffView.as_view(),
+          name='published-schedule-diff'),
 ]
\ No newline at end of file
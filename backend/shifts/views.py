@@ -1,18 +1,88 @@
 from rest_framework import status, views, generics
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from accounts.models import Employee
+from notifications.jobs import enqueue_schedule_changes
+from config.conditional import aggregate_validators, conditional_get, request_etag
+from config.pagination import KeysetPagination, field_selection
+from .bulk import sync_details, patch_details
+from .cache import get_history, invalidate_history, cache_stats
+from .coverage import coverage_heatmap
+from .events import publish_submission_status, stream_submission_status
+from .publishing import publish_schedule, version_diff
+from .scheduler import generate_schedule, resolve_schedule, DEFAULT_REQUIRED_STAFF
 from .models import (
-    TimePreset, ShiftSubmissionStatus, DraftShiftRequest,
-    DraftShiftDetail, ShiftRequest, ShiftDetail
+    TimePreset, ShiftSubmissionStatus, SubmissionReceipt, DraftShiftRequest,
+    DraftShiftDetail, ShiftRequest, ShiftDetail, ShiftRequestSummary, PublishedSchedule
 )
 from .serializers import (
-    TimePresetSerializer, DraftShiftRequestSerializer,
-    ShiftRequestSerializer, HistoricalShiftRequestSerializer
+    TimePresetSerializer, DraftShiftRequestSerializer, DraftShiftDetailSerializer,
+    ShiftSubmissionStatusSerializer,
+    ShiftRequestSerializer, HistoricalShiftRequestSerializer,
+    RosterSerializer, MonthlySummarySerializer, ScheduleResolveSerializer,
+    PublishedScheduleSerializer, PublishScheduleSerializer
 )
 
+class QueryCounter:
+    """connection.execute_wrapper として実行したSQLの件数を数える"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+class QueryCountMixin:
+    """DEBUG時にリクエストごとのクエリ数をレスポンスヘッダーに付与"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not settings.DEBUG:
+            return super().dispatch(request, *args, **kwargs)
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+        response['X-Query-Count'] = str(counter.count)
+        return response
+
+def preset_list_validators(request, employee_id):
+    """プリセット一覧のETag・Last-Modified"""
+    return aggregate_validators(
+        f'presets-{employee_id}', TimePreset.objects.filter(employee_id=employee_id), 'updated_at'
+    )
+
+def draft_validators(request, employee_id, year, month):
+    """下書きのETag（If-Matchと同じ値）・Last-Modified"""
+    row = DraftShiftRequest.objects.filter(
+        employee_id=employee_id, year=year, month=month
+    ).values_list('id', 'version', 'updated_at').first()
+    if row is None:
+        return None, None
+    draft_id, version, updated_at = row
+    return DraftShiftRequest(id=draft_id, version=version).etag, updated_at
+
+def history_validators(request, employee_id):
+    """シフト履歴のETag・Last-Modified（提出日時と集計の更新日時から作成）"""
+    queryset = ShiftRequest.objects.filter(employee_id=employee_id)
+    try:
+        if request.GET.get('year'):
+            queryset = queryset.filter(year=int(request.GET['year']))
+        if request.GET.get('month'):
+            queryset = queryset.filter(month=int(request.GET['month']))
+    except ValueError:
+        return None, None
+    return aggregate_validators(
+        f'history-{employee_id}', queryset, 'submitted_at', 'summary__updated_at'
+    )
+
+@conditional_get(preset_list_validators)
 class TimePresetListCreateView(generics.ListCreateAPIView):
     serializer_class = TimePresetSerializer
 
@@ -62,7 +132,8 @@ class TimePresetView(views.APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DraftShiftView(views.APIView):
+@conditional_get(draft_validators)
+class DraftShiftView(QueryCountMixin, views.APIView):
     def get(self, request, employee_id, year, month):
         """下書きシフトの取得"""
         employee = get_object_or_404(Employee, id=employee_id)
@@ -75,10 +146,12 @@ class DraftShiftView(views.APIView):
                 "message": "今月のシフトは提出済です。"
             })
 
-        # 下書きを取得（月初めの場合はリセット）
+        # 下書きを取得（rollover_month で作成済みのため読み込みのみ）
         draft = DraftShiftRequest.get_or_create_for_month(employee, year, month)
-        serializer = DraftShiftRequestSerializer(draft)
-        return Response(serializer.data)
+        serializer = DraftShiftRequestSerializer(
+            draft, context={'submission_status': status_obj}
+        )
+        return Response(serializer.data, headers={'ETag': draft.etag})
 
     def post(self, request, employee_id, year, month):
         """下書きシフトの保存"""
@@ -92,102 +165,560 @@ class DraftShiftView(views.APIView):
                 "message": "今月のシフトは提出済です。"
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        draft = DraftShiftRequest.get_or_create_for_month(employee, year, month)
-        
-        # 基本情報の更新
-        for field in ['min_hours', 'max_hours', 'min_days_per_week', 'max_days_per_week']:
-            if field in request.data:
-                setattr(draft, field, request.data[field])
-        draft.save()
-
-        # シフト詳細の更新
+        # シフト詳細の検証
+        details = None
         if 'shift_details' in request.data:
-            DraftShiftDetail.objects.filter(draft=draft).delete()
-            for detail in request.data['shift_details']:
-                DraftShiftDetail.objects.create(
-                    draft=draft,
-                    date=detail['date'],
-                    start_time=detail.get('start_time'),
-                    end_time=detail.get('end_time'),
-                    is_holiday=detail.get('is_holiday', False),
-                    color=detail.get('color')
+            detail_serializer = DraftShiftDetailSerializer(
+                data=request.data['shift_details'], many=True
+            )
+            if not detail_serializer.is_valid():
+                return Response(detail_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            details = detail_serializer.validated_data
+
+        with transaction.atomic():
+            draft = DraftShiftRequest.get_or_create_for_month(employee, year, month)
+
+            # 基本情報の更新
+            for field in ['min_hours', 'max_hours', 'min_days_per_week', 'max_days_per_week']:
+                if field in request.data:
+                    setattr(draft, field, request.data[field])
+            draft.version = F('version') + 1
+            draft.save()
+            draft.refresh_from_db(fields=['version'])
+
+            # シフト詳細の差分更新
+            if details is not None:
+                sync_details(
+                    DraftShiftDetail, 'draft', draft, details,
+                    ['start_time', 'end_time', 'is_holiday', 'color']
                 )
 
-        serializer = DraftShiftRequestSerializer(draft)
-        return Response(serializer.data)
+        serializer = DraftShiftRequestSerializer(
+            draft, context={'submission_status': status_obj}
+        )
+        return Response(serializer.data, headers={'ETag': draft.etag})
 
-class SubmitShiftView(views.APIView):
-    def post(self, request, employee_id, year, month):
-        """シフトの最終提出"""
-        employee = get_object_or_404(Employee, id=employee_id)
-        
-        # シフト提出状況を確認
-        status_obj = ShiftSubmissionStatus.get_or_create_for_month(employee, year, month)
-        if status_obj.is_submitted:
-            return Response({
-                "submitted": True,
-                "message": "今月のシフトは提出済です。"
-            }, status=status.HTTP_400_BAD_REQUEST)
+    def patch(self, request, employee_id, year, month):
+        """変更された日の下書きシフトだけを更新"""
+        details = request.data.get('shift_details')
+        if not isinstance(details, list):
+            return Response(
+                {"error": "shift_details は配列である必要があります"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return patch_draft_details(request, employee_id, year, month, details)
+
+class DraftShiftDayView(QueryCountMixin, views.APIView):
+    def patch(self, request, employee_id, year, month, date):
+        """1日分の下書きシフトを更新"""
+        detail = {**request.data, 'date': date}
+        return patch_draft_details(request, employee_id, year, month, [detail])
+
+    def delete(self, request, employee_id, year, month, date):
+        """1日分の下書きシフトを削除"""
+        detail = {'date': date, 'deleted': True}
+        return patch_draft_details(request, employee_id, year, month, [detail])
+
+def patch_draft_details(request, employee_id, year, month, details):
+    """下書きシフトの差分更新（If-Match / version で古い書き込みを拒否）"""
+    employee = get_object_or_404(Employee, id=employee_id)
+
+    status_obj = ShiftSubmissionStatus.objects.filter(
+        employee=employee, year=year, month=month
+    ).first()
+    if status_obj and status_obj.is_submitted:
+        return Response({
+            "submitted": True,
+            "message": "今月のシフトは提出済です。"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # 削除指定とそれ以外を分けて検証
+    deleted_items = [d for d in details if isinstance(d, dict) and d.get('deleted')]
+    changed_items = [d for d in details if not (isinstance(d, dict) and d.get('deleted'))]
+    detail_serializer = DraftShiftDetailSerializer(
+        data=changed_items, many=True, partial=True
+    )
+    date_serializer = DraftShiftDetailSerializer(
+        data=[{'date': d.get('date')} for d in deleted_items], many=True, partial=True
+    )
+    if not detail_serializer.is_valid():
+        return Response(detail_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    if not date_serializer.is_valid():
+        return Response(date_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    changes = {}
+    for item in detail_serializer.validated_data:
+        if 'date' not in item:
+            return Response({"error": "date は必須です"}, status=status.HTTP_400_BAD_REQUEST)
+        changes[item.pop('date')] = item
+    deleted = [item['date'] for item in date_serializer.validated_data]
 
-        # 下書きデータの取得
+    for date in list(changes) + deleted:
+        if date.year != year or date.month != month:
+            return Response(
+                {"error": f"{date} は {year}年{month}月の日付ではありません"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    with transaction.atomic():
         draft = get_object_or_404(
-            DraftShiftRequest,
+            DraftShiftRequest.objects.select_for_update(),
             employee=employee,
             year=year,
             month=month
         )
 
-        serializer = ShiftRequestSerializer(
-            data=request.data,
-            context={
-                'employee_id': employee_id,
-                'year': year,
-                'month': month
-            }
+        # 古いバージョンに基づく書き込みを拒否
+        expected = request.headers.get('If-Match')
+        if expected is None and 'version' in request.data:
+            expected = DraftShiftRequest(id=draft.id, version=request.data['version']).etag
+        if expected is not None and expected.removeprefix('W/') != draft.etag:
+            return Response({
+                "error": "下書きが他の端末で更新されています。再読み込みしてください。",
+                "version": draft.version
+            }, status=status.HTTP_412_PRECONDITION_FAILED, headers={'ETag': draft.etag})
+
+        updated = patch_details(
+            DraftShiftDetail, 'draft', draft, changes, deleted,
+            ['start_time', 'end_time', 'is_holiday', 'color']
         )
-        
-        if serializer.is_valid():
-            try:
-                shift_request = serializer.save()
-                
-                # 提出状況を更新
-                status_obj.is_submitted = True
-                status_obj.submitted_at = timezone.now()
-                status_obj.save()
-                
-                # 下書きデータを削除
-                draft.delete()
-                
+        DraftShiftRequest.objects.filter(id=draft.id).update(
+            version=F('version') + 1,
+            updated_at=timezone.now()
+        )
+        draft.version += 1
+
+    return Response({
+        'version': draft.version,
+        'shift_details': DraftShiftDetailSerializer(updated, many=True).data,
+        'deleted': deleted
+    }, headers={'ETag': draft.etag})
+
+class SubmitBootstrapView(QueryCountMixin, views.APIView):
+    def get(self, request, employee_id, year, month):
+        """シフト提出画面の初期表示に必要なデータをまとめて取得
+
+        下書き・提出状況・時間帯プリセット・前月の提出内容の集計を1回で返す。
+        """
+        employee = get_object_or_404(Employee, id=employee_id)
+        status_obj = ShiftSubmissionStatus.get_or_create_for_month(employee, year, month)
+
+        # 提出済みの場合は下書きを返さない
+        draft = None
+        if not status_obj.is_submitted:
+            draft = DraftShiftRequest.get_or_create_for_month(employee, year, month)
+
+        presets = TimePreset.objects.filter(employee=employee)
+
+        last_year, last_month = (year - 1, 12) if month == 1 else (year, month - 1)
+        last_request = ShiftRequest.objects.filter(
+            employee=employee, year=last_year, month=last_month
+        ).select_related('employee', 'summary').first()
+
+        headers = {'ETag': draft.etag} if draft else {}
+        return Response({
+            'employee': {'id': employee.id, 'name': employee.name},
+            'submission_status': ShiftSubmissionStatusSerializer(status_obj).data,
+            'draft': DraftShiftRequestSerializer(
+                draft, context={'submission_status': status_obj}
+            ).data if draft else None,
+            'presets': TimePresetSerializer(presets, many=True).data,
+            'last_month': MonthlySummarySerializer(last_request).data if last_request else None,
+        }, headers=headers)
+
+
+def submission_receipt(employee, key):
+    """Idempotency-Key に対応する保存済みの提出結果"""
+    if key is None:
+        return None
+    return SubmissionReceipt.objects.filter(employee=employee, key=key).first()
+
+def replay_submission(receipt, year, month):
+    """保存済みの提出結果をそのまま返す"""
+    if (receipt.year, receipt.month) != (year, month):
+        return Response({
+            "error": "この Idempotency-Key は別の月の提出に使用されています。"
+        }, status=status.HTTP_409_CONFLICT)
+    return Response(
+        receipt.response,
+        status=receipt.status_code,
+        headers={'Idempotency-Replayed': 'true'}
+    )
+
+class SubmitShiftView(QueryCountMixin, views.APIView):
+    def post(self, request, employee_id, year, month):
+        """シフトの最終提出
+
+        提出状況の行をロックし、提出・状況の更新・下書きの削除を1つのトランザクションで行う。
+        連打や再送が重なっても提出されるのは1回だけで、2回目以降は「提出済」になる。
+        Idempotency-Key ヘッダーが同じ再送には最初の提出のレスポンスを返す。
+        """
+        employee = get_object_or_404(Employee, id=employee_id)
+        key = request.headers.get('Idempotency-Key')
+        if key is not None and not 0 < len(key) <= 255:
+            return Response({
+                "error": "Idempotency-Key は1〜255文字で指定してください。"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        receipt = submission_receipt(employee, key)
+        if receipt is not None:
+            return replay_submission(receipt, year, month)
+
+        # ロックする行を先に用意する（同時に作成された場合は get_or_create が既存の行を返す）
+        ShiftSubmissionStatus.get_or_create_for_month(employee, year, month)
+
+        with transaction.atomic():
+            status_obj = ShiftSubmissionStatus.objects.select_for_update().get(
+                employee=employee,
+                year=year,
+                month=month
+            )
+
+            # ロックを待つ間に同じキーの提出が完了していた場合
+            receipt = submission_receipt(employee, key)
+            if receipt is not None:
+                return replay_submission(receipt, year, month)
+
+            # シフト提出状況を確認
+            if status_obj.is_submitted:
                 return Response({
-                    "message": "シフトを提出しました。",
-                    "shift": serializer.data
-                }, status=status.HTTP_201_CREATED)
+                    "submitted": True,
+                    "message": "今月のシフトは提出済です。"
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # 下書きデータの取得
+            draft = get_object_or_404(
+                DraftShiftRequest,
+                employee=employee,
+                year=year,
+                month=month
+            )
+
+            serializer = ShiftRequestSerializer(
+                data=request.data,
+                context={
+                    'employee_id': employee_id,
+                    'year': year,
+                    'month': month
+                }
+            )
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            data = {
+                "message": "シフトを提出しました。",
+                "shift": None
+            }
+            try:
+                with transaction.atomic():
+                    serializer.save()
+                    data["shift"] = serializer.data
+
+                    # 提出状況を更新
+                    status_obj.is_submitted = True
+                    status_obj.submitted_at = timezone.now()
+                    status_obj.save(update_fields=['is_submitted', 'submitted_at', 'updated_at'])
+
+                    # 下書きデータを削除
+                    draft.delete()
+
+                    if key is not None:
+                        SubmissionReceipt.objects.create(
+                            employee=employee,
+                            key=key,
+                            year=year,
+                            month=month,
+                            status_code=status.HTTP_201_CREATED,
+                            response=data
+                        )
             except Exception as e:
                 return Response({
                     "error": str(e)
                 }, status=status.HTTP_400_BAD_REQUEST)
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        invalidate_history(employee.id, [(year, month)])
+        publish_submission_status(employee.id, year, month, True, status_obj.submitted_at)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+async def submission_stream(request, year, month):
+    """提出状況の変更を Server-Sent Events で配信
+
+    接続を保持し続けるため ASGI（config.asgi）で起動した場合のみ対応する。
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            '提出状況の配信はASGIサーバーでのみ利用できます。',
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+            content_type='text/plain; charset=utf-8'
+        )
+    response = StreamingHttpResponse(
+        stream_submission_status(year, month),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx などのプロキシでバッファリングさせない
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+class HistoryPagination(KeysetPagination):
+    """(employee, year, month) のインデックスを使って新しい月から順に分割"""
+    ordering = ('-year', '-month')
+
+@conditional_get(history_validators)
 class HistoricalShiftView(views.APIView):
     def get(self, request, employee_id):
         """過去のシフト履歴の取得"""
         employee = get_object_or_404(Employee, id=employee_id)
         
-        year = request.query_params.get('year')
-        month = request.query_params.get('month')
-        
-        queryset = ShiftRequest.objects.filter(employee=employee)
-        
-        if year:
-            queryset = queryset.filter(year=year)
-        if month:
-            queryset = queryset.filter(month=month)
-            
-        queryset = queryset.order_by('-year', '-month')
-        
-        serializer = HistoricalShiftRequestSerializer(queryset, many=True)
-        return Response(serializer.data)
+        try:
+            year = int(request.query_params['year']) if request.query_params.get('year') else None
+            month = int(request.query_params['month']) if request.query_params.get('month') else None
+        except ValueError:
+            return Response(
+                {"error": "year と month は整数である必要があります"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def filtered():
+            queryset = ShiftRequest.objects.filter(
+                employee=employee
+            ).select_related('summary')
+            if year:
+                queryset = queryset.filter(year=year)
+            if month:
+                queryset = queryset.filter(month=month)
+            return queryset
+
+        # cursor / page_size / fields / expand を指定した場合はページ分割・項目選択する
+        fields, expand = field_selection(request)
+        if fields is not None or expand is not None:
+            queryset = filtered()
+            if 'shift_details' in expand or 'shift_details' in (fields or ()):
+                queryset = queryset.prefetch_related('shift_details')
+            paginator = HistoryPagination()
+            page = paginator.paginate_queryset(queryset, request, self)
+            if page is None:
+                page = queryset.order_by('-year', '-month')
+            serializer = HistoricalShiftRequestSerializer(
+                page, many=True, context={'fields': fields, 'expand': expand}
+            )
+            if paginator.is_requested(request):
+                return paginator.get_paginated_response(serializer.data)
+            return Response(serializer.data)
+
+        def load():
+            queryset = filtered().prefetch_related('shift_details').order_by('-year', '-month')
+            serializer = HistoricalShiftRequestSerializer(queryset, many=True)
+            return serializer.data
+
+        return Response(get_history(employee.id, year, month, load, etag=request_etag(request)))
+
+@api_view(['GET'])
+def history_cache_stats(request):
+    """シフト履歴キャッシュのヒット・ミス数"""
+    return Response(cache_stats())
+
+class RosterView(views.APIView):
+    def get(self, request, year, month):
+        """全従業員の指定月のシフトを一括取得"""
+        employees = Employee.objects.all().order_by('created_at')
+
+        # 従業員数に関係なく一定のクエリ数で取得する
+        statuses = {
+            s.employee_id: s
+            for s in ShiftSubmissionStatus.objects.filter(year=year, month=month)
+        }
+        shift_requests = {
+            r.employee_id: r
+            for r in ShiftRequest.objects.filter(
+                year=year, month=month
+            ).select_related('summary').prefetch_related('shift_details')
+        }
+
+        serializer = RosterSerializer(
+            employees,
+            many=True,
+            context={
+                'statuses': statuses,
+                'shift_requests': shift_requests
+            }
+        )
+        return Response({
+            'year': year,
+            'month': month,
+            'employees': serializer.data
+        })
+
+class MonthlySummaryView(views.APIView):
+    def get(self, request, year, month):
+        """全従業員の指定月の勤務可能時間・日数の集計を取得"""
+        queryset = ShiftRequest.objects.filter(
+            year=year, month=month
+        ).select_related('employee', 'summary').order_by('employee__created_at')
+        serializer = MonthlySummarySerializer(queryset, many=True)
+        return Response({
+            'year': year,
+            'month': month,
+            'employees': serializer.data
+        })
+
+class CoverageView(views.APIView):
+    def get(self, request, year, month):
+        """日 × 時間帯ごとの勤務可能人数（スキル別）を取得"""
+        try:
+            slot_minutes = int(request.query_params.get('slot_minutes', 15))
+            data = coverage_heatmap(year, month, slot_minutes=slot_minutes)
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(data)
+
+class AutoScheduleView(views.APIView):
+    def get(self, request, year, month):
+        """提出済みのシフト希望からシフトを自動作成"""
+        try:
+            required_staff = int(
+                request.query_params.get('required_staff', DEFAULT_REQUIRED_STAFF)
+            )
+        except ValueError:
+            return Response(
+                {"error": "required_staff は整数である必要があります"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        schedule = generate_schedule(year, month, required_staff=required_staff)
+        return Response(schedule.to_dict())
+
+class AutoScheduleResolveView(views.APIView):
+    def post(self, request, year, month):
+        """作成済みのシフトのうち希望が変更された日だけを割り当て直し、差分を返す
+
+        assignments: 自動作成の結果（またはそれを手直ししたもの）。
+        changes: update_shift で変更した従業員・日。変更した日以外の割り当てはそのまま残す。
+        """
+        serializer = ScheduleResolveSerializer(
+            data=request.data, context={'year': year, 'month': month}
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        result = resolve_schedule(
+            year, month,
+            data['assignments'],
+            [change['date'] for change in data['changes']],
+            required_staff=data.get('required_staff', DEFAULT_REQUIRED_STAFF)
+        )
+        return Response(result)
+
+def requested_version(request, name='version'):
+    """クエリパラメータの版番号（省略時・不正な値は None）"""
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+def published_schedule(year, month, version=None):
+    """指定した版（省略時は最新）の公開済みシフト"""
+    queryset = PublishedSchedule.objects.filter(year=year, month=month)
+    if version is not None:
+        return queryset.filter(version=version).first()
+    return queryset.order_by('-version').first()
+
+def published_validators(request, year, month):
+    """公開済みシフトのETag・Last-Modified（版は変更されないため版番号で決まる）"""
+    queryset = PublishedSchedule.objects.filter(year=year, month=month)
+    version = requested_version(request)
+    queryset = queryset.filter(version=version) if version is not None else queryset.order_by('-version')
+    row = queryset.values_list('version', 'created_at').first()
+    if row is None:
+        return None, None
+    return f'"published-{year}-{month}-{row[0]}"', row[1]
+
+@conditional_get(published_validators)
+class PublishedScheduleView(views.APIView):
+    def get(self, request, year, month):
+        """公開済みのシフト（?version=N で版を指定、省略時は最新）"""
+        schedule = published_schedule(year, month, requested_version(request))
+        if schedule is None:
+            return Response(
+                {"error": "公開済みのシフトがありません"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        schedule = PublishedSchedule.objects.prefetch_related('assignments').get(id=schedule.id)
+        return Response(PublishedScheduleSerializer(schedule).data)
+
+    def post(self, request, year, month):
+        """シフトを新しい版として公開する
+
+        直前の版から変わっていなければ版を作らない。
+        修正（2版目以降）の場合は、変更のあった従業員・日だけをLINEに通知するジョブを登録し、
+        202とジョブIDを返す（notify=false で通知しない）。
+        """
+        serializer = PublishScheduleSerializer(
+            data=request.data, context={'year': year, 'month': month}
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        try:
+            schedule, diff = publish_schedule(year, month, data['assignments'], data['message'])
+        except IntegrityError:
+            return Response(
+                {"error": "同時に別の版が公開されました。最新の版を確認してください。"},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        if schedule is None:
+            latest = published_schedule(year, month)
+            return Response({
+                "message": "前回の版から変更がありません。",
+                "version": latest.version,
+                "created": False,
+                "diff": diff,
+                "notification": None
+            })
+
+        # 通知はワーカーで送る（LINE APIの遅延・失敗で公開を待たせない）
+        job = None
+        if data['notify'] and schedule.version > 1:
+            job = enqueue_schedule_changes(schedule, diff)
+
+        return Response({
+            "message": f"第{schedule.version}版を公開しました。",
+            "version": schedule.version,
+            "created": True,
+            "diff": diff,
+            "notification": {"job_id": job.id} if job else None
+        }, status=status.HTTP_202_ACCEPTED if job else status.HTTP_201_CREATED)
+
+class PublishedScheduleDiffView(views.APIView):
+    def get(self, request, year, month):
+        """公開済みの2つの版の差分（?from=N&to=M。to の省略時は最新、from の省略時は to の直前の版）"""
+        to_version = requested_version(request, 'to')
+        if to_version is None:
+            latest = published_schedule(year, month)
+            if latest is None:
+                return Response(
+                    {"error": "公開済みのシフトがありません"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            to_version = latest.version
+        from_version = requested_version(request, 'from')
+        if from_version is None:
+            from_version = to_version - 1
+
+        try:
+            diff = version_diff(year, month, from_version, to_version)
+        except PublishedSchedule.DoesNotExist:
+            return Response(
+                {"error": "指定した版がありません"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({"from": from_version, "to": to_version, **diff})
 
 @api_view(['PUT'])
 def update_shift(request, employee_id):
@@ -210,6 +741,11 @@ def update_shift(request, employee_id):
         shift_detail.end_time = request.data.get('end_time')
         shift_detail.is_holiday = request.data.get('is_holiday')
         shift_detail.save()
+
+        # 集計を更新
+        ShiftRequestSummary.refresh(shift_request)
+
+        invalidate_history(employee_id, [(shift_request.year, shift_request.month)])
         
         return Response({
             'message': 'シフトを更新しました',
@@ -238,14 +774,24 @@ def reset_shift(request, employee_id):
         # 対象の従業員を取得
         employee = get_object_or_404(Employee, id=employee_id)
         
-        # シフトリクエストを削除
-        ShiftRequest.objects.filter(employee=employee).delete()
-        
-        # 下書きシフトを削除
-        DraftShiftRequest.objects.filter(employee=employee).delete()
-        
-        # 提出状況をリセット
-        ShiftSubmissionStatus.objects.filter(employee=employee).delete()
+        with transaction.atomic():
+            # シフトリクエストを削除（集計も合わせて削除される）
+            shift_requests = ShiftRequest.objects.filter(employee=employee)
+            history_months = list(shift_requests.values_list('year', 'month'))
+            shift_requests.delete()
+            # 履歴のキャッシュは削除のコミット後に消す
+            invalidate_history(employee.id, history_months)
+
+            # 下書きシフトを削除
+            DraftShiftRequest.objects.filter(employee=employee).delete()
+
+            # 提出状況をリセット
+            statuses = ShiftSubmissionStatus.objects.filter(employee=employee)
+            months = list(statuses.values_list('year', 'month'))
+            statuses.delete()
+
+        for year, month in months:
+            publish_submission_status(employee.id, year, month, False)
         
         return Response({"message": "シフトをリセットしました"})
     except Exception as e:
@@ -45,25 +45,19 @@ export default function ManualShiftCreatePage() {
     const fetchShiftData = async () => {
         setIsLoading(true);
         try {
-            const empResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/accounts/employees/`);
-            const employees = await empResponse.json();
-
             const year = nextMonth.getFullYear();
             const month = nextMonth.getMonth() + 1;
 
-            const shiftsData = await Promise.all(
-                employees.map(async (emp: Employee) => {
-                    const shiftResponse = await fetch(
-                        `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/history/${emp.id}/?year=${year}&month=${month}`
-                    );
-                    const shiftData = await shiftResponse.json();
-                    return {
-                        id: emp.id,
-                        name: emp.name,
-                        shift_details: shiftData[0]?.shift_details || []
-                    };
-                })
+            const rosterResponse = await fetch(
+                `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/roster/${year}/${month}/`
             );
+            const roster = await rosterResponse.json();
+
+            const shiftsData = roster.employees.map((emp: Employee & { shift_request: any }) => ({
+                id: emp.id,
+                name: emp.name,
+                shift_details: emp.shift_request?.shift_details || []
+            }));
 
             setEmployees(shiftsData);
         } catch (err) {
@@ -42,7 +42,7 @@ export default function ShiftSendPage() {
             setSelectedFile(null);
             toast({
                 title: "送信成功",
-                description: "通知の送信が完了しました",
+                description: "通知の送信を受け付けました",
                 duration: 3000,
             });
         } catch (err) {
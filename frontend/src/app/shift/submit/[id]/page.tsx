@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import CustomCalendar from "@/components/ui/CustomCalendar";
 import { startOfMonth, addMonths, format } from "date-fns";
 import HomeLink from "@/components/ui/HomeLink";
@@ -33,6 +33,14 @@ type DraftData = {
     max_days_per_week?: number;
 };
 
+type BootstrapData = {
+    submission_status: {
+        is_submitted: boolean;
+    };
+    draft: DraftData | null;
+    presets: TimePreset[];
+};
+
 export default function ShiftSubmitPage({ params }: { params: { id: string } }) {
     const employeeId = params.id;
     const router = useRouter();
@@ -41,6 +49,9 @@ export default function ShiftSubmitPage({ params }: { params: { id: string } })
     const [selectedDates, setSelectedDates] = useState<Date[]>([]);
     const [shiftData, setShiftData] = useState<ShiftData>({});
     const [selectedPreset, setSelectedPreset] = useState<TimePreset | null>(null);
+    const [presets, setPresets] = useState<TimePreset[] | undefined>(undefined);
+    // 初期データの取得が終わるまでプリセットの一覧を表示しない（取得に失敗した場合は一覧側で取得し直す）
+    const [bootstrapped, setBootstrapped] = useState(false);
     const [monthlyPreference, setMonthlyPreference] = useState({
         minHours: 0,
         maxHours: 0,
@@ -49,6 +60,8 @@ export default function ShiftSubmitPage({ params }: { params: { id: string } })
     });
 
     const [isLoading, setIsLoading] = useState(false);
+    // 提出の再送（通信エラー後のリトライ・連打）を同じ提出として扱うためのキー
+    const idempotencyKey = useRef<string>(crypto.randomUUID());
     const [draftSaving, setDraftSaving] = useState(false);
     const [error, setError] = useState("");
     const [success, setSuccess] = useState(false);
@@ -56,25 +69,29 @@ export default function ShiftSubmitPage({ params }: { params: { id: string } })
     const [isHelpDialogOpen, setIsHelpDialogOpen] = useState(false);
 
     useEffect(() => {
-        fetchDraftData();
+        fetchBootstrapData();
     }, []);
 
-    const fetchDraftData = async () => {
+    // 下書き・提出状況・プリセットをまとめて取得
+    const fetchBootstrapData = async () => {
         try {
             const response = await fetch(
-                `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/draft/${employeeId}/${nextMonth.getFullYear()}/${nextMonth.getMonth() + 1}/`
+                `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/bootstrap/${employeeId}/${nextMonth.getFullYear()}/${nextMonth.getMonth() + 1}/`
             );
 
             if (!response.ok) {
-                if (response.status === 303) {
-                    router.push(`/shift/submit/${employeeId}/submitted`);
-                    return;
-                }
                 return;
             }
 
-            const data: DraftData = await response.json();
+            const bootstrap: BootstrapData = await response.json();
+            setPresets(bootstrap.presets);
+
+            if (bootstrap.submission_status.is_submitted || !bootstrap.draft) {
+                router.push(`/shift/submit/${employeeId}/submitted`);
+                return;
+            }
 
+            const data = bootstrap.draft;
             const restoredShiftData: ShiftData = {};
             data.shift_details.forEach(detail => {
                 restoredShiftData[detail.date] = {
@@ -93,6 +110,8 @@ export default function ShiftSubmitPage({ params }: { params: { id: string } })
             });
         } catch (err) {
             console.error('ドラフトデータの取得に失敗しました:', err);
+        } finally {
+            setBootstrapped(true);
         }
     };
 
@@ -189,6 +208,7 @@ export default function ShiftSubmitPage({ params }: { params: { id: string } })
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
+                        'Idempotency-Key': idempotencyKey.current,
                     },
                     body: JSON.stringify(requestData),
                 }
@@ -293,11 +313,14 @@ export default function ShiftSubmitPage({ params }: { params: { id: string } })
                             className="w-full"
                         />
 
-                        <TimePresetDrawer
-                            selectedPreset={selectedPreset}
-                            onPresetSelect={setSelectedPreset}
-                            employeeId={employeeId}
-                        />
+                        {bootstrapped && (
+                            <TimePresetDrawer
+                                selectedPreset={selectedPreset}
+                                onPresetSelect={setSelectedPreset}
+                                employeeId={employeeId}
+                                initialPresets={presets}
+                            />
+                        )}
 
                         <Dialog open={isHelpDialogOpen} onOpenChange={setIsHelpDialogOpen}>
                             <DialogTrigger asChild>
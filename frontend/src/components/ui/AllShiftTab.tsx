@@ -35,37 +35,28 @@ export default function AllShiftsTab() {
         setError("");
 
         try {
-            const empResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/accounts/employees/`);
-            const employees = await empResponse.json();
-
             const year = nextMonth.getFullYear();
             const month = nextMonth.getMonth() + 1;
+
+            const rosterResponse = await fetch(
+                `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/roster/${year}/${month}/`
+            );
+            const roster = await rosterResponse.json();
             const data: ShiftTableData = {};
 
-            for (const emp of employees) {
-                const statusResponse = await fetch(
-                    `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/draft/${emp.id}/${year}/${month}/`
-                );
-                const statusData = await statusResponse.json();
-                const isSubmitted = statusData.submitted;
+            for (const emp of roster.employees) {
+                const isSubmitted = emp.submission_status?.is_submitted || false;
 
                 let shifts = {};
-                if (isSubmitted) {
-                    const shiftResponse = await fetch(
-                        `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/history/${emp.id}/?year=${year}&month=${month}`
-                    );
-                    const shiftData = await shiftResponse.json();
-
-                    if (shiftData && shiftData.length > 0) {
-                        shifts = shiftData[0].shift_details.reduce((acc: any, detail: any) => {
-                            acc[detail.date] = {
-                                startTime: detail.start_time,
-                                endTime: detail.end_time,
-                                isSubmitted: true,
-                            };
-                            return acc;
-                        }, {});
-                    }
+                if (isSubmitted && emp.shift_request) {
+                    shifts = emp.shift_request.shift_details.reduce((acc: any, detail: any) => {
+                        acc[detail.date] = {
+                            startTime: detail.start_time,
+                            endTime: detail.end_time,
+                            isSubmitted: true,
+                        };
+                        return acc;
+                    }, {});
                 }
 
                 data[emp.id] = {
@@ -20,6 +20,7 @@ interface TimePresetDrawerProps {
     selectedPreset: TimePreset | null;
     onPresetSelect: (preset: TimePreset) => void;
     employeeId: string;
+    initialPresets?: TimePreset[];
 }
 
 // 固定の休みプリセット
@@ -38,19 +39,21 @@ const TIME_OPTIONS = Array.from({ length: 31 }, (_, i) => {
     return `${hour.toString().padStart(2, '0')}:${minute}`;
 });
 
-export function TimePresetDrawer({ selectedPreset, onPresetSelect, employeeId }: TimePresetDrawerProps) {
+export function TimePresetDrawer({ selectedPreset, onPresetSelect, employeeId, initialPresets }: TimePresetDrawerProps) {
     const [presets, setPresets] = useState<TimePreset[]>([]);
     const [editingPreset, setEditingPreset] = useState<TimePreset | null>(null);
     const [isDialogOpen, setIsDialogOpen] = useState(false);
     const [isOpen, setIsOpen] = useState(false);
     const [isLoading, setIsLoading] = useState(false);
 
-    // プリセットの取得
+    // プリセットの取得（親から初期データを受け取った場合はそれを使う）
     useEffect(() => {
-        if (employeeId) {
+        if (initialPresets) {
+            setPresets(initialPresets);
+        } else if (employeeId) {
             fetchPresets();
         }
-    }, [employeeId]);
+    }, [initialPresets, employeeId]);
 
     const fetchPresets = async () => {
         try {
@@ -17,27 +17,52 @@ export default function IndividualShiftsTab() {
         fetchEmployeesAndStatus();
     }, []);
 
+    // 提出状況の変更をサーバーから受け取る（再読み込みせずに一覧を更新）
+    useEffect(() => {
+        const { year, month } = targetMonth();
+        const source = new EventSource(
+            `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/submissions/${year}/${month}/stream/`
+        );
+        // 接続時（再接続を含む）に全員分の状況が届く
+        source.addEventListener("snapshot", (event) => {
+            const snapshot: { [key: string]: boolean } = JSON.parse((event as MessageEvent).data);
+            setSubmissionStatus((current) => {
+                const statuses: SubmissionStatus = {};
+                for (const id of Object.keys(current)) {
+                    statuses[Number(id)] = snapshot[id] ?? false;
+                }
+                return statuses;
+            });
+        });
+        source.addEventListener("status", (event) => {
+            const change: { employee_id: number; is_submitted: boolean } = JSON.parse((event as MessageEvent).data);
+            setSubmissionStatus((current) => ({ ...current, [change.employee_id]: change.is_submitted }));
+        });
+        return () => source.close();
+    }, []);
+
+    const targetMonth = () => {
+        const nextMonth = new Date();
+        nextMonth.setMonth(nextMonth.getMonth() + 1);
+        return { year: nextMonth.getFullYear(), month: nextMonth.getMonth() + 1 };
+    };
+
     const fetchEmployeesAndStatus = async () => {
         setIsLoading(true);
         setError("");
         try {
-            const empResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/accounts/employees/`);
-            if (!empResponse.ok) throw new Error("従業員データの取得に失敗しました");
-            const empData = await empResponse.json();
-            setEmployees(empData);
+            const { year, month } = targetMonth();
 
-            const nextMonth = new Date();
-            nextMonth.setMonth(nextMonth.getMonth() + 1);
-            const year = nextMonth.getFullYear();
-            const month = nextMonth.getMonth() + 1;
+            const rosterResponse = await fetch(
+                `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/roster/${year}/${month}/`
+            );
+            if (!rosterResponse.ok) throw new Error("従業員データの取得に失敗しました");
+            const roster = await rosterResponse.json();
+            setEmployees(roster.employees);
 
             const statuses: SubmissionStatus = {};
-            for (const emp of empData) {
-                const statusResponse = await fetch(
-                    `${process.env.NEXT_PUBLIC_API_URL}/api/shifts/draft/${emp.id}/${year}/${month}/`
-                );
-                const statusData = await statusResponse.json();
-                statuses[emp.id] = statusData.submitted || false;
+            for (const emp of roster.employees) {
+                statuses[emp.id] = emp.submission_status?.is_submitted || false;
             }
             setSubmissionStatus(statuses);
         } catch (err) {